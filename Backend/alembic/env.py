@@ -1,28 +1,26 @@
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
-import os
+
+from app.core.settings import settings
+from app.db.base import Base
+from app.models import user, department, document, blob  # noqa: F401  (register every table on Base.metadata)
 
 # this is the Alembic Config object, which provides access to the values within the .ini file in use.
 config = context.config
 
-# Interpret the config file for Python logging.
-if config.config_file_name is not None:
+# Interpret the config file for Python logging (not when the app runs migrations; it has its own logging).
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
-# Pull DB URL from env vars so .env drives runtime and migrations
-user = os.getenv("POSTGRES_USER", "youssef")
-password = os.getenv("POSTGRES_PASSWORD", "password")
-host = os.getenv("POSTGRES_HOST", "localhost")
-port = os.getenv("POSTGRES_PORT", "5432")
-db = os.getenv("POSTGRES_DB", "siemens_repo")
-config.set_main_option("sqlalchemy.url", f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}")
+# Same settings (.env / POSTGRES_*) as the app; "%" is escaped for the ini interpolation
+config.set_main_option("sqlalchemy.url", settings.sqlalchemy_database_uri.replace("%", "%%"))
 
-target_metadata = None  # We'll set this after models exist.
+target_metadata = Base.metadata
 
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, literal_binds=True)
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True)
     with context.begin_transaction():
         context.run_migrations()
 
@@ -31,11 +29,11 @@ def run_migrations_online():
         config.get_section(config.config_ini_section), prefix="sqlalchemy.", poolclass=pool.NullPool
     )
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, compare_type=True)
         with context.begin_transaction():
             context.run_migrations()
 
 if context.is_offline_mode():
     run_migrations_offline()
 else:
-    run_migrations_online()
\ No newline at end of file
+    run_migrations_online()
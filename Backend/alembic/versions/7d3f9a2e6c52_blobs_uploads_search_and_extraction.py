@@ -0,0 +1,107 @@
+"""blobs, upload sessions, search vectors and extracted content
+
+Everything create_all added after the baseline: content-addressed blobs, resumable upload sessions,
+document full-text search and extracted version content. Each object is created only if missing, as
+create_all may already have made some of them.
+
+Revision ID: 7d3f9a2e6c52
+Revises: 4b8e2f1c9a01
+Create Date: 2026-10-17 09:14:02.771569
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f9a2e6c52'
+down_revision: Union[str, None] = '4b8e2f1c9a01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table(table)  # offline: assume nothing
+
+
+def _add_missing_columns(table: str, *columns: sa.Column) -> None:
+    existing = set() if op.get_context().as_sql else {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+    for column in columns:
+        if column.name not in existing:
+            op.add_column(table, column)
+
+
+def upgrade() -> None:
+    if not _has_table('blobs'):
+        op.create_table('blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('base_sha256', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+        )
+    op.create_index(op.f('ix_blobs_base_sha256'), 'blobs', ['base_sha256'], unique=False, if_not_exists=True)
+    if not _has_table('upload_sessions'):
+        op.create_table('upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('total_size', sa.BigInteger(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index(op.f('ix_upload_sessions_document_id'), 'upload_sessions', ['document_id'], unique=False, if_not_exists=True)
+
+    _add_missing_columns('document_versions',
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('content_encoding', sa.String(length=20), nullable=True),
+    )
+    _add_missing_columns('documents', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], unique=False, postgresql_using='gin', if_not_exists=True)
+
+    if not _has_table('document_contents'):
+        op.create_table('document_contents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('version_id', sa.Integer(), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('content_vector', postgresql.TSVECTOR(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('extracted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['version_id'], ['document_versions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('version_id')
+        )
+    op.create_index('ix_document_contents_content_vector', 'document_contents', ['content_vector'], unique=False, postgresql_using='gin', if_not_exists=True)
+    op.create_index(op.f('ix_document_contents_document_id'), 'document_contents', ['document_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_document_contents_document_version', 'document_contents', ['document_id', 'version_number'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_document_contents_id'), 'document_contents', ['id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_contents_id'), table_name='document_contents')
+    op.drop_index('ix_document_contents_document_version', table_name='document_contents')
+    op.drop_index(op.f('ix_document_contents_document_id'), table_name='document_contents')
+    op.drop_index('ix_document_contents_content_vector', table_name='document_contents', postgresql_using='gin')
+    op.drop_table('document_contents')
+    op.drop_index('ix_documents_search_vector', table_name='documents', postgresql_using='gin')
+    op.drop_column('documents', 'search_vector')
+    op.drop_column('document_versions', 'content_encoding')
+    op.drop_column('document_versions', 'content_hash')
+    op.drop_column('document_versions', 'filename')
+    op.drop_index(op.f('ix_upload_sessions_document_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
+    op.drop_index(op.f('ix_blobs_base_sha256'), table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,30 @@
+"""blobs.superseded_at
+
+Switching a blob between whole and delta storage no longer deletes the previous objects at once
+(downloads that resolved the old key were still streaming them); collect_garbage removes them after
+its grace period, counted from this timestamp.
+
+Revision ID: 9e61b3d7a4c8
+Revises: f4c7d2b8a316
+Create Date: 2026-10-17 16:40:12.512730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e61b3d7a4c8'
+down_revision: Union[str, None] = 'f4c7d2b8a316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blobs', sa.Column('superseded_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('blobs', 'superseded_at')
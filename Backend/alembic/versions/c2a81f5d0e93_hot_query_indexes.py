@@ -0,0 +1,86 @@
+"""composite indexes for listing, tag search, version resolution and ACL loads
+
+- documents (updated_at DESC, id DESC) and (owner_id, updated_at DESC, id DESC): keyset pages of the
+  listing/search and my_documents read an index in order instead of sorting every visible row
+- document_permissions (department_id, can_view, document_id) INCLUDE (can_download): the visibility
+  EXISTS and the per-department ACL load are index-only; replaces the single-column department index
+- document_tags (tag_id, document_id): tag filters; the primary key leads with document_id
+- document_versions unique (document_id, version_number): resolve_version and version lists, and one
+  row per version number; replaces the single-column document_id index
+- document_versions (content_hash): blob reference counts and delta encoding look versions up by hash
+
+Indexes are built CONCURRENTLY so a live database keeps taking writes.
+
+Revision ID: c2a81f5d0e93
+Revises: 7d3f9a2e6c52
+Create Date: 2026-10-17 09:31:55.046812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a81f5d0e93'
+down_revision: Union[str, None] = '7d3f9a2e6c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_INDEXES = (
+    'ix_documents_updated',
+    'ix_documents_owner_updated',
+    'ix_document_permissions_department_view',
+    'ix_document_tags_tag_document',
+    'uq_document_versions_document_version',
+    'ix_document_versions_content_hash',
+)
+
+
+def _check_duplicate_versions() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT document_id, version_number FROM document_versions"
+        " GROUP BY document_id, version_number HAVING count(*) > 1 LIMIT 10"
+    )).all()
+    if duplicates:
+        raise RuntimeError(
+            "document_versions has duplicate (document_id, version_number) rows, renumber them before "
+            "upgrading: " + ", ".join(f"{d}/v{v}" for d, v in duplicates)
+        )
+
+
+def _drop_invalid_indexes() -> None:
+    # an interrupted CREATE INDEX CONCURRENTLY leaves an invalid index behind that IF NOT EXISTS would keep
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+        " WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+    ), {"names": list(NEW_INDEXES)}).scalars().all()
+    for name in invalid:
+        op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def upgrade() -> None:
+    offline = op.get_context().as_sql
+    if not offline:
+        _check_duplicate_versions()
+    with op.get_context().autocommit_block():
+        if not offline:
+            _drop_invalid_indexes()
+        op.create_index('ix_documents_updated', 'documents', [sa.text('updated_at DESC'), sa.text('id DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_documents_owner_updated', 'documents', ['owner_id', sa.text('updated_at DESC'), sa.text('id DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_document_permissions_department_view', 'document_permissions', ['department_id', 'can_view', 'document_id'], unique=False, postgresql_include=['can_download'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_document_tags_tag_document', 'document_tags', ['tag_id', 'document_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('uq_document_versions_document_version', 'document_versions', ['document_id', 'version_number'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_document_versions_content_hash', 'document_versions', ['content_hash'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        # covered by the composite indexes above
+        op.drop_index('ix_document_permissions_department_id', table_name='document_permissions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_document_versions_document_id', table_name='document_versions', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_document_versions_document_id'), 'document_versions', ['document_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_document_permissions_department_id'), 'document_permissions', ['department_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        for name in reversed(NEW_INDEXES):
+            op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
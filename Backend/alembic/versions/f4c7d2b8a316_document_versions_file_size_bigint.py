@@ -0,0 +1,40 @@
+"""document_versions.file_size as bigint
+
+Streaming and resumable uploads accept files over 2 GiB; an integer file_size made their commit fail
+with "integer out of range" after the bytes were already stored. blobs.size and
+upload_sessions.total_size are bigint already.
+
+The type change rewrites document_versions under an ACCESS EXCLUSIVE lock: run it in a quiet window
+on large databases.
+
+Revision ID: f4c7d2b8a316
+Revises: c2a81f5d0e93
+Create Date: 2026-10-17 15:12:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c7d2b8a316'
+down_revision: Union[str, None] = 'c2a81f5d0e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'document_versions', 'file_size',
+        existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=True,
+    )
+
+
+def downgrade() -> None:
+    # fails if a stored version is 2 GiB or larger
+    op.alter_column(
+        'document_versions', 'file_size',
+        existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=True,
+    )
@@ -1,36 +1,145 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Dict, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.core.security import decode_token
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.settings import settings
+from app.db.notifications import on_commit
+from app.db.routing import PRIMARY_COOKIE, read_sessionmaker, remember_write
+from app.db.session import get_async_db
+from app.core.security import decode_token, unverified_subject
 from app.models.user import User
-from app.models.department import Department
 
 security_scheme = HTTPBearer(auto_error=False)
 
 
-def get_db_dep() -> Generator[Session, None, None]:
-    yield from get_db()
+@dataclass(frozen=True)
+class CurrentUser:
+    """Immutable snapshot of the authenticated user; safe to share between requests and threads."""
 
+    id: int
+    name: str
+    email: str
+    role: Optional[str]
+    department_id: Optional[int]
+    department_name: Optional[str]
 
-def get_current_user(
+    @classmethod
+    def from_model(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            department_id=user.department_id,
+            department_name=user.department.name if user.department else None,
+        )
+
+
+# (user id, token iat) -> CurrentUser; a token issued after a change never sees the old snapshot
+_user_cache = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+
+
+def invalidate_user(user_id: int) -> None:
+    _user_cache.discard_where(lambda key: key[0] == user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+async def get_db_dep() -> AsyncGenerator[AsyncSession, None]:
+    async for db in get_async_db():
+        yield db
+
+
+async def get_read_db_dep(
+    request: Request,
     creds: Optional[HTTPAuthorizationCredentials] = Depends(security_scheme),
-    db: Session = Depends(get_db_dep),
-) -> User:
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: a replica when configured, the primary right after the user's own writes."""
+    user_id = unverified_subject(creds.credentials) if creds else None
+    async with read_sessionmaker(user_id, request.cookies.get(PRIMARY_COOKIE))() as db:
+        yield db
+
+
+def _token_claims(creds: Optional[HTTPAuthorizationCredentials]) -> Dict[str, Any]:
     if creds is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
     try:
-        payload = decode_token(creds.credentials)
+        with metrics.timed("auth.token_decode_seconds"):
+            payload = decode_token(creds.credentials)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {e}")
 
-    user_id = payload.get("sub")
-    if not user_id:
+    if not payload.get("sub"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token: missing sub")
+    return payload
+
+
+async def _load_user(db: AsyncSession, payload: Dict[str, Any]) -> CurrentUser:
+    user_id = int(payload["sub"])
+    key = (user_id, payload.get("iat"))
+    cached = _user_cache.get(key)
+    if cached is not None:
+        metrics.inc("auth_cache.hits")
+        return cached
 
-    user = db.query(User).get(int(user_id))
+    metrics.inc("auth_cache.misses")
+    user = await db.get(User, user_id, options=[joinedload(User.department)])
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
\ No newline at end of file
+    current = CurrentUser.from_model(user)
+    _user_cache.set(key, current)
+    return current
+
+
+async def get_current_user(
+    response: Response,
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(security_scheme),
+    db: AsyncSession = Depends(get_db_dep),
+) -> CurrentUser:
+    """
+    For routes that write: once the request's transaction commits, the user's reads stick to the
+    primary for READ_YOUR_WRITES_SECONDS. A request that is refused (or writes nothing) leaves them be.
+    """
+    # the session only checks out a connection on a cache miss
+    user = await _load_user(db, _token_claims(creds))
+
+    def wrote() -> None:
+        until = remember_write(user.id)
+        response.set_cookie(
+            PRIMARY_COOKIE, str(until), max_age=settings.read_your_writes_seconds, httponly=True, samesite="lax"
+        )
+
+    # the route's own session: FastAPI resolves get_db_dep once per request
+    on_commit(db, wrote)
+    return user
+
+
+async def get_current_reader(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(security_scheme),
+    db: AsyncSession = Depends(get_read_db_dep),
+) -> CurrentUser:
+    """
+    For read-only endpoints. With AUTH_TRUST_CLAIMS the signed token claims are used as-is
+    (no lookup at all), so a department change applies once the user logs in again.
+    """
+    payload = _token_claims(creds)
+    if settings.auth_trust_claims and "department_id" in payload:
+        return CurrentUser(
+            id=int(payload["sub"]),
+            name=payload.get("name") or "",
+            email=payload.get("email") or "",
+            role=payload.get("role"),
+            department_id=payload.get("department_id"),
+            department_name=payload.get("department_name"),
+        )
+    return await _load_user(db, payload)
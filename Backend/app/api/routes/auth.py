@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.api.deps import get_db_dep, get_current_user
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from starlette.concurrency import run_in_threadpool
+from app.api.deps import CurrentUser, get_db_dep, get_current_reader
 from app.core.security import hash_password, verify_password, create_access_token
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse, MeResponse
 from app.models.user import User
@@ -10,27 +13,26 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=MeResponse, status_code=status.HTTP_201_CREATED)
-def register(data: RegisterRequest, db: Session = Depends(get_db_dep)) -> MeResponse:
-    existing = db.query(User).filter(User.email == data.email).first()
+async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db_dep)) -> MeResponse:
+    existing = (await db.execute(select(User.id).where(User.email == data.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     department = None
     if data.department_id:
-        department = db.query(Department).get(data.department_id)
+        department = await db.get(Department, data.department_id)
         if not department:
             raise HTTPException(status_code=400, detail="Invalid department_id")
 
     user = User(
         name=data.name,
         email=data.email,
-        password_hash=hash_password(data.password),
+        password_hash=await run_in_threadpool(hash_password, data.password),  # bcrypt is deliberately slow
         department_id=data.department_id,
         role=data.role,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     return MeResponse(
         id=user.id,
@@ -43,9 +45,10 @@ def register(data: RegisterRequest, db: Session = Depends(get_db_dep)) -> MeResp
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db_dep)) -> TokenResponse:
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, user.password_hash):
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_db_dep)) -> TokenResponse:
+    result = await db.execute(select(User).options(joinedload(User.department)).where(User.email == data.email))
+    user = result.scalars().first()
+    if not user or not await run_in_threadpool(verify_password, data.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
     token = create_access_token(
@@ -62,12 +65,12 @@ def login(data: LoginRequest, db: Session = Depends(get_db_dep)) -> TokenRespons
 
 
 @router.get("/me", response_model=MeResponse)
-def me(current_user: User = Depends(get_current_user)) -> MeResponse:
+async def me(current_user: CurrentUser = Depends(get_current_reader)) -> MeResponse:
     return MeResponse(
         id=current_user.id,
         name=current_user.name,
         email=current_user.email,
         role=current_user.role,
         department_id=current_user.department_id,
-        department_name=current_user.department.name if current_user.department else None,
+        department_name=current_user.department_name,
     )
\ No newline at end of file
@@ -1,17 +1,43 @@
+from datetime import datetime, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.api.deps import get_db_dep, get_current_user
-from app.models.user import User
-from app.models.document import Document, DocumentVersion, Tag, DocumentPermission
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.api.deps import CurrentUser, get_db_dep, get_read_db_dep, get_current_reader, get_current_user
+from app.core.settings import settings
+from app.core.files import (
+    append_to_session,
+    discard_staged,
+    open_blob,
+    open_blob_range,
+    session_offset,
+    stage_session_file,
+    stored_verbatim,
+)
+from app.core.http import accepts_encoding, content_disposition, http_date, is_not_modified, ranged_response
+from app.core.storage import StorageError, get_storage
+from app.core.uploads import multipart_openapi, parse_streaming_batch, parse_streaming_upload
+from app.models.document import Document, DocumentVersion, Tag
+from fastapi.responses import Response, StreamingResponse
 from app.schemas.documents import (
-    DocumentCreateForm,
     DocumentSummary,
+    DocumentPage,
+    SearchFacets,
     DocumentDetail,
     DocumentVersionInfo,
     DocumentUpdateRequest,
+    UploadSessionCreate,
+    UploadSessionInfo,
+    DirectUploadRequest,
+    DirectDocumentUploadRequest,
+    DirectUploadTicket,
+    DirectUploadComplete,
+    DirectUploadResult,
+    DirectDownload,
+    BulkIngestResult,
+    BulkItemResult,
 )
 
 from app.services.documents import (
@@ -25,36 +51,73 @@ from app.services.documents import (
     can_upload_new_version,
     add_new_version,
     replace_document_metadata,
+    viewable_documents_query,
+    downloadable_documents_query,
+)
+from app.services.pagination import paginate_documents
+from app.services.uploads import create_upload_session, delete_upload_session, get_upload_session
+from app.services.search import ranked_search, content_matches, text_matches
+from app.services.facets import cached_facets, facets_column, store_facets
+from app.services.export import export_entries, stream_zip
+from app.services.extraction import extract_version_in_background, extract_versions_in_background
+from app.services.deltas import encode_superseded_in_background
+from app.services.bulk import (
+    MANIFEST_MAX_BYTES,
+    ZIP_CONTENT_TYPES,
+    index_by_name,
+    ingest,
+    match_manifest,
+    read_zip_upload,
 )
+from app.services.direct import download_url, issue_upload, read_upload_token, received_file
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
 
-@router.post("/upload", response_model=DocumentSummary, status_code=status.HTTP_201_CREATED)
-def upload_document(
-    title: str = Form(...),
-    description: Optional[str] = Form(None),
-    tags: Optional[str] = Form(None),  # CSV
-    permission_department_ids: Optional[str] = Form(None),  # CSV of ints
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+@router.post(
+    "/upload",
+    response_model=DocumentSummary,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=multipart_openapi(
+        {
+            "title": "Document title",
+            "description": "Optional description",
+            "tags": "CSV of tag names",
+            "permission_department_ids": "CSV of department ids",
+        },
+        required=["title"],
+    ),
+)
+async def upload_document(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> DocumentSummary:
+    # the body is streamed to storage/.staging as it arrives; only the DB work runs in the threadpool
+    fields, staged = await parse_streaming_upload(request)
     try:
-        tag_names = parse_csv(tags)
-        dep_ids = [int(x) for x in parse_csv(permission_department_ids)]
-    except ValueError:
-        raise HTTPException(status_code=400, detail="permission_department_ids must be comma-separated integers")
-
-    doc, v1, tag_models = create_document_with_v1(
-        db=db,
-        current_user=current_user,
-        title=title,
-        description=description,
-        tag_names=tag_names,
-        permitted_department_ids=dep_ids,
-        upload_file=file,
-    )
+        title = (fields.get("title") or "").strip()
+        if not title or len(title) > 255:
+            raise HTTPException(status_code=422, detail="title is required (max 255 characters)")
+        try:
+            tag_names = parse_csv(fields.get("tags"))
+            dep_ids = [int(x) for x in parse_csv(fields.get("permission_department_ids"))]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="permission_department_ids must be comma-separated integers")
+
+        doc, v1, tag_models = await create_document_with_v1(
+            db=db,
+            current_user=current_user,
+            title=title,
+            description=fields.get("description") or None,
+            tag_names=tag_names,
+            permitted_department_ids=dep_ids,
+            staged=staged,
+        )
+    finally:
+        discard_staged(staged)  # no-op once moved into the blob store
+    background_tasks.add_task(extract_version_in_background, v1.id)
 
     return DocumentSummary(
         id=doc.id,
@@ -65,31 +128,105 @@ def upload_document(
     )
 
 
-@router.get("", response_model=List[DocumentSummary])
-def list_accessible_documents(
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
-) -> List[DocumentSummary]:
+BULK_ERRORS = {
+    "bad_zip": (400, "Body is not a readable ZIP archive"),
+    "bad_manifest": (400, "manifest must be a JSON array of {file, title, description, tags, permission_department_ids}"),
+    "duplicate_file": (400, "Two files have the same name; use distinct filenames"),
+    "too_many_files": (413, f"At most {settings.bulk_max_items} documents per request"),
+    "too_large": (413, f"At most {settings.bulk_max_mb} MB per archive"),
+}
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkIngestResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "manifest": {"type": "string", "description": "JSON array; see BulkManifestItem"},
+                            "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        },
+                        "required": ["files"],
+                    }
+                },
+                "application/zip": {
+                    "schema": {"type": "string", "format": "binary", "description": "optional manifest.json at the root"}
+                },
+            },
+        }
+    },
+)
+async def bulk_upload_documents(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> BulkIngestResult:
     """
-    Returns only latest versions of documents the user's department can view.
+    Creates many documents in one request: a ZIP body (optional manifest.json at its root) or a multipart
+    batch of `files` parts plus a `manifest` field. Each manifest entry names its file and carries the
+    same metadata as /upload; without a manifest every file becomes a document titled after its name.
+    Items are reported individually; an invalid one does not stop the others.
     """
-    if not current_user.department_id:
-        return []
-
-    # filter by permissions
-    q = (
-        db.query(Document)
-        .join(DocumentPermission, DocumentPermission.document_id == Document.id)
-        .filter(
-            DocumentPermission.department_id == current_user.department_id,
-            DocumentPermission.can_view == 1,
-        )
+    files = {}
+    try:
+        try:
+            if request.headers.get("content-type", "").split(";")[0].strip() in ZIP_CONTENT_TYPES:
+                manifest, files = await read_zip_upload(request.stream())
+            else:
+                fields, staged = await parse_streaming_batch(
+                    request, "files", settings.bulk_max_items, {"manifest": MANIFEST_MAX_BYTES}
+                )
+                manifest = fields["manifest"].encode() if "manifest" in fields else None
+                files = index_by_name(staged)
+            items = match_manifest(manifest, files)
+        except ValueError as e:
+            code, detail = BULK_ERRORS.get(str(e), (400, "Invalid bulk upload"))
+            raise HTTPException(status_code=code, detail=detail)
+        version_ids = await ingest(db, current_user, items)
+    finally:
+        for staged in files.values():
+            if staged is not None:
+                discard_staged(staged)  # unreferenced files, failed batches; no-op for stored ones
+    background_tasks.add_task(extract_versions_in_background, version_ids)
+
+    created = len(version_ids)
+    return BulkIngestResult(
+        created=created,
+        failed=len(items) - created,
+        items=[
+            BulkItemResult(index=i.index, file=i.file, document_id=i.document_id, error=i.error) for i in items
+        ],
     )
 
-    docs = q.all()
-    results: List[DocumentSummary] = []
-    for d in docs:
-        results.append(
+
+@router.get("", response_model=DocumentPage)
+async def list_accessible_documents(
+    limit: int = Query(default=settings.page_size_default, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
+) -> DocumentPage:
+    """
+    Returns only latest versions of documents the user's department can view, newest first, one page at a time.
+    """
+    if not current_user.department_id:
+        return DocumentPage(items=[])
+
+    # filter by permissions; tags are loaded in one extra IN query instead of per row
+    q = viewable_documents_query(current_user.department_id).options(selectinload(Document.tags))
+    try:
+        docs, next_cursor = await paginate_documents(db, q, min(limit, settings.page_size_max), cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return DocumentPage(
+        items=[
             DocumentSummary(
                 id=d.id,
                 title=d.title,
@@ -97,75 +234,203 @@ def list_accessible_documents(
                 tags=[t.name for t in d.tags],
                 updated_at=d.updated_at.isoformat() if d.updated_at else None,
             )
-        )
-    return results
+            for d in docs
+        ],
+        next_cursor=next_cursor,
+    )
 
 
-@router.get("/search", response_model=List[DocumentSummary])
-def search_documents(
+def _search_filters(
+    query: Select,
+    title: Optional[str],
+    tags: Optional[str],
+    description: Optional[str],
+    content: Optional[str],
+    version: Optional[int],
+) -> Select:
+    if title:
+        query = query.where(Document.title.ilike(f"%{title}%"))
+    if description:
+        query = query.where(Document.description.ilike(f"%{description}%"))
+    if tags:
+        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+        if tag_list:
+            # EXISTS keeps one row per document even when several tags match
+            query = query.where(Document.tags.any(Tag.name.in_(tag_list)))
+
+    if content and content.strip():
+        query = query.where(content_matches(content.strip()))
+
+    # version filter: show docs whose current_version_number matches
+    if version:
+        query = query.where(Document.current_version_number == version)
+    return query
+
+
+@router.get("/search", response_model=DocumentPage)
+async def search_documents(
+    q: Optional[str] = Query(default=None, description="Full-text query over title, tags and description"),
     title: Optional[str] = Query(default=None),
     tags: Optional[str] = Query(default=None, description="CSV, e.g. Finance,Legal"),
     description: Optional[str] = Query(default=None),
+    content: Optional[str] = Query(default=None, description="Full-text query over the extracted file text"),
     version: Optional[int] = Query(default=None, ge=1),
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
-) -> List[DocumentSummary]:
+    facets: bool = Query(default=False, description="Also return tag/department/version/age counts over all matches"),
+    limit: int = Query(default=settings.page_size_default, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
+) -> DocumentPage:
     """
     Simple search: title/description ILIKE; tags are OR'ed; returns latest versions only, filtered by view permission.
+    With q, results are full-text matches ranked by relevance and carry a highlighted snippet.
+    With facets=true, the page also carries counts over every match (not just this page), cached briefly.
     """
     if not current_user.department_id:
-        return []
-
-    q = (
-        db.query(Document)
-        .join(DocumentPermission, DocumentPermission.document_id == Document.id)
-        .filter(
-            DocumentPermission.department_id == current_user.department_id,
-            DocumentPermission.can_view == 1,
+        return DocumentPage(items=[])
+
+    matched = _search_filters(
+        viewable_documents_query(current_user.department_id), title, tags, description, content, version
+    )
+    query = matched.options(selectinload(Document.tags))
+    facet_counts = facet_column = signature = None
+    if facets:
+        if q and q.strip():
+            matched = matched.where(text_matches(q.strip()))
+        signature = (
+            current_user.department_id,
+            (q or "").strip(),
+            title,
+            tuple(sorted(set(parse_csv(tags)))),
+            description,
+            (content or "").strip(),
+            version,
         )
+        facet_counts = cached_facets(signature)
+        if facet_counts is None:
+            # counted over every match by the page query itself: no extra round trip
+            facet_column = facets_column(matched, datetime.now(timezone.utc))
+
+    limit = min(limit, settings.page_size_max)
+    try:
+        if q and q.strip():
+            rows, next_cursor = await ranked_search(db, query, q.strip(), limit, cursor, facet_column)
+        else:
+            rows, next_cursor = await paginate_documents(db, query, limit, cursor, facet_column)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if facet_column is not None:
+        if rows:
+            facet_counts = store_facets(signature, rows[0][-1])
+            rows = [row[:-1] if q and q.strip() else row[0] for row in rows]
+        elif cursor:  # past the last match: the page query had no row to carry the counts
+            facet_counts = store_facets(signature, await db.scalar(select(facet_column)))
+        else:
+            facet_counts = store_facets(signature, None)
+    if facet_counts is not None:
+        facet_counts = SearchFacets(**facet_counts)
+
+    if q and q.strip():
+        return DocumentPage(
+            items=[
+                DocumentSummary(
+                    id=d.id,
+                    title=d.title,
+                    current_version_number=d.current_version_number,
+                    tags=[t.name for t in d.tags],
+                    updated_at=d.updated_at.isoformat() if d.updated_at else None,
+                    rank=rank,
+                    snippet=snippet,
+                )
+                for d, rank, snippet in rows
+            ],
+            next_cursor=next_cursor,
+            facets=facet_counts,
+        )
+    return DocumentPage(
+        items=[
+            DocumentSummary(
+                id=d.id,
+                title=d.title,
+                current_version_number=d.current_version_number,
+                tags=[t.name for t in d.tags],
+                updated_at=d.updated_at.isoformat() if d.updated_at else None,
+            )
+            for d in rows
+        ],
+        next_cursor=next_cursor,
+        facets=facet_counts,
     )
 
-    if title:
-        q = q.filter(Document.title.ilike(f"%{title}%"))
-    if description:
-        q = q.filter(Document.description.ilike(f"%{description}%"))
-    if tags:
-        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-        if tag_list:
-            q = q.join(Document.tags).filter(Tag.name.in_(tag_list))
 
-    # version filter: show docs whose current_version_number matches
-    if version:
-        q = q.filter(Document.current_version_number == version)
-
-    docs = q.order_by(Document.updated_at.desc()).all()
-    return [
-        DocumentSummary(
-            id=d.id,
-            title=d.title,
-            current_version_number=d.current_version_number,
-            tags=[t.name for t in d.tags],
-            updated_at=d.updated_at.isoformat() if d.updated_at else None,
-        )
-        for d in docs
-    ]
 
 
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {"application/zip": {}}}})
+async def export_documents(
+    ids: Optional[str] = Query(default=None, description="CSV of document ids"),
+    q: Optional[str] = Query(default=None, description="Full-text query over title, tags and description"),
+    title: Optional[str] = Query(default=None),
+    tags: Optional[str] = Query(default=None, description="CSV, e.g. Finance,Legal"),
+    description: Optional[str] = Query(default=None),
+    content: Optional[str] = Query(default=None, description="Full-text query over the extracted file text"),
+    version: Optional[int] = Query(default=None, ge=1),
+    compress: bool = Query(default=False, description="Deflate members (most office/PDF files are already compressed)"),
+    zip64: bool = Query(default=False, description="zip64 fields on every member, not only those over 4 GiB"),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
+) -> StreamingResponse:
+    """
+    One ZIP with the latest version of every selected document the user may download: a list of ids and/or
+    the /search filters (none: everything downloadable, up to EXPORT_MAX_DOCUMENTS). The archive is streamed
+    from storage as it is built; requested ids that cannot be exported are listed in EXPORT-NOTES.txt.
+    """
+    query = downloadable_documents_query(current_user.id, current_user.department_id)
+    query = _search_filters(query, title, tags, description, content, version)
+    if q and q.strip():
+        query = query.where(text_matches(q.strip()))
+    requested: List[int] = []
+    if ids:
+        try:
+            requested = [int(x) for x in parse_csv(ids)]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+        query = query.where(Document.id.in_(requested))
+
+    try:
+        entries = await export_entries(db, query, settings.export_max_documents)
+    except ValueError:
+        raise HTTPException(
+            status_code=413, detail=f"More than {settings.export_max_documents} documents match; narrow the selection"
+        )
+    if not entries:
+        raise HTTPException(status_code=404, detail="No downloadable documents match")
+
+    exported = {e.document_id for e in entries}
+    notes = [f"document {i}: not found or not downloadable" for i in dict.fromkeys(requested) if i not in exported]
+    return StreamingResponse(
+        stream_zip(entries, compress=compress, force_zip64=zip64, notes=notes),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": content_disposition(f"documents-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.zip"),
+            "Cache-Control": "private, no-store",
+        },
+    )
 
 
 @router.get("/{document_id}", response_model=DocumentDetail)
-def get_document_detail(
+async def get_document_detail(
     document_id: int,
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
 ) -> DocumentDetail:
-    doc = get_document_or_404(db, document_id)
+    doc = await get_document_or_404(db, document_id, selectinload(Document.tags))
 
     is_owner = (doc.owner_id == current_user.id)
     owner_dept_id = doc.owner.department_id if doc.owner else None
     same_department = bool(current_user.department_id and owner_dept_id and current_user.department_id == owner_dept_id)
 
-    if not (is_owner or user_can_view_document(db, document_id, current_user.department_id)):
+    if not (is_owner or await user_can_view_document(db, document_id, current_user.department_id)):
         raise HTTPException(status_code=403, detail="Not authorized to view this document")
 
     return DocumentDetail(
@@ -181,90 +446,355 @@ def get_document_detail(
     )
 
 
+def _version_info(v: DocumentVersion) -> DocumentVersionInfo:
+    return DocumentVersionInfo(
+        id=v.id,
+        version_number=v.version_number,
+        uploaded_by_name=v.uploaded_by_name,
+        uploaded_at=v.uploaded_at.isoformat() if v.uploaded_at else None,
+        file_size=v.file_size,
+        mime_type=v.mime_type,
+    )
+
 
 @router.get("/{document_id}/versions", response_model=List[DocumentVersionInfo])
-def get_document_versions(
+async def get_document_versions(
     document_id: int,
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
 ) -> List[DocumentVersionInfo]:
-    doc = get_document_or_404(db, document_id)
-    if doc.owner_id != current_user.id and not user_can_view_document(db, document_id, current_user.department_id):
+    doc = await get_document_or_404(db, document_id)
+    if doc.owner_id != current_user.id and not await user_can_view_document(
+        db, document_id, current_user.department_id
+    ):
         raise HTTPException(status_code=403, detail="Not authorized to view versions")
 
-    versions = get_versions_for_document(db, document_id)
-    return [
-        DocumentVersionInfo(
-            id=v.id,
-            version_number=v.version_number,
-            uploaded_by_name=v.uploaded_by_name,
-            uploaded_at=v.uploaded_at.isoformat() if v.uploaded_at else None,
-            file_size=v.file_size,
-            mime_type=v.mime_type,
-        )
-        for v in versions
-    ]
+    versions = await get_versions_for_document(db, document_id)
+    return [_version_info(v) for v in versions]
 
 @router.get("/{document_id}/download")
-def download_document(
+async def download_document(
+    request: Request,
     document_id: int,
     version: Optional[str] = Query(default="latest"),
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+    direct: bool = Query(default=False, description="Return a short-lived signed storage URL instead of the bytes"),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
 ):
-    doc = get_document_or_404(db, document_id)
-    if doc.owner_id != current_user.id and not user_can_download_document(db, document_id, current_user.department_id):
+    doc = await get_document_or_404(db, document_id)
+    if doc.owner_id != current_user.id and not await user_can_download_document(
+        db, document_id, current_user.department_id
+    ):
         raise HTTPException(status_code=403, detail="Not authorized to download this document")
     try:
-        v = resolve_version(db, doc, version)
+        v = await resolve_version(db, doc, version)
     except ValueError as e:
         if str(e) == "not_found":
             raise HTTPException(status_code=404, detail="Version not found")
         raise HTTPException(status_code=400, detail="Invalid version")
-
-    return FileResponse(
-        path=v.file_path,
+    # compressed blobs go out as stored to clients that accept the coding, decoded on the fly otherwise
+    passthrough = bool(v.content_encoding) and accepts_encoding(request.headers, v.content_encoding)
+    if direct:
+        _require_direct_transfers()
+        if not v.content_encoding and not stored_verbatim(v.file_path):
+            raise HTTPException(status_code=409, detail="Stored as a delta of another version; omit direct")
+        if v.content_encoding and not passthrough:
+            raise HTTPException(
+                status_code=406, detail=f"Stored {v.content_encoding}-compressed; send Accept-Encoding or omit direct"
+            )
+        return DirectDownload(**download_url(v))
+
+    # a stored version never changes: explicit numbers are cacheable forever, "latest" only briefly
+    explicit = version not in (None, "", "latest")
+    max_age = "max-age=31536000, immutable" if explicit else f"max-age={settings.download_latest_max_age}"
+    etag = v.content_hash if v.content_hash else f"v{v.id}-{v.file_size}"
+    cache_headers = {
+        "ETag": f'"{etag}-{v.content_encoding}"' if passthrough else f'"{etag}"',
+        "Cache-Control": f"{settings.download_cache_scope}, {max_age}",
+    }
+    if v.content_encoding:
+        cache_headers["Vary"] = "Accept-Encoding"
+    if v.uploaded_at:
+        cache_headers["Last-Modified"] = http_date(v.uploaded_at)
+    if is_not_modified(request.headers, cache_headers["ETag"], v.uploaded_at):
+        return Response(status_code=304, headers=cache_headers)
+
+    storage = get_storage()
+    try:
+        size = await run_in_threadpool(storage.size, v.file_path)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File missing from storage")
+    response_headers = {
+        **cache_headers,
+        "Content-Disposition": content_disposition(v.filename or v.file_path.split("/")[-1]),
+    }
+    if not passthrough and not stored_verbatim(v.file_path):
+        # decoded on the fly, or rebuilt from a delta chain (older versions, with STORAGE_DELTAS)
+        size = v.file_size
+        open_stream = lambda: open_blob(v.file_path)  # noqa: E731
+        open_range = lambda start, end: open_blob_range(v.file_path, start, end)  # noqa: E731
+    else:
+        if passthrough:
+            response_headers["Content-Encoding"] = v.content_encoding
+        open_stream = lambda: storage.open_stream(v.file_path)  # noqa: E731
+        open_range = lambda start, end: storage.open_range(v.file_path, start, end)  # noqa: E731
+    return ranged_response(
+        request.headers,
+        size,
+        open_stream=open_stream,
+        open_range=open_range,
         media_type=v.mime_type or "application/octet-stream",
-        filename=v.file_path.split("/")[-1],
+        response_headers=response_headers,
+        validators=(cache_headers["ETag"], v.uploaded_at),
     )
 
 
-@router.post("/{document_id}/version", response_model=DocumentVersionInfo, status_code=status.HTTP_201_CREATED)
-def upload_new_version(
+@router.post(
+    "/{document_id}/version",
+    response_model=DocumentVersionInfo,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=multipart_openapi({}, required=[]),
+)
+async def upload_new_version(
     document_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> DocumentVersionInfo:
-    doc = get_document_or_404(db, document_id)
-    # allowed: owner or same department as owner
+    doc = await get_document_or_404(db, document_id)
+    # allowed: owner or same department as owner (checked before reading the body)
     if not can_upload_new_version(doc, current_user):
         raise HTTPException(status_code=403, detail="Not allowed to upload a new version")
 
-    v = add_new_version(db, doc, current_user, file)
-    return DocumentVersionInfo(
-        id=v.id,
-        version_number=v.version_number,
-        uploaded_by_name=v.uploaded_by_name,
-        uploaded_at=v.uploaded_at.isoformat() if v.uploaded_at else None,
-        file_size=v.file_size,
-        mime_type=v.mime_type,
+    _, staged = await parse_streaming_upload(request)
+    try:
+        v = await add_new_version(db, doc, current_user, staged)
+    finally:
+        discard_staged(staged)
+    background_tasks.add_task(extract_version_in_background, v.id)
+    if settings.storage_deltas:
+        background_tasks.add_task(encode_superseded_in_background, doc.id)
+    return _version_info(v)
+
+
+async def _session_or_404(db: AsyncSession, document_id: int, upload_id: str, user: CurrentUser):
+    try:
+        return await get_upload_session(db, document_id, upload_id, user)
+    except ValueError as e:
+        raise HTTPException(status_code=410 if str(e) == "expired" else 404, detail=f"Upload session {e}")
+
+
+# Resumable version uploads: create a session, PATCH chunks at Upload-Offset (HEAD tells where to
+# resume after a dropped connection), then complete. Chunks are appended in storage/.staging/sessions.
+
+@router.post("/{document_id}/version/uploads", response_model=UploadSessionInfo, status_code=status.HTTP_201_CREATED)
+async def start_version_upload(
+    document_id: int,
+    payload: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> UploadSessionInfo:
+    doc = await get_document_or_404(db, document_id)
+    if not can_upload_new_version(doc, current_user):
+        raise HTTPException(status_code=403, detail="Not allowed to upload a new version")
+    session = await create_upload_session(db, doc, current_user, payload.filename, payload.content_type, payload.size)
+    return UploadSessionInfo(
+        upload_id=session.id,
+        offset=0,
+        size=session.total_size,
+        expires_at=session.expires_at.isoformat(),
     )
 
 
+@router.head("/{document_id}/version/uploads/{upload_id}")
+async def get_version_upload_offset(
+    document_id: int,
+    upload_id: str,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    session = await _session_or_404(db, document_id, upload_id, current_user)
+    headers = {"Upload-Offset": str(session_offset(session.id)), "Cache-Control": "no-store"}
+    if session.total_size is not None:
+        headers["Upload-Length"] = str(session.total_size)
+    return Response(status_code=200, headers=headers)
+
+
+@router.patch("/{document_id}/version/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_version_upload(
+    document_id: int,
+    upload_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    session = await _session_or_404(db, document_id, upload_id, current_user)
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+
+    try:
+        new_offset = await append_to_session(session.id, offset, request.stream(), session.total_size)
+    except ValueError as e:
+        current = str(session_offset(session.id))
+        if str(e) == "too_large":
+            raise HTTPException(status_code=413, detail="Upload exceeds declared size", headers={"Upload-Offset": current})
+        detail = "Another chunk is being written" if str(e) == "busy" else "Upload-Offset does not match"
+        raise HTTPException(status_code=409, detail=detail, headers={"Upload-Offset": current})
+    return Response(status_code=204, headers={"Upload-Offset": str(new_offset)})
+
+
+@router.post(
+    "/{document_id}/version/uploads/{upload_id}/complete",
+    response_model=DocumentVersionInfo,
+    status_code=status.HTTP_201_CREATED,
+)
+async def complete_version_upload(
+    document_id: int,
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> DocumentVersionInfo:
+    session = await _session_or_404(db, document_id, upload_id, current_user)
+    doc = await get_document_or_404(db, document_id)
+    if not can_upload_new_version(doc, current_user):
+        raise HTTPException(status_code=403, detail="Not allowed to upload a new version")
+    received = session_offset(session.id)
+    if session.total_size is not None and received != session.total_size:
+        raise HTTPException(
+            status_code=409, detail="Upload is incomplete", headers={"Upload-Offset": str(received)}
+        )
+
+    staged = await run_in_threadpool(stage_session_file, session.id, session.filename, session.content_type)
+    try:
+        v = await add_new_version(db, doc, current_user, staged)
+    finally:
+        discard_staged(staged)
+    await delete_upload_session(db, session)
+    background_tasks.add_task(extract_version_in_background, v.id)
+    if settings.storage_deltas:
+        background_tasks.add_task(encode_superseded_in_background, doc.id)
+    return _version_info(v)
+
+
+@router.delete("/{document_id}/version/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_version_upload(
+    document_id: int,
+    upload_id: str,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    session = await _session_or_404(db, document_id, upload_id, current_user)
+    await delete_upload_session(db, session)
+    return Response(status_code=204)
+
+
+# Direct transfers: the client PUTs the bytes on a signed storage URL (S3 or /api/files) bound to the
+# declared size and SHA-256, then calls /direct/complete. The API never sees the file body.
+
+def _require_direct_transfers() -> None:
+    if not settings.direct_transfers_enabled:
+        raise HTTPException(status_code=404, detail="Direct transfers are disabled")
+
+
+def _ticket(current_user: CurrentUser, payload: DirectUploadRequest, **kwargs) -> DirectUploadTicket:
+    try:
+        return DirectUploadTicket(
+            **issue_upload(current_user, payload.filename, payload.content_type, payload.size, payload.sha256, **kwargs)
+        )
+    except ValueError:
+        raise HTTPException(status_code=422, detail="sha256 must be a hex SHA-256 digest")
+
+
+@router.post("/upload/direct", response_model=DirectUploadTicket, status_code=status.HTTP_201_CREATED)
+async def start_direct_upload(
+    payload: DirectDocumentUploadRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+) -> DirectUploadTicket:
+    _require_direct_transfers()
+    metadata = {
+        "title": payload.title.strip(),
+        "description": payload.description,
+        "tags": payload.tags,
+        "permission_department_ids": payload.permission_department_ids,
+    }
+    return _ticket(current_user, payload, metadata=metadata)
+
+
+@router.post("/{document_id}/version/direct", response_model=DirectUploadTicket, status_code=status.HTTP_201_CREATED)
+async def start_direct_version_upload(
+    document_id: int,
+    payload: DirectUploadRequest,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> DirectUploadTicket:
+    _require_direct_transfers()
+    doc = await get_document_or_404(db, document_id)
+    if not can_upload_new_version(doc, current_user):
+        raise HTTPException(status_code=403, detail="Not allowed to upload a new version")
+    return _ticket(current_user, payload, document_id=doc.id)
+
+
+@router.post("/direct/complete", response_model=DirectUploadResult, status_code=status.HTTP_201_CREATED)
+async def complete_direct_upload(
+    payload: DirectUploadComplete,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> DirectUploadResult:
+    _require_direct_transfers()
+    try:
+        claims = read_upload_token(payload.upload_token, current_user)
+        staged = await run_in_threadpool(received_file, claims)
+    except ValueError as e:
+        code = str(e)
+        if code == "forbidden":
+            raise HTTPException(status_code=403, detail="Upload belongs to another user")
+        if code == "missing":
+            raise HTTPException(status_code=409, detail="Nothing was uploaded for this token (or it was already completed)")
+        if code == "size_mismatch":
+            raise HTTPException(status_code=409, detail="Uploaded size does not match the declared size")
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+
+    if claims.get("doc"):
+        doc = await get_document_or_404(db, claims["doc"])
+        # permissions may have changed since the URL was issued
+        if not can_upload_new_version(doc, current_user):
+            raise HTTPException(status_code=403, detail="Not allowed to upload a new version")
+        v = await add_new_version(db, doc, current_user, staged)
+        if settings.storage_deltas:
+            background_tasks.add_task(encode_superseded_in_background, doc.id)
+    else:
+        meta = claims.get("meta") or {}
+        doc, v, _ = await create_document_with_v1(
+            db=db,
+            current_user=current_user,
+            title=meta.get("title"),
+            description=meta.get("description") or None,
+            tag_names=[t.strip() for t in meta.get("tags") or [] if t.strip()],
+            permitted_department_ids=meta.get("permission_department_ids") or [],
+            staged=staged,
+        )
+    background_tasks.add_task(extract_version_in_background, v.id)
+    return DirectUploadResult(document_id=doc.id, version=_version_info(v))
+
+
 @router.put("/{document_id}", response_model=DocumentDetail)
-def update_document_metadata(
+async def update_document_metadata(
     document_id: int,
     payload: DocumentUpdateRequest,
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_dep),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> DocumentDetail:
-    doc = get_document_or_404(db, document_id)
+    doc = await get_document_or_404(db, document_id, selectinload(Document.tags))
     # safest: owner-only edits of metadata/permissions
     if doc.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the owner can update document metadata")
 
-    replace_document_metadata(
+    await replace_document_metadata(
         db,
         doc,
         title=payload.title,
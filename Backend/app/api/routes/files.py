@@ -0,0 +1,75 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.compression import encoding_of
+from app.core.files import INCOMING_PREFIX, StagingWriter, open_blob
+from app.core.http import accepts_encoding, content_disposition
+from app.core.storage import StorageError, get_storage, verify_local_signature
+
+router = APIRouter(prefix="/api/files", tags=["files"])
+
+
+@router.get("/{key:path}")
+def get_signed_file(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    sig: str = Query(...),
+    filename: Optional[str] = Query(default=None),
+    content_type: Optional[str] = Query(default=None),
+):
+    """
+    Short-lived signed URLs issued by LocalStorageBackend.presign; no session or JWT needed.
+    """
+    if not verify_local_signature(key, "GET", expires, sig, filename=filename or "", content_type=content_type or ""):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+    storage = get_storage()
+    try:
+        size = storage.size(key)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File not found")
+    media_type = content_type or "application/octet-stream"
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename)
+    encoding = encoding_of(key)
+    if encoding and not accepts_encoding(request.headers, encoding):
+        return StreamingResponse(open_blob(key), media_type=media_type, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(storage.open_stream(key), media_type=media_type, headers=headers)
+
+
+@router.put("/{key:path}")
+async def put_signed_file(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    sig: str = Query(...),
+    sha256: str = Query(...),
+    length: int = Query(...),
+):
+    """
+    Local counterpart of a presigned S3 PUT: the body must match the signed length and SHA-256,
+    otherwise nothing is stored.
+    """
+    if not key.startswith(INCOMING_PREFIX) or not verify_local_signature(key, "PUT", expires, sig, sha256, str(length)):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+    writer = await StagingWriter(key.rsplit("/", 1)[-1], None).open()
+    try:
+        async for chunk in request.stream():
+            if writer.size + len(chunk) > length:
+                raise HTTPException(status_code=413, detail="Body exceeds the signed length")
+            await writer.write(chunk)
+    except BaseException:
+        await writer.abort()
+        raise
+    staged = await writer.close()
+    if staged.size != length or staged.sha256 != sha256:
+        staged.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Body does not match the signed length and SHA-256")
+    await run_in_threadpool(get_storage().put_file, key, staged.path)
+    return Response(status_code=200, headers={"ETag": f'"{staged.sha256}"'})
@@ -1,23 +1,42 @@
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.api.deps import get_db_dep, get_current_user
-from app.models.department import Department
-from app.models.document import Tag
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_read_db_dep, get_current_reader
+from app.core.http import is_not_modified
+from app.core.settings import settings
+from app.services import reference
+from app.services.reference import Snapshot
 
 router = APIRouter(prefix="/api", tags=["reference"])
 
 
+def _cached_list(request: Request, snapshot: Snapshot, cache_control: str) -> Response:
+    # no-cache: clients keep the list but revalidate it, which costs a 304 from memory
+    headers = {"ETag": snapshot.etag, "Cache-Control": cache_control}
+    if is_not_modified(request.headers, snapshot.etag, None):
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+
 @router.get("/departments")
-def list_departments(db: Session = Depends(get_db_dep)):
-    rows = db.query(Department).order_by(Department.name.asc()).all()
-    return [{"id": d.id, "name": d.name} for d in rows]
+async def list_departments(request: Request, db: AsyncSession = Depends(get_read_db_dep)):
+    return _cached_list(request, await reference.departments(db), "public, no-cache")
 
 
 @router.get("/tags")
-def list_tags(
-    db: Session = Depends(get_db_dep),
-    user=Depends(get_current_user),
+async def list_tags(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db_dep),
+    user=Depends(get_current_reader),
+):
+    return _cached_list(request, await reference.tags(db), "private, no-cache")
+
+
+@router.get("/tags/autocomplete")
+async def autocomplete_tags(
+    prefix: str = Query(default="", max_length=50, description="Case-insensitive start of the tag name"),
+    limit: int = Query(default=10, ge=1),
+    db: AsyncSession = Depends(get_read_db_dep),
+    user=Depends(get_current_reader),
 ):
-    rows = db.query(Tag).order_by(Tag.name.asc()).all()
-    return [{"id": t.id, "name": t.name} for t in rows]
\ No newline at end of file
+    """Tags starting with `prefix`, most used first, with the number of documents carrying each."""
+    return await reference.autocomplete_tags(db, prefix.strip(), min(limit, settings.tag_autocomplete_max))
@@ -1,26 +1,43 @@
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.api.deps import get_db_dep, get_current_user
-from app.models.user import User
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.api.deps import CurrentUser, get_read_db_dep, get_current_reader
+from app.core.settings import settings
 from app.models.document import Document
-from app.schemas.documents import DocumentSummary
+from app.schemas.documents import DocumentSummary, DocumentPage
+from app.services.pagination import paginate_documents
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
-@router.get("/me/documents", response_model=List[DocumentSummary])
-def my_documents(
-    db: Session = Depends(get_db_dep),
-    current_user: User = Depends(get_current_user),
-) -> List[DocumentSummary]:
-    docs = db.query(Document).filter(Document.owner_id == current_user.id).order_by(Document.updated_at.desc()).all()
-    return [
-        DocumentSummary(
-            id=d.id,
-            title=d.title,
-            current_version_number=d.current_version_number,
-            tags=[t.name for t in d.tags],
-            updated_at=d.updated_at.isoformat() if d.updated_at else None,
-        )
-        for d in docs
-    ]
\ No newline at end of file
+@router.get("/me/documents", response_model=DocumentPage)
+async def my_documents(
+    limit: int = Query(default=settings.page_size_default, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db_dep),
+    current_user: CurrentUser = Depends(get_current_reader),
+) -> DocumentPage:
+    q = (
+        select(Document)
+        .options(selectinload(Document.tags))
+        .where(Document.owner_id == current_user.id)
+    )
+    try:
+        docs, next_cursor = await paginate_documents(db, q, min(limit, settings.page_size_max), cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return DocumentPage(
+        items=[
+            DocumentSummary(
+                id=d.id,
+                title=d.title,
+                current_version_number=d.current_version_number,
+                tags=[t.name for t in d.tags],
+                updated_at=d.updated_at.isoformat() if d.updated_at else None,
+            )
+            for d in docs
+        ],
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,129 @@
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from app.core.settings import settings
+
+try:
+    import zstandard  # optional; STORAGE_COMPRESSION=zstd needs it, and so does reading .zst blobs
+except ImportError:
+    zstandard = None
+
+ZSTD = "zstd"
+ZSTD_SUFFIX = ".zst"  # blobs/ab/cd/<sha256>.zst holds the compressed bytes of <sha256>
+
+# already compressed containers/media: not worth sampling
+INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/")
+INCOMPRESSIBLE_TYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/zstd",
+    "application/pdf",  # streams inside are usually deflated already
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/vnd.oasis.opendocument.text",
+    "application/vnd.oasis.opendocument.spreadsheet",
+    "application/vnd.oasis.opendocument.presentation",
+}
+COMPRESSIBLE_IMAGES = {"image/svg+xml", "image/bmp", "image/tiff"}
+SAMPLE_BYTES = 64 * 1024
+_CHUNK = 1024 * 1024
+
+
+class CodecUnavailable(Exception):
+    pass
+
+
+def encoding_of(key: str) -> Optional[str]:
+    """Content-Encoding of the bytes stored under `key`; None for identity."""
+    return ZSTD if key.endswith(ZSTD_SUFFIX) else None
+
+
+def _compressor():
+    return zstandard.ZstdCompressor(level=settings.compression_level)
+
+
+def _sample(path: Path, size: int) -> bytes:
+    """Up to three SAMPLE_BYTES windows: start, middle and end of the file."""
+    with path.open("rb") as f:
+        if size <= 3 * SAMPLE_BYTES:
+            return f.read()
+        parts = []
+        for offset in (0, size // 2 - SAMPLE_BYTES // 2, size - SAMPLE_BYTES):
+            f.seek(offset)
+            parts.append(f.read(SAMPLE_BYTES))
+        return b"".join(parts)
+
+
+def choose_encoding(path: Path, content_type: Optional[str], size: int) -> Optional[str]:
+    """zstd when compression is enabled, the type is not a known compressed format and a sample shrinks enough."""
+    if settings.storage_compression != ZSTD or zstandard is None or size < settings.compression_min_bytes:
+        return None
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime in INCOMPRESSIBLE_TYPES or (mime.startswith(INCOMPRESSIBLE_PREFIXES) and mime not in COMPRESSIBLE_IMAGES):
+        return None
+    sample = _sample(path, size)
+    if not sample or len(_compressor().compress(sample)) > settings.compression_max_ratio * len(sample):
+        return None
+    return ZSTD
+
+
+def compress_file(src: Path, dst: Path) -> int:
+    """Returns: compressed size"""
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        _compressor().copy_stream(fin, fout, size=src.stat().st_size, read_size=_CHUNK, write_size=_CHUNK)
+        fout.flush()
+        os.fsync(fout.fileno())
+    return dst.stat().st_size
+
+
+def decompress_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if zstandard is None:
+        raise CodecUnavailable("zstandard is not installed; it is needed to read .zst blobs")
+    decoder = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        out = decoder.decompress(chunk)
+        if out:
+            yield out
+
+
+def skip_to_range(chunks: Iterator[bytes], start: int, end: int) -> Iterator[bytes]:
+    """Bytes start..end (inclusive) of a decoded stream, which can only be read from the beginning."""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(0, start - position):end + 1 - position]
+        if chunk_end > end:
+            return
+        position = chunk_end
+
+
+def measure_cpu(stored_chunks: Iterator[bytes]) -> Tuple[int, float, float]:
+    """
+    Decompresses one stored zstd blob and compresses it again at COMPRESSION_LEVEL, timing only the codec calls.
+    Returns: (original bytes, decompress seconds, compress seconds)
+    """
+    if zstandard is None:
+        raise CodecUnavailable("zstandard is not installed")
+    decoder = zstandard.ZstdDecompressor().decompressobj()
+    encoder = _compressor().compressobj()
+    size, decode_s, encode_s = 0, 0.0, 0.0
+    for chunk in stored_chunks:
+        started = time.perf_counter()
+        out = decoder.decompress(chunk)
+        decoded = time.perf_counter()
+        encoder.compress(out)
+        encode_s += time.perf_counter() - decoded
+        decode_s += decoded - started
+        size += len(out)
+    started = time.perf_counter()
+    encoder.flush()
+    return size, decode_s, encode_s + time.perf_counter() - started
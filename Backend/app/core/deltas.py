@@ -0,0 +1,134 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core import metrics
+from app.core.compression import ZSTD_SUFFIX
+from app.core.files import DELTA_SUFFIX, blob_key, open_blob
+from app.core.settings import settings
+from app.core.storage import StorageError, get_storage
+
+try:
+    import bsdiff4  # optional; STORAGE_DELTAS=true needs it, and so does reading .bsdiff blobs
+except ImportError:
+    bsdiff4 = None
+
+# reconstructed originals, named by sha256; shared by every worker on the machine, trimmed oldest-first
+CACHE_DIR = Path(settings.delta_cache_dir) if settings.delta_cache_dir else Path(settings.storage_root) / ".delta-cache"
+
+# a delta object is b"bsdiff4 base=<sha256>\n" + the bsdiff4 patch that turns the base's original bytes into ours
+_MAGIC = b"bsdiff4 base="
+
+
+class DeltaUnavailable(Exception):
+    pass
+
+
+def _require_bsdiff() -> None:
+    if bsdiff4 is None:
+        raise DeltaUnavailable("bsdiff4 is not installed; it is needed to read and write .bsdiff blobs")
+
+
+def sha_of(key: str) -> str:
+    return key.rsplit("/", 1)[-1].split(".", 1)[0]
+
+
+def stored_key(sha256: str) -> str:
+    """Where blob `sha256` currently lives: whole, compressed or as a delta."""
+    storage = get_storage()
+    key = blob_key(sha256)
+    for candidate in (key, key + ZSTD_SUFFIX, key + DELTA_SUFFIX):
+        if storage.exists(candidate):
+            return candidate
+    raise StorageError(f"Not found: blob {sha256}")
+
+
+def encode(base_sha256: str, base: bytes, target: bytes) -> bytes:
+    _require_bsdiff()
+    return _MAGIC + base_sha256.encode() + b"\n" + bsdiff4.diff(base, target)
+
+
+def _decode(raw: bytes) -> Tuple[str, bytes]:
+    header, _, patch = raw.partition(b"\n")
+    if not header.startswith(_MAGIC):
+        raise StorageError("Not a delta object")
+    return header[len(_MAGIC):].decode(), patch
+
+
+def _cache_get(sha256: str) -> Optional[Path]:
+    path = CACHE_DIR / sha256
+    try:
+        os.utime(path)  # recently used: trimmed last
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _cache_put(sha256: str, data: bytes) -> Path:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / sha256
+    tmp = CACHE_DIR / f".{uuid.uuid4().hex}"
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    _trim_cache()
+    return path
+
+
+def _trim_cache() -> None:
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    limit = settings.delta_cache_mb * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        Path(path).unlink(missing_ok=True)  # open readers keep their handle
+        total -= size
+
+
+def original_bytes(sha256: str, retry: bool = True, cache: bool = True) -> bytes:
+    """Original bytes of any blob, walking its delta chain (intermediate results are cached too)."""
+    cached = _cache_get(sha256) if cache else None
+    if cached is not None:
+        try:
+            return cached.read_bytes()
+        except FileNotFoundError:
+            pass  # trimmed meanwhile
+    key = stored_key(sha256)
+    delta = key.endswith(DELTA_SUFFIX)
+    try:
+        raw = b"".join(get_storage().open_stream(key) if delta else open_blob(key))
+    except Exception:
+        if not retry:
+            raise
+        return original_bytes(sha256, retry=False, cache=cache)  # re-encoded between the lookup and the read
+    if not delta:
+        return raw
+    _require_bsdiff()
+    base_sha256, patch = _decode(raw)
+    data = bsdiff4.patch(original_bytes(base_sha256, cache=cache), patch)
+    if cache:
+        _cache_put(sha256, data)
+    return data
+
+
+def reconstructed_path(key: str) -> Path:
+    """Local file with the original bytes of the delta-stored version `key` (from the shared cache)."""
+    sha256 = sha_of(key)
+    path = _cache_get(sha256)
+    if path is not None:
+        metrics.inc("delta.cache_hits")
+        return path
+    metrics.inc("delta.cache_misses")
+    started = time.perf_counter()
+    data = original_bytes(sha256)
+    metrics.inc("delta.reconstructions")
+    metrics.inc("delta.reconstruct_seconds", time.perf_counter() - started)
+    return _cache_get(sha256) or _cache_put(sha256, data)
@@ -1,42 +1,283 @@
+import fcntl
+import hashlib
 import os
+import tempfile
+import time
 import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
-from fastapi import UploadFile
+from typing import AsyncIterator, Iterator, Optional
+
+import anyio
+
+from app.core import metrics
+from app.core.compression import (
+    ZSTD,
+    ZSTD_SUFFIX,
+    choose_encoding,
+    compress_file,
+    decompress_stream,
+    encoding_of,
+    skip_to_range,
+)
+from app.core.settings import settings
+from app.core.storage import get_storage
+
+STORAGE_ROOT = Path(settings.storage_root)
+# same filesystem as the local backend root, so promotion is a rename
+STAGING_DIR = Path(settings.storage_staging_dir) if settings.storage_staging_dir else STORAGE_ROOT / ".staging"
+SESSION_DIR = STAGING_DIR / "sessions"  # resumable uploads in progress
+BLOB_PREFIX = "blobs/"  # content-addressed: blobs/ab/cd/<sha256>
+INCOMING_PREFIX = "incoming/"  # direct uploads written by clients on signed URLs, awaiting completion
+DELTA_SUFFIX = ".bsdiff"  # blobs/ab/cd/<sha256>.bsdiff: superseded version stored as a delta (app.core.deltas)
+_CHUNK = 1024 * 1024
+
+
+@dataclass
+class StagedFile:
+    path: Optional[Path]
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    storage_key: Optional[str] = None  # set instead of path when the bytes are already in the backend
 
-STORAGE_ROOT = Path("storage")
 
 def ensure_storage_root() -> None:
     STORAGE_ROOT.mkdir(parents=True, exist_ok=True)
 
-def build_document_dir(document_id:int) -> Path:
-    ensure_storage_root()
-    doc_dir = STORAGE_ROOT / f"doc_{document_id}"
-    doc_dir.mkdir(parents=True, exist_ok=True)
-    return doc_dir
-
-def save_upload_for_version(document_id: int, version_number: int, file: UploadFile) -> Tuple[str, int, str]:
-    """
-    Saves the uploaded file under storage/doc_{document_id}/v{version}_{random}_{original_name}
-    Returns: (file_path, file_size_bytes, mime_type)
-    """
-    doc_dir = build_document_dir(document_id)
-    safe_name = file.filename or "file"
-    unique = uuid.uuid4().hex[:8]
-    target = doc_dir / f"v{version_number}_{unique}_{safe_name}"
-    # stream to disk
-    with target.open("wb") as out:
-        while True:
-            chunk = file.file.read(1024 * 1024)
+
+class StagingWriter:
+    """
+    Async writer for one incoming file: bytes go to storage/.staging while size and SHA-256
+    are computed on the fly. Each write only borrows a worker thread for the duration of that chunk.
+    """
+
+    def __init__(self, filename: Optional[str], content_type: Optional[str]):
+        self.filename = os.path.basename(filename or "") or "file"
+        self.content_type = content_type or "application/octet-stream"
+        self.path = STAGING_DIR / uuid.uuid4().hex
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = None
+
+    async def open(self) -> "StagingWriter":
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        self._file = await anyio.open_file(self.path, "wb")
+        return self
+
+    async def write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self.size += len(data)
+        started = time.perf_counter()
+        await self._file.write(data)
+        metrics.inc("staging.write_seconds", time.perf_counter() - started)
+        metrics.inc("staging.write_bytes", len(data))
+
+    async def close(self) -> StagedFile:
+        await self._file.flush()
+        await anyio.to_thread.run_sync(os.fsync, self._file.wrapped.fileno())
+        await self._file.aclose()
+        return StagedFile(
+            path=self.path,
+            filename=self.filename,
+            content_type=self.content_type,
+            size=self.size,
+            sha256=self._hash.hexdigest(),
+        )
+
+    async def abort(self) -> None:
+        if self._file is not None:
+            await self._file.aclose()
+        self.path.unlink(missing_ok=True)
+
+
+async def stage_stream(chunks: AsyncIterator[bytes], filename: Optional[str], content_type: Optional[str]) -> StagedFile:
+    writer = await StagingWriter(filename, content_type).open()
+    try:
+        async for chunk in chunks:
+            await writer.write(chunk)
+    except BaseException:
+        await writer.abort()
+        raise
+    return await writer.close()
+
+
+def session_path(upload_id: str) -> Path:
+    return SESSION_DIR / upload_id
+
+
+def create_session_file(upload_id: str) -> None:
+    SESSION_DIR.mkdir(parents=True, exist_ok=True)
+    session_path(upload_id).touch()
+
+
+def session_offset(upload_id: str) -> int:
+    try:
+        return session_path(upload_id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+async def append_to_session(upload_id: str, offset: int, chunks: AsyncIterator[bytes], limit: Optional[int]) -> int:
+    """
+    Appends a chunk stream at `offset`, which must equal the bytes already received.
+    Whatever arrives before a disconnect is kept, so the client resumes from the new offset.
+    Returns: new offset
+    """
+    f = await anyio.open_file(session_path(upload_id), "ab")
+    try:
+        fd = f.wrapped.fileno()
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)  # released on close
+        except BlockingIOError:
+            raise ValueError("busy")
+        current = os.fstat(fd).st_size
+        if current != offset:
+            raise ValueError("offset_mismatch")
+        try:
+            async for chunk in chunks:
+                if limit is not None and current + len(chunk) > limit:
+                    raise ValueError("too_large")
+                await f.write(chunk)
+                current += len(chunk)
+        finally:
+            await f.flush()
+            await anyio.to_thread.run_sync(os.fsync, fd)
+        return current
+    finally:
+        await f.aclose()
+
+
+def stage_session_file(upload_id: str, filename: str, content_type: Optional[str]) -> StagedFile:
+    """Hashes a finished session file (blocking; run in the threadpool) and hands it over as a staged upload."""
+    path = session_path(upload_id)
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return StagedFile(
+        path=path,
+        filename=os.path.basename(filename) or "file",
+        content_type=content_type or "application/octet-stream",
+        size=path.stat().st_size,
+        sha256=h.hexdigest(),
+    )
+
+
+def blob_key(sha256: str) -> str:
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def place_blob(staged: StagedFile, reuse_existing: bool = True) -> str:
+    """
+    Hands a staged upload to the storage backend as blobs/ab/cd/<sha256>, unless identical bytes are already stored.
+    Compressible files are stored zstd-compressed as blobs/ab/cd/<sha256>.zst (see app.core.compression).
+    Returns: storage key (stored in DocumentVersion.file_path)
+    """
+    storage = get_storage()
+    key = blob_key(staged.sha256)
+    for existing in (key, key + ZSTD_SUFFIX, key + DELTA_SUFFIX) if reuse_existing else ():
+        if storage.exists(existing):
+            discard_staged(staged)
+            return existing
+    if staged.storage_key:
+        storage.move(staged.storage_key, key)
+        return key
+    if choose_encoding(staged.path, staged.content_type, staged.size) == ZSTD:
+        packed = staged.path.with_name(staged.path.name + ZSTD_SUFFIX)
+        started = time.perf_counter()
+        try:
+            packed_size = compress_file(staged.path, packed)
+            metrics.inc("compression.seconds", time.perf_counter() - started)
+            metrics.inc("compression.bytes_in", staged.size)
+            metrics.inc("compression.bytes_out", packed_size)
+            with metrics.timed("storage.put_seconds"):
+                storage.put_file(key + ZSTD_SUFFIX, packed, staged.content_type)
+            metrics.inc("storage.put_bytes", packed_size)
+        finally:
+            packed.unlink(missing_ok=True)
+        discard_staged(staged)
+        return key + ZSTD_SUFFIX
+    with metrics.timed("storage.put_seconds"):
+        storage.put_file(key, staged.path, staged.content_type)
+    metrics.inc("storage.put_bytes", staged.size)
+    return key
+
+
+def stored_verbatim(key: str) -> bool:
+    """Whether the object under `key` holds the version's bytes exactly as uploaded."""
+    return not encoding_of(key) and not key.endswith(DELTA_SUFFIX)
+
+
+def _read_file(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    remaining = None if end is None else end - start + 1
+    with path.open("rb") as f:
+        f.seek(start)
+        while remaining is None or remaining > 0:
+            chunk = f.read(_CHUNK if remaining is None else min(_CHUNK, remaining))
             if not chunk:
                 break
-            out.write(chunk)
-    # reset stream position for safety
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def open_blob(key: str) -> Iterator[bytes]:
+    """
+    Original bytes of a stored version: decompressed on the fly, or rebuilt from its delta chain.
+    Nothing is read until iteration starts, so it can be handed to a streaming response as is.
+    """
+    if key.endswith(DELTA_SUFFIX):
+        from app.core.deltas import reconstructed_path
+
+        yield from _read_file(reconstructed_path(key))
+        return
+    chunks = get_storage().open_stream(key)
+    yield from (decompress_stream(chunks) if encoding_of(key) else chunks)
+
+
+def open_blob_range(key: str, start: int, end: int) -> Iterator[bytes]:
+    """Bytes start..end (inclusive) of the original version."""
+    if key.endswith(DELTA_SUFFIX):
+        from app.core.deltas import reconstructed_path
+
+        yield from _read_file(reconstructed_path(key), start, end)
+    elif encoding_of(key):
+        yield from skip_to_range(open_blob(key), start, end)
+    else:
+        yield from get_storage().open_range(key, start, end)
+
+
+@contextmanager
+def local_blob_copy(key: str) -> Iterator[Path]:
+    """storage.local_copy with the original bytes (a decoded temp file for compressed blobs)."""
+    if key.endswith(DELTA_SUFFIX):
+        from app.core.deltas import reconstructed_path
+
+        yield reconstructed_path(key)
+        return
+    if not encoding_of(key):
+        with get_storage().local_copy(key) as path:
+            yield path
+        return
+    fd, tmp = tempfile.mkstemp(prefix="docrepo-")
     try:
-        file.file.seek(0)
-    except Exception:
-        pass
-    size = target.stat().st_size
-    mime = file.content_type or "application/octet-stream"
-    return (str(target.resolve()), size, mime)
+        with os.fdopen(fd, "wb") as out:
+            for chunk in open_blob(key):
+                out.write(chunk)
+        yield Path(tmp)
+    finally:
+        os.unlink(tmp)
+
+
+def discard_staged(staged: StagedFile) -> None:
+    if staged.storage_key:
+        get_storage().delete(staged.storage_key)
+    else:
+        staged.path.unlink(missing_ok=True)
+
 
+def incoming_key() -> str:
+    return f"{INCOMING_PREFIX}{uuid.uuid4().hex}"
@@ -0,0 +1,200 @@
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    # RFC 6266: plain filename= for ASCII names, filename*= for everything else
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def http_date(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _etag_in(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 13.2.2: If-None-Match wins over If-Modified-Since when both are sent."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_in(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def accepts_encoding(headers: Headers, coding: str) -> bool:
+    """Whether Accept-Encoding allows `coding` (listed with q > 0, or covered by a non-zero *)."""
+    wildcard = False
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == coding:
+            return q > 0
+        if name == "*":
+            wildcard = q > 0
+    return wildcard
+
+
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses `Range: bytes=...` into inclusive (start, end) pairs, sorted and merged.
+    Returns None when the header is absent or malformed (serve the whole entity);
+    raises RangeNotSatisfiable when no range overlaps the entity.
+    """
+    if not header or not header.strip().lower().startswith("bytes="):
+        return None
+    ranges: List[Tuple[int, int]] = []
+    for spec in header.strip()[6:].split(","):
+        spec = spec.strip()
+        if "-" not in spec:
+            return None
+        first, last = spec.split("-", 1)
+        try:
+            if first == "":
+                suffix = int(last)  # bytes=-N: the last N bytes
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+    if not ranges:
+        raise RangeNotSatisfiable()
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def if_range_allows(headers: Headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-Range: honour Range only if the client's validator still matches (strong comparison)."""
+    value = headers.get("if-range")
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        return not value.startswith("W/") and value == etag
+    since = _parse_http_date(value)
+    if since is None or last_modified is None:
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) == since
+
+
+def ranged_response(
+    headers: Headers,
+    size: int,
+    open_stream: Callable[[], Iterator[bytes]],
+    open_range: Callable[[int, int], Iterator[bytes]],
+    media_type: str,
+    response_headers: Dict[str, str],
+    validators: Tuple[str, Optional[datetime]],
+) -> Response:
+    """
+    200, 206 (single range or multipart/byteranges) or 416 for an entity of `size` bytes.
+    `validators` is (etag, last_modified) for If-Range.
+    """
+    response_headers = {**response_headers, "Accept-Ranges": "bytes"}
+    try:
+        ranges = parse_range(headers.get("range"), size) if if_range_allows(headers, *validators) else None
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{size}"})
+
+    if not ranges:
+        return StreamingResponse(
+            open_stream(), media_type=media_type, headers={**response_headers, "Content-Length": str(size)}
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return StreamingResponse(
+            open_range(start, end),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **response_headers,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    boundary = uuid.uuid4().hex
+    part_heads = [
+        f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {s}-{e}/{size}\r\n\r\n".encode()
+        for s, e in ranges
+    ]
+    tail = f"--{boundary}--\r\n".encode()
+    length = sum(len(h) + (e - s + 1) + 2 for h, (s, e) in zip(part_heads, ranges)) + len(tail)
+
+    def body() -> Iterator[bytes]:
+        for head, (start, end) in zip(part_heads, ranges):
+            yield head
+            yield from open_range(start, end)
+            yield b"\r\n"
+        yield tail
+
+    return StreamingResponse(
+        body(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**response_headers, "Content-Length": str(length)},
+    )
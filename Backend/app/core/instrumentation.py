@@ -0,0 +1,97 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core import metrics
+
+# transfers smaller than this say more about latency than throughput
+THROUGHPUT_MIN_BYTES = 1024 * 1024
+
+
+@dataclass
+class RequestStats:
+    """Work done on behalf of the current request; filled in by the SQL hooks in app.db.instrumentation."""
+
+    sql_queries: int = 0
+    sql_seconds: float = 0.0
+
+
+_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _stats.get()
+
+
+def _route(scope) -> str:
+    route = scope.get("route")  # set by FastAPI once a route matched; the template keeps label values few
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """
+    Per-route latency, status, SQL and byte metrics. Plain ASGI rather than BaseHTTPMiddleware, so
+    streamed bodies pass through untouched. A request is measured up to its last response byte;
+    background tasks that run afterwards are not part of it. Given `started`, the time from then
+    until this worker finished its first request is kept as startup.first_request_seconds.
+    """
+
+    def __init__(self, app, started: Optional[float] = None):
+        self.app = app
+        self.started = started  # perf_counter() when the worker began importing the app, if known
+        self.first_request_pending = started is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = time.perf_counter()
+        state = {"status": 500, "received": 0, "sent": 0, "done": False}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["sent"] += len(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                self._record(scope, state, stats, time.perf_counter() - started)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _stats.reset(token)
+            if not state["done"]:  # failed before the response finished
+                self._record(scope, state, stats, time.perf_counter() - started)
+
+    def _record(self, scope, state, stats: RequestStats, seconds: float) -> None:
+        state["done"] = True
+        if self.first_request_pending:
+            self.first_request_pending = False
+            metrics.set_gauge("startup.first_request_seconds", time.perf_counter() - self.started)
+        route = {"method": scope["method"], "route": _route(scope)}
+        metrics.inc("http.requests", labels={**route, "status": str(state["status"])})
+        metrics.observe("http.request_seconds", seconds, route)
+        metrics.observe("http.request_sql_queries", stats.sql_queries, route, buckets=metrics.COUNT_BUCKETS)
+        metrics.observe("http.request_sql_seconds", stats.sql_seconds, route)
+        for direction, n in (("in", state["received"]), ("out", state["sent"])):
+            if not n:
+                continue
+            metrics.inc("http.bytes", n, {**route, "direction": direction})
+            if n >= THROUGHPUT_MIN_BYTES and seconds > 0:
+                metrics.observe(
+                    "http.throughput_bytes_per_second",
+                    n / seconds,
+                    {**route, "direction": direction},
+                    buckets=metrics.THROUGHPUT_BUCKETS,
+                )
@@ -0,0 +1,145 @@
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# process-local counters, gauges and histograms; names are dotted, e.g. "acl_cache.hits".
+# Every worker process keeps its own, so scrape each worker (or run one per container).
+Labels = Optional[Dict[str, str]]
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+THROUGHPUT_BUCKETS = tuple(mb * 1024 * 1024 for mb in (1, 5, 10, 25, 50, 100, 250, 500, 1000))  # bytes/second
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PROMETHEUS_PREFIX = "docrepo_"
+
+_lock = threading.Lock()
+_counters: Dict[_Key, float] = defaultdict(float)
+_gauges: Dict[_Key, float] = {}
+_histograms: Dict[_Key, "_Histogram"] = {}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name: str, labels: Labels) -> _Key:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name: str, value: float = 1, labels: Labels = None) -> None:
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, labels: Labels = None) -> None:
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, labels: Labels = None, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+    """Records one value in a histogram; its buckets are fixed by the first observation."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+@contextmanager
+def timed(name: str, labels: Labels = None) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, labels)
+
+
+def _flat(key: _Key) -> str:
+    name, labels = key
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+def snapshot() -> Dict[str, float]:
+    with _lock:
+        out = {_flat(k): v for k, v in _counters.items()}
+        out.update({_flat(k): v for k, v in _gauges.items()})
+        for k, h in _histograms.items():
+            out[_flat((k[0] + ".count", k[1]))] = h.count
+            out[_flat((k[0] + ".sum", k[1]))] = h.sum
+        return out
+
+
+def _prom_name(name: str) -> str:
+    return PROMETHEUS_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _prom_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _prom_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus() -> str:
+    """Everything recorded in this process, in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted(
+            (k, (h.buckets, list(h.counts), h.sum, h.count)) for k, h in _histograms.items()
+        )
+    lines: List[str] = []
+    typed = set()
+
+    def header(name: str, kind: str) -> None:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        prom = _prom_name(name) + "_total"
+        header(prom, "counter")
+        lines.append(f"{prom}{_prom_labels(labels)} {_prom_value(value)}")
+    for (name, labels), value in gauges:
+        prom = _prom_name(name)
+        header(prom, "gauge")
+        lines.append(f"{prom}{_prom_labels(labels)} {_prom_value(value)}")
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        prom = _prom_name(name)
+        header(prom, "histogram")
+        cumulative = 0
+        for le, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{prom}_bucket{_prom_labels(labels, (('le', _prom_value(le)),))} {cumulative}")
+        lines.append(f"{prom}_bucket{_prom_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{prom}_sum{_prom_labels(labels)} {_prom_value(total)}")
+        lines.append(f"{prom}_count{_prom_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.settings import settings
+
+try:
+    from pyinstrument import Profiler  # optional; sampled profiles with PROFILING_SAMPLER=true
+except ImportError:
+    Profiler = None
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"  # send "1" to get a sampled profile of this request
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_LIST_RE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")  # IN (?, ?, ?) of any length
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with literals and bind parameters replaced by ?: N+1 loops repeat one shape."""
+    shape = _LITERAL_RE.sub("?", _PARAM_RE.sub("?", statement))
+    return _SPACE_RE.sub(" ", _LIST_RE.sub("(?...)", shape)).strip()
+
+
+@dataclass
+class QueryTrace:
+    statements: List[Tuple[str, float]] = field(default_factory=list)  # (SQL, seconds), in execution order
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(s for _, s in self.statements)
+
+    def repeated_shapes(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Shapes executed at least `threshold` times (PROFILING_N_PLUS_ONE_THRESHOLD by default)."""
+        threshold = threshold or settings.profiling_n_plus_one_threshold
+        shapes = Counter(statement_shape(sql) for sql, _ in self.statements)
+        return {shape: n for shape, n in shapes.most_common() if n >= threshold}
+
+
+_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+_captures: List[QueryTrace] = []  # open capture_queries() blocks, any thread
+_captures_lock = threading.Lock()
+
+
+def record(statement: str, seconds: float) -> None:
+    """Called for every executed statement (app.db.instrumentation); a no-op unless something is tracing."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.statements.append((statement, seconds))
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.statements.append((statement, seconds))
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryTrace]:
+    """
+    Every statement the process executes inside the block, whichever thread or request runs it.
+    For query budgets in tests:
+
+        with capture_queries() as trace:
+            client.get("/api/documents", headers=auth)
+        assert trace.count <= 4, trace.repeated_shapes(2)
+    """
+    trace = QueryTrace()
+    with _captures_lock:
+        _captures.append(trace)
+    try:
+        yield trace
+    finally:
+        with _captures_lock:
+            _captures.remove(trace)
+
+
+def _dump(name: str, suffix: str, content: str) -> Optional[Path]:
+    if not settings.profiling_dump_dir:
+        return None
+    directory = Path(settings.profiling_dump_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}{suffix}"
+    path.write_text(content)
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Development aid (PROFILING_ENABLED): traces every SQL statement of a request and reports it in
+    X-SQL-Queries / X-SQL-Time-Ms / X-SQL-Repeated response headers. Repeated statement shapes
+    (likely N+1 lazy loads) are logged. With PROFILING_DUMP_DIR the trace is written there as JSON, and
+    requests sent with "X-Profile: 1" also get a pyinstrument HTML profile there (PROFILING_SAMPLER,
+    needs pyinstrument), named in X-Profile-File.
+    Headers are set when the response starts, so statements run while a body streams are only in the dump.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        token = _trace.set(trace)
+        name = f"{time.time_ns() // 1_000_000}-{scope['method']}-{scope['path'].strip('/').replace('/', '_')}"
+        wants_profile = dict(scope["headers"]).get(PROFILE_HEADER.encode()) == b"1"
+        profiler = None
+        if wants_profile and settings.profiling_sampler and settings.profiling_dump_dir and Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-queries", str(trace.count).encode()))
+                headers.append((b"x-sql-time-ms", f"{trace.seconds * 1000:.1f}".encode()))
+                repeated = trace.repeated_shapes()
+                if repeated:
+                    headers.append((b"x-sql-repeated", str(max(repeated.values())).encode()))
+                if profiler is not None:
+                    headers.append((b"x-profile-file", f"{name}.html".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _trace.reset(token)
+            self._report(scope, name, trace, profiler)
+
+    @staticmethod
+    def _report(scope, name: str, trace: QueryTrace, profiler) -> None:
+        repeated = trace.repeated_shapes()
+        for shape, n in repeated.items():
+            log.warning("Possible N+1 in %s %s: %d x %s", scope["method"], scope["path"], n, shape[:300])
+        if profiler is not None:
+            profiler.stop()
+            _dump(name, ".html", profiler.output_html())
+        if settings.profiling_dump_dir and trace.count:
+            _dump(
+                name,
+                ".sql.json",
+                json.dumps(
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "queries": trace.count,
+                        "seconds": round(trace.seconds, 6),
+                        "repeated_shapes": repeated,
+                        "statements": [{"sql": sql, "ms": round(s * 1000, 3)} for sql, s in trace.statements],
+                    },
+                    indent=2,
+                ),
+            )
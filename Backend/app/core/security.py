@@ -1,19 +1,25 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional, Dict, Any
 
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 from app.core.settings import settings
 
-
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+# jose (with the cryptography backend) and passlib/bcrypt are imported on first use, not at worker startup
 ALGORITHM = "HS256"
 
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+
+
 def hash_password(plain_password:str) -> str:
-    return pwd_context.hash(plain_password)
+    return _pwd_context().hash(plain_password)
 
 def verify_password(plain_password: str, password_hash:str) -> bool:
-    return pwd_context.verify(plain_password, password_hash)
+    return _pwd_context().verify(plain_password, password_hash)
 
 
 def create_access_token(claims: Dict[str, Any], expires_minutes: Optional[int] = None) -> str:
@@ -24,11 +30,25 @@ def create_access_token(claims: Dict[str, Any], expires_minutes: Optional[int] =
     if "sub" in to_encode:
         to_encode["sub"] = str(to_encode["sub"])
     to_encode.update({"exp": expire, "iat": datetime.now(tz=timezone.utc)})
+    from jose import jwt
+
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
 def decode_token(token: str) -> Dict[str, Any]:
+    from jose import jwt, JWTError
+
     try:
         return jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM],  options={"verify_aud": False})
     except JWTError as e:
-        raise ValueError("Invalid token") from e
\ No newline at end of file
+        raise ValueError("Invalid token") from e
+
+
+def unverified_subject(token: str) -> Optional[int]:
+    """`sub` without checking the signature; only for decisions that don't grant access (e.g. DB routing)."""
+    from jose import jwt, JWTError
+
+    try:
+        return int(jwt.get_unverified_claims(token).get("sub"))
+    except (JWTError, TypeError, ValueError):
+        return None
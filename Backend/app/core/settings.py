@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,6 +13,85 @@ class Settings(BaseSettings):
     postgres_db: str = Field(default="siemens_repo", alias="POSTGRES_DB")
     postgres_host: str = Field(default="localhost", alias="POSTGRES_HOST")
     postgres_port: int = Field(default=5432, alias="POSTGRES_PORT")
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")  # per engine, per worker process
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")  # seconds to wait for a free connection
+    db_statement_timeout_ms: int = Field(default=30_000, alias="DB_STATEMENT_TIMEOUT_MS")  # API requests only
+    # read-only routes use these (SQLAlchemy URLs, e.g. postgresql+psycopg://user:pw@replica1:5432/db)
+    database_replica_urls: List[str] = Field(default=[], alias="DATABASE_REPLICA_URLS")
+    read_your_writes_seconds: int = Field(default=5, alias="READ_YOUR_WRITES_SECONDS")  # primary-only after a write
+    replica_max_lag_seconds: float = Field(default=10, alias="REPLICA_MAX_LAG_SECONDS")  # lagging replicas are skipped
+    replica_lag_check_seconds: float = Field(default=5, alias="REPLICA_LAG_CHECK_SECONDS")
+    health_timeout_seconds: float = Field(default=2, alias="HEALTH_TIMEOUT_SECONDS")  # per check of /health?ready=true
+
+    # development only: per-request SQL trace and N+1 warnings (app.core.profiling)
+    profiling_enabled: bool = Field(default=False, alias="PROFILING_ENABLED")
+    profiling_n_plus_one_threshold: int = Field(default=5, alias="PROFILING_N_PLUS_ONE_THRESHOLD")  # same-shape repeats
+    profiling_dump_dir: Optional[str] = Field(default=None, alias="PROFILING_DUMP_DIR")  # JSON traces (and profiles)
+    profiling_sampler: bool = Field(default=False, alias="PROFILING_SAMPLER")  # pyinstrument on "X-Profile: 1"
+
+    page_size_default: int = Field(default=50, alias="PAGE_SIZE_DEFAULT")
+    page_size_max: int = Field(default=200, alias="PAGE_SIZE_MAX")
+
+    search_config: str = Field(default="english", alias="SEARCH_CONFIG")  # Postgres text search configuration
+
+    extraction_workers: int = Field(default=2, alias="EXTRACTION_WORKERS")  # processes per API worker
+    extraction_max_chars: int = Field(default=500_000, alias="EXTRACTION_MAX_CHARS")
+
+    storage_backend: str = Field(default="local", alias="STORAGE_BACKEND")  # local | s3
+    storage_root: str = Field(default="storage", alias="STORAGE_ROOT")
+    storage_staging_dir: Optional[str] = Field(default=None, alias="STORAGE_STAGING_DIR")  # default: <root>/.staging
+    storage_url_ttl_seconds: int = Field(default=900, alias="STORAGE_URL_TTL_SECONDS")
+    public_base_url: str = Field(default="http://127.0.0.1:8000", alias="PUBLIC_BASE_URL")  # for signed local URLs
+    s3_bucket: str = Field(default="", alias="S3_BUCKET")
+    s3_prefix: str = Field(default="", alias="S3_PREFIX")
+    s3_endpoint_url: Optional[str] = Field(default=None, alias="S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+    s3_region: Optional[str] = Field(default=None, alias="S3_REGION")
+    s3_access_key_id: Optional[str] = Field(default=None, alias="S3_ACCESS_KEY_ID")
+    s3_secret_access_key: Optional[str] = Field(default=None, alias="S3_SECRET_ACCESS_KEY")
+    s3_multipart_threshold_mb: int = Field(default=64, alias="S3_MULTIPART_THRESHOLD_MB")
+    s3_multipart_chunk_mb: int = Field(default=16, alias="S3_MULTIPART_CHUNK_MB")
+    # off | zstd; applies to newly stored blobs
+    storage_compression: str = Field(default="off", alias="STORAGE_COMPRESSION")
+    compression_level: int = Field(default=3, alias="COMPRESSION_LEVEL")
+    compression_min_bytes: int = Field(default=4096, alias="COMPRESSION_MIN_BYTES")
+    compression_max_ratio: float = Field(default=0.9, alias="COMPRESSION_MAX_RATIO")  # sampled compressed/original
+    # superseded versions stored as bsdiff deltas against their successor
+    storage_deltas: bool = Field(default=False, alias="STORAGE_DELTAS")
+    # larger files stay whole. bsdiff holds both files and a suffix array in memory: budget ~17x DELTA_MAX_MB
+    # per delta worker (64 MB -> ~1.1 GB)
+    delta_max_mb: int = Field(default=64, alias="DELTA_MAX_MB")
+    delta_workers: int = Field(default=1, alias="DELTA_WORKERS")  # diffing processes per API worker / CLI run
+    delta_max_ratio: float = Field(default=0.5, alias="DELTA_MAX_RATIO")  # keep a delta only up to this fraction of the stored size
+    delta_max_chain: int = Field(default=8, alias="DELTA_MAX_CHAIN")  # the rebase job keeps chains this short
+    delta_cache_dir: Optional[str] = Field(default=None, alias="DELTA_CACHE_DIR")  # default: <root>/.delta-cache
+    delta_cache_mb: int = Field(default=1024, alias="DELTA_CACHE_MB")  # reconstructed versions, shared by workers
+
+    download_latest_max_age: int = Field(default=60, alias="DOWNLOAD_LATEST_MAX_AGE")  # seconds, for version=latest
+    download_cache_scope: str = Field(default="private", alias="DOWNLOAD_CACHE_SCOPE")  # private | public
+
+    upload_session_ttl_hours: int = Field(default=24, alias="UPLOAD_SESSION_TTL_HOURS")
+    # clients PUT/GET bytes on signed storage URLs; the API only authorizes and records metadata
+    direct_transfers_enabled: bool = Field(default=False, alias="DIRECT_TRANSFERS_ENABLED")
+
+    # POST /api/documents/bulk
+    bulk_max_items: int = Field(default=50_000, alias="BULK_MAX_ITEMS")
+    bulk_max_mb: int = Field(default=10_240, alias="BULK_MAX_MB")  # per ZIP upload, uncompressed
+    bulk_batch_size: int = Field(default=500, alias="BULK_BATCH_SIZE")  # documents per transaction
+    bulk_io_workers: int = Field(default=8, alias="BULK_IO_WORKERS")  # parallel file extraction / storage writes
+    export_max_documents: int = Field(default=10_000, alias="EXPORT_MAX_DOCUMENTS")  # GET /api/documents/export
+
+    # upper bound on staleness if a cross-process invalidation is missed
+    acl_cache_ttl_seconds: int = Field(default=300, alias="ACL_CACHE_TTL_SECONDS")
+    reference_cache_ttl_seconds: int = Field(default=300, alias="REFERENCE_CACHE_TTL_SECONDS")
+    tag_autocomplete_max: int = Field(default=50, alias="TAG_AUTOCOMPLETE_MAX")  # suggestions per request
+    tag_counts_ttl_seconds: int = Field(default=60, alias="TAG_COUNTS_TTL_SECONDS")  # autocomplete's documents per tag
+    search_facets_ttl_seconds: int = Field(default=30, alias="SEARCH_FACETS_TTL_SECONDS")
+    search_facets_cache_size: int = Field(default=1000, alias="SEARCH_FACETS_CACHE_SIZE")
+    search_facets_tags_max: int = Field(default=50, alias="SEARCH_FACETS_TAGS_MAX")  # most frequent tags returned
+    auth_cache_size: int = Field(default=10_000, alias="AUTH_CACHE_SIZE")
+    auth_cache_ttl_seconds: int = Field(default=60, alias="AUTH_CACHE_TTL_SECONDS")
+    auth_trust_claims: bool = Field(default=False, alias="AUTH_TRUST_CLAIMS")  # read-only routes skip the user lookup
 
     cors_origins: List[str] = Field(default=["http://localhost:5173", "http://localhost:3000"], alias="CORS_ORIGINS")
 
@@ -0,0 +1,365 @@
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from app.core.compression import encoding_of
+from app.core.settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageBackend(ABC):
+    """
+    Where version bytes live. Keys are relative, '/'-separated paths such as blobs/ab/cd/<sha256>.
+    All reads are chunked iterators so an object is never held in memory whole.
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        """Stores a local file under `key`; the local file is consumed (moved or deleted)."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def size(self, key: str) -> int: ...
+
+    @abstractmethod
+    def open_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]: ...
+
+    @abstractmethod
+    def open_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Bytes start..end inclusive."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        """Yields (key, size, mtime as epoch seconds)."""
+
+    @abstractmethod
+    def move(self, src_key: str, dst_key: str) -> None: ...
+
+    @abstractmethod
+    def presign(
+        self,
+        key: str,
+        method: str = "GET",
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+        content_sha256: Optional[str] = None,
+        content_length: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, str]]:
+        """
+        Short-lived URL for a direct GET or PUT that bypasses the API. For GET, `filename` and
+        `content_type` become the response's Content-Disposition and Content-Type.
+        For PUT, the declared SHA-256 (hex) and length are enforced by the storage side.
+        Returns: (url, headers the client must send with the request)
+        """
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path on this machine's filesystem if the backend has one, else None."""
+        return None
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        """A readable local file for `key` (e.g. for parsers that need seeking), removed afterwards."""
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+        fd, tmp = tempfile.mkstemp(prefix="docrepo-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in self.open_stream(key):
+                    out.write(chunk)
+            yield Path(tmp)
+        finally:
+            os.unlink(tmp)
+
+    def health(self) -> bool:
+        return True
+
+
+def sign_local_url(
+    key: str,
+    method: str,
+    expires_at: int,
+    content_sha256: str = "",
+    content_length: str = "",
+    filename: str = "",
+    content_type: str = "",
+) -> str:
+    # filename and content type are signed too: they become the response's Content-Disposition and Content-Type
+    msg = f"{method}\n{key}\n{expires_at}\n{content_sha256}\n{content_length}\n{filename}\n{content_type}".encode()
+    digest = hmac.new(settings.secret_key.encode(), msg, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def verify_local_signature(
+    key: str,
+    method: str,
+    expires_at: int,
+    signature: str,
+    content_sha256: str = "",
+    content_length: str = "",
+    filename: str = "",
+    content_type: str = "",
+) -> bool:
+    if expires_at < time.time():
+        return False
+    expected = sign_local_url(key, method, expires_at, content_sha256, content_length, filename, content_type)
+    return hmac.compare_digest(expected, signature)
+
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        # versions written before the backend abstraction stored absolute paths
+        if os.path.isabs(key):
+            return Path(key)
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise StorageError(f"Key escapes storage root: {key}")
+        return path
+
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:  # staging dir on another filesystem
+            shutil.move(str(path), str(target))
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            raise StorageError(f"Not found: {key}")
+
+    def open_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self._path(key).open("rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def open_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        remaining = end - start + 1
+        with self._path(key).open("rb") as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        base = self._path(prefix)
+        if not base.exists():
+            return
+        root = self.root.resolve()
+        for path in base.rglob("*"):
+            if path.is_file():
+                st = path.stat()
+                yield path.resolve().relative_to(root).as_posix(), st.st_size, st.st_mtime
+
+    def move(self, src_key: str, dst_key: str) -> None:
+        self.put_file(dst_key, self._path(src_key))
+
+    def presign(
+        self,
+        key: str,
+        method: str = "GET",
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+        content_sha256: Optional[str] = None,
+        content_length: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, str]]:
+        # served by app.api.routes.files; key must be relative to be addressable
+        expires_at = int(time.time()) + (expires_in or settings.storage_url_ttl_seconds)
+        sha, length = content_sha256 or "", "" if content_length is None else str(content_length)
+        signature = sign_local_url(key, method, expires_at, sha, length, filename or "", content_type or "")
+        params = {"expires": expires_at, "sig": signature}
+        if filename:
+            params["filename"] = filename
+        if content_type:
+            params["content_type"] = content_type
+        if sha:
+            params["sha256"] = sha
+        if length:
+            params["length"] = length
+        return f"{settings.public_base_url.rstrip('/')}/api/files/{quote(key)}?{urlencode(params)}", {}
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def health(self) -> bool:
+        return self.root.is_dir() and os.access(self.root, os.W_OK)
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 or any S3-compatible service (MinIO, moto server). Requires boto3."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", **client_kwargs):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise StorageError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", **{k: v for k, v in client_kwargs.items() if v})
+        # upload_file switches to parallel multipart above the threshold
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.s3_multipart_threshold_mb * 1024 * 1024,
+            multipart_chunksize=settings.s3_multipart_chunk_mb * 1024 * 1024,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(str(path), self.bucket, self._key(key), ExtraArgs=extra, Config=self.transfer_config)
+        os.unlink(path)
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise StorageError(f"Not found: {key}")
+        return head["ContentLength"]
+
+    def _iter_body(self, key: str, chunk_size: int, byte_range: Optional[str] = None) -> Iterator[bytes]:
+        kwargs = {"Bucket": self.bucket, "Key": self._key(key)}
+        if byte_range:
+            kwargs["Range"] = byte_range
+        body = self.client.get_object(**kwargs)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def open_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self._iter_body(key, chunk_size)
+
+    def open_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self._iter_body(key, chunk_size, f"bytes={start}-{end}")
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][strip:], obj["Size"], obj["LastModified"].timestamp()
+
+    def move(self, src_key: str, dst_key: str) -> None:
+        # managed copy: server-side, switches to multipart copy for objects over 5 GB
+        self.client.copy(
+            {"Bucket": self.bucket, "Key": self._key(src_key)}, self.bucket, self._key(dst_key), Config=self.transfer_config
+        )
+        self.delete(src_key)
+
+    def presign(
+        self,
+        key: str,
+        method: str = "GET",
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+        content_sha256: Optional[str] = None,
+        content_length: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, str]]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        headers: Dict[str, str] = {}
+        if filename and method == "GET":
+            params["ResponseContentDisposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        if content_type and method == "GET":
+            params["ResponseContentType"] = content_type
+        if method == "GET" and encoding_of(key):
+            params["ResponseContentEncoding"] = encoding_of(key)  # compressed blob, served as stored
+        if method == "PUT":
+            if content_sha256:
+                # S3 rejects the PUT unless the body matches this checksum
+                checksum = base64.b64encode(bytes.fromhex(content_sha256)).decode()
+                params["ChecksumSHA256"] = checksum
+                headers["x-amz-checksum-sha256"] = checksum
+            if content_length is not None:
+                params["ContentLength"] = content_length
+        url = self.client.generate_presigned_url(
+            "get_object" if method == "GET" else "put_object",
+            Params=params,
+            ExpiresIn=expires_in or settings.storage_url_ttl_seconds,
+        )
+        return url, headers
+
+    def health(self) -> bool:
+        self.client.head_bucket(Bucket=self.bucket)
+        return True
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    if settings.storage_backend == "s3":
+        return S3StorageBackend(
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+        )
+    if settings.storage_backend != "local":
+        raise StorageError(f"Unknown STORAGE_BACKEND: {settings.storage_backend}")
+    root = Path(settings.storage_root)
+    root.mkdir(parents=True, exist_ok=True)
+    return LocalStorageBackend(root)
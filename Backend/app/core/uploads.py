@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Tuple
+
+import multipart
+from multipart.multipart import parse_options_header
+from fastapi import HTTPException, Request
+
+from app.core.files import StagedFile, StagingWriter
+
+MAX_FIELD_BYTES = 64 * 1024
+MAX_FIELDS = 50
+
+# request body description for /docs, since these routes read the raw stream instead of Form()/File()
+def multipart_openapi(fields: Dict[str, str], required: List[str]) -> dict:
+    properties = {name: {"type": "string", "description": desc} for name, desc in fields.items()}
+    properties["file"] = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": properties, "required": required + ["file"]}
+                }
+            },
+        }
+    }
+
+
+class _Part:
+    def __init__(self):
+        self.headers: Dict[bytes, bytes] = {}
+        self.name = ""
+        self.data = b""
+        self.writer: Optional[StagingWriter] = None
+
+
+class StreamingUploadParser:
+    """
+    Multipart parser that streams file parts straight into storage/.staging instead of
+    Starlette's SpooledTemporaryFile, so the body is written to disk exactly once.
+    Parser callbacks are sync; file I/O is queued and awaited between chunks.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        file_field: str = "file",
+        max_files: int = 1,
+        field_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.request = request
+        self.file_field = file_field
+        self.max_files = max_files
+        self.field_limits = field_limits or {}
+        self.fields: Dict[str, str] = {}
+        self.staged_files: List[StagedFile] = []
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+        self._pending: List[Tuple[str, _Part, bytes]] = []
+        self._writers: List[StagingWriter] = []
+
+    def on_part_begin(self) -> None:
+        self._part = _Part()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._part.name == self.file_field and self._part.writer is not None:
+            self._pending.append(("write", self._part, data[start:end]))
+        else:
+            self._part.data += data[start:end]
+            if len(self._part.data) > self.field_limits.get(self._part.name, MAX_FIELD_BYTES):
+                raise HTTPException(status_code=413, detail=f"Form field '{self._part.name}' is too large")
+
+    def on_part_end(self) -> None:
+        if self._part.writer is not None:
+            self._pending.append(("close", self._part, b""))
+        elif self._part.name:
+            if len(self.fields) >= MAX_FIELDS:
+                raise HTTPException(status_code=400, detail="Too many form fields")
+            self.fields[self._part.name] = self._part.data.decode("utf-8", errors="replace")
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._part.headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._part.headers.get(b"content-disposition", b""))
+        self._part.name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if self._part.name == self.file_field and b"filename" in options:
+            if len(self._writers) >= self.max_files:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Only one file per request" if self.max_files == 1 else "Too many files in one request",
+                )
+            content_type = self._part.headers.get(b"content-type", b"").decode("latin-1") or None
+            self._part.writer = StagingWriter(options[b"filename"].decode("utf-8", errors="replace"), content_type)
+            self._writers.append(self._part.writer)
+            self._pending.append(("open", self._part, b""))
+
+    async def _flush(self) -> None:
+        for op, part, data in self._pending:
+            if op == "open":
+                await part.writer.open()
+            elif op == "write":
+                await part.writer.write(data)
+            else:
+                self.staged_files.append(await part.writer.close())
+        self._pending.clear()
+
+    async def parse(self) -> Tuple[Dict[str, str], List[StagedFile]]:
+        content_type = self.request.headers.get("content-type", "")
+        ctype, params = parse_options_header(content_type)
+        if ctype != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+        callbacks = {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+        parser = multipart.MultipartParser(params[b"boundary"], callbacks)
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                await self._flush()
+            parser.finalize()
+            await self._flush()
+        except BaseException:
+            for writer in self._writers:
+                await writer.abort()  # also removes files that were already complete
+            raise
+
+        if not self.staged_files:
+            raise HTTPException(status_code=422, detail=f"Missing file field '{self.file_field}'")
+        return self.fields, self.staged_files
+
+
+async def parse_streaming_upload(request: Request, file_field: str = "file") -> Tuple[Dict[str, str], StagedFile]:
+    fields, staged_files = await StreamingUploadParser(request, file_field).parse()
+    return fields, staged_files[0]
+
+
+async def parse_streaming_batch(
+    request: Request, file_field: str, max_files: int, field_limits: Dict[str, int]
+) -> Tuple[Dict[str, str], List[StagedFile]]:
+    """Like parse_streaming_upload, for any number of parts named `file_field`."""
+    return await StreamingUploadParser(request, file_field, max_files, field_limits).parse()
@@ -1,11 +1,15 @@
 from sqlalchemy.orm import Session
+from app.db.notifications import notify_clause
 from app.models.department import Department
+from app.services.reference import CHANNEL, DEPARTMENTS
 
 
 def seed_departments(db: Session):
     defaults = ["HR", "Finance", "Legal", "IT", "Operations"]
     existing = {d.name for d in db.query(Department).all()}
-    for name in defaults:
-        if name not in existing:
-            db.add(Department(name=name))
-    db.commit()
\ No newline at end of file
+    missing = [name for name in defaults if name not in existing]
+    for name in missing:
+        db.add(Department(name=name))
+    if missing and db.bind.dialect.name == "postgresql":
+        db.execute(notify_clause(CHANNEL, DEPARTMENTS))  # running workers drop their cached list
+    db.commit()
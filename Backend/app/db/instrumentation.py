@@ -0,0 +1,75 @@
+import time
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core import metrics, profiling
+from app.core.instrumentation import current_stats
+
+_engines: List[Engine] = []
+
+
+class _TimedCheckout:
+    """Records how long a checkout waited for a free connection (pool_logging_name is the label)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe(
+                "db.pool_wait_seconds", time.perf_counter() - started, {"pool": self._orig_logging_name or "default"}
+            )
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Counts and times every statement, process-wide and against the current request (if any)."""
+    labels = {"engine": name}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        metrics.inc("db.queries", labels=labels)
+        metrics.inc("db.query_seconds", elapsed, labels)
+        stats = current_stats()
+        if stats is not None:
+            stats.sql_queries += 1
+            stats.sql_seconds += elapsed
+        profiling.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        metrics.inc("db.query_errors", labels=labels)
+
+    _engines.append(engine)
+
+
+def pool_status(engine: Engine) -> Dict[str, int]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": max(pool.overflow(), 0)}
+
+
+def update_pool_gauges() -> None:
+    for engine in _engines:
+        name = engine.pool._orig_logging_name or "default"
+        for stat, value in pool_status(engine).items():
+            metrics.set_gauge(f"db.pool_{stat}", value, {"pool": name})
@@ -1,18 +1,87 @@
+import argparse
+import ast
+from pathlib import Path
+from typing import Set
+
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-from app.db.session import engine, SessionLocal
-from app.db.base import Base
-from app.models import user as user_models 
-from app.models import department as department_models 
-from app.models import document as document_models  # noqa: F401
+from sqlalchemy.exc import ProgrammingError
+from app.db.session import async_engine, engine, SessionLocal
 from app.db.init_db import seed_departments
+from app.services.search import backfill_search_vectors
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+VERSIONS_DIR = ALEMBIC_INI.parent / "alembic" / "versions"
+MIGRATION_LOCK_ID = 7243001  # pg_advisory_lock key: concurrent runs wait for each other
+
+
+def alembic_config():
+    from alembic.config import Config  # alembic is slow to import; only this command needs it
+
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    cfg.attributes["configure_logger"] = False  # keep the caller's logging setup
+    return cfg
+
+
+def upgrade_schema() -> None:
+    """alembic upgrade head; databases created by create_all before migrations existed are adopted as-is."""
+    from alembic import command
+
+    # autocommit: an open transaction here would block the CREATE INDEX CONCURRENTLY steps forever
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            command.upgrade(alembic_config(), "head")
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def script_heads() -> Set[str]:
+    """Head revisions in alembic/versions, read from the files' revision/down_revision (Alembic not imported)."""
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        values = {}
+        for node in ast.parse(path.read_text()).body:
+            target = node.targets[0] if isinstance(node, ast.Assign) else getattr(node, "target", None)
+            if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+                values[target.id] = ast.literal_eval(node.value)
+        if "revision" not in values:
+            continue
+        revisions.add(values["revision"])
+        down = values.get("down_revision") or ()
+        parents.update((down,) if isinstance(down, str) else down)
+    return revisions - parents
+
+
+async def check_schema() -> None:
+    """
+    Worker startup check: the database is at the migration head. Startup never migrates or seeds;
+    that is the one-shot `python -m app.db.migrate`, run once per deploy.
+    """
+    expected = script_heads()
+    async with async_engine.connect() as conn:
+        try:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+        except ProgrammingError:  # no alembic_version table: never migrated
+            current = set()
+    if current != expected:
+        raise RuntimeError(
+            f"database schema is at {', '.join(sorted(current)) or 'no revision'}, expected "
+            f"{', '.join(sorted(expected))}; run: python -m app.db.migrate"
+        )
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
-    with SessionLocal() as db:
-        seed_departments(db)
+def init_db(seed: bool = True):
+    upgrade_schema()
+    if seed:
+        with SessionLocal() as db:
+            seed_departments(db)
+            backfill_search_vectors(db)
 
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate the database to the latest schema and seed reference data.")
+    parser.add_argument("--no-seed", action="store_true", help="only run migrations")
+    args = parser.parse_args()
+    init_db(seed=not args.no_seed)
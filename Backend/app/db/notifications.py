@@ -0,0 +1,99 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+log = logging.getLogger(__name__)
+
+# payload of a notification, or None when notifications may have been missed (drop everything)
+Handler = Callable[[Optional[str]], None]
+
+_handlers: Dict[str, Handler] = {}
+_ON_COMMIT = "on_commit"  # Session.info key: callbacks waiting for the current transaction
+
+
+def subscribe(channel: str, handler: Handler) -> None:
+    """Register before start_listener(); each worker's listener thread calls `handler` for `channel`."""
+    _handlers[channel] = handler
+
+
+def notify_clause(channel: str, payload: str) -> TextClause:
+    """Execute inside the writing transaction: Postgres only delivers it if and when that commits."""
+    return text("SELECT pg_notify(:channel, :payload)").bindparams(channel=channel, payload=payload)
+
+
+def on_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """This process's side of a notify_clause(): runs `callback` once the transaction commits, never if it rolls back."""
+    db.sync_session.info.setdefault(_ON_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for callback in session.info.pop(_ON_COMMIT, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_commit(session: Session) -> None:
+    session.info.pop(_ON_COMMIT, None)
+
+
+class Listener(threading.Thread):
+    """LISTENs on every subscribed channel with its own connection and dispatches to the handlers."""
+
+    def __init__(self, conninfo: str):
+        super().__init__(name="notify-listener", daemon=True)
+        self.conninfo = conninfo
+        self._stop = threading.Event()
+
+    def _reset(self) -> None:
+        for handler in _handlers.values():
+            handler(None)
+
+    def run(self) -> None:
+        import psycopg
+
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.conninfo, autocommit=True) as conn:
+                    for channel in _handlers:
+                        conn.execute(f"LISTEN {channel}")
+                    # notifications sent while we were not listening are gone
+                    self._reset()
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            handler = _handlers.get(notify.channel)
+                            if handler is not None:
+                                handler(notify.payload)
+            except Exception:
+                log.exception("Notification listener lost its connection; retrying")
+                self._reset()
+                self._stop.wait(5)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_listener: Optional[Listener] = None
+
+
+def start_listener() -> None:
+    global _listener
+    from app.db.session import engine
+
+    if _listener is not None or not _handlers or engine.dialect.name != "postgresql":
+        return
+    conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _listener = Listener(conninfo)
+    _listener.start()
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
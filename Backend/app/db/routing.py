@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal, ReplicaSessionLocals, replica_engines
+
+log = logging.getLogger(__name__)
+
+# set on responses of write routes so the user's next reads (on any worker) go to the primary
+PRIMARY_COOKIE = "db_primary_until"
+
+# 0 while the replica has replayed everything it received, so an idle primary does not read as lag
+LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_recent_writers = TTLCache(maxsize=100_000, ttl_seconds=settings.read_your_writes_seconds)
+_lag: Dict[int, float] = {}  # replica index -> last measured lag in seconds
+_round_robin = itertools.count()
+
+
+def remember_write(user_id: int) -> int:
+    """Returns: epoch second until which this user's reads stay on the primary"""
+    _recent_writers.set(user_id, True)
+    return int(time.time()) + settings.read_your_writes_seconds
+
+
+def healthy_replicas() -> list:
+    return [i for i in range(len(ReplicaSessionLocals)) if _lag.get(i, 0) <= settings.replica_max_lag_seconds]
+
+
+def read_sessionmaker(user_id: Optional[int], primary_until: Optional[str]) -> async_sessionmaker:
+    """Replica for a read-only request, unless the user wrote recently or no replica is fresh enough."""
+    if not ReplicaSessionLocals:
+        return AsyncSessionLocal
+    sticky = user_id is not None and _recent_writers.get(user_id) is not None
+    try:
+        sticky = sticky or (primary_until is not None and int(primary_until) > time.time())
+    except ValueError:
+        pass
+    healthy = [] if sticky else healthy_replicas()
+    if not healthy:
+        metrics.inc("db.reads.primary")
+        return AsyncSessionLocal
+    metrics.inc("db.reads.replica")
+    return ReplicaSessionLocals[healthy[next(_round_robin) % len(healthy)]]
+
+
+async def _measure_lag() -> None:
+    for i, engine in enumerate(replica_engines):
+        if engine.dialect.name != "postgresql":
+            continue
+        try:
+            async with engine.connect() as conn:
+                lag = float((await conn.execute(LAG_SQL)).scalar_one())
+        except Exception:
+            log.warning("Replica %d is unreachable; routing reads elsewhere", i, exc_info=True)
+            lag = float("inf")
+        _lag[i] = lag
+        metrics.set_gauge("db.replica_lag_seconds", lag, {"replica": str(i)})
+
+
+async def monitor_replica_lag() -> None:
+    """Background task for the app's lifetime: refreshes replica lag (and reachability)."""
+    while True:
+        await _measure_lag()
+        await asyncio.sleep(settings.replica_lag_check_seconds)
+
+
+_monitor: Optional[asyncio.Task] = None
+
+
+def start_lag_monitor() -> None:
+    global _monitor
+    if replica_engines and _monitor is None:
+        _monitor = asyncio.get_running_loop().create_task(monitor_replica_lag())
+
+
+async def stop_lag_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        _monitor = None
+    for engine in replica_engines:
+        await engine.dispose()
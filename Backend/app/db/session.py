@@ -1,15 +1,59 @@
+from typing import AsyncGenerator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.settings import settings
+from app.db.instrumentation import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
 
 
-engine = create_engine(settings.sqlalchemy_database_uri, pool_pre_ping=True)
+def _pool_args(name: str) -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+        "pool_logging_name": name,  # also the "pool" label of the db.pool_* metrics
+    }
+
+
+def _create_api_engine(url: str, name: str):
+    kwargs = _pool_args(name)
+    if make_url(url).get_backend_name() == "postgresql":
+        kwargs["poolclass"] = TimedAsyncAdaptedQueuePool
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    else:  # e.g. SQLite stand-ins for replicas in local testing
+        kwargs = {}
+    api_engine = create_async_engine(url, **kwargs)
+    instrument_engine(api_engine.sync_engine, name)
+    return api_engine
+
+
+# sync engine: CLIs, migrations and background jobs (no statement timeout, backfills can be long)
+engine = create_engine(settings.sqlalchemy_database_uri, poolclass=TimedQueuePool, **_pool_args("jobs"))
+instrument_engine(engine, "jobs")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# async engine (psycopg async) for request handling
+async_engine = _create_api_engine(settings.sqlalchemy_database_uri, "primary")
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# read replicas for read-only routes; app.db.routing decides per request which one (if any) to use
+replica_engines = [_create_api_engine(url, f"replica{i}") for i, url in enumerate(settings.database_replica_urls)]
+ReplicaSessionLocals = [
+    async_sessionmaker(bind=e, autoflush=False, expire_on_commit=False, info={"replica": True})
+    for e in replica_engines
+]
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,11 +1,27 @@
-from fastapi import FastAPI
+import time
+
+IMPORT_STARTED = time.perf_counter()  # before the heavy imports below; startup metrics count from here
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.profiling import ProfilingMiddleware
 from app.core.settings import settings
-from app.db.migrate import init_db
+from app.db.migrate import check_schema
+from app.db.session import async_engine
+from app.db.instrumentation import update_pool_gauges
+from app.db.routing import start_lag_monitor, stop_lag_monitor
+from app.services.extraction import shutdown_executor
+from app.services.deltas import shutdown_executor as shutdown_delta_executor
+from app.db.notifications import start_listener, stop_listener
+from app.services.health import check_dependencies, readiness
 from app.api.routes import auth as auth_routes
 from app.api.routes import documents as documents_routes
 from app.api.routes import users as users_routes
 from app.api.routes import reference as reference_routes
+from app.api.routes import files as files_routes
 
 
 app = FastAPI(title="Scalable Document Repository")
@@ -17,16 +33,45 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(InstrumentationMiddleware, started=IMPORT_STARTED)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    check_dependencies()  # e.g. STORAGE_COMPRESSION=zstd without zstandard installed
+    await check_schema()  # migrations and seeding are `python -m app.db.migrate`, not every worker's boot
+    start_listener()  # cross-worker invalidation of the ACL and reference data caches
+    start_lag_monitor()
+    metrics.set_gauge("startup.ready_seconds", time.perf_counter() - IMPORT_STARTED)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    shutdown_executor()
+    shutdown_delta_executor()
+    stop_listener()
+    await stop_lag_monitor()
+    await async_engine.dispose()
 
 app.include_router(reference_routes.router)
 app.include_router(auth_routes.router)
 app.include_router(documents_routes.router)
 app.include_router(users_routes.router)
+app.include_router(files_routes.router)
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
\ No newline at end of file
+async def health(ready: bool = Query(default=False, description="Also check the database pool and storage")):
+    if not ready:
+        return {"status": "ok"}  # liveness: the process answers
+    ok, checks = await readiness()
+    return JSONResponse({"status": "ok" if ok else "unavailable", **checks}, status_code=200 if ok else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """This worker's metrics (see app.core.metrics) for Prometheus to scrape."""
+    update_pool_gauges()
+    return Response(metrics.render_prometheus(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+metrics.set_gauge("startup.import_seconds", time.perf_counter() - IMPORT_STARTED)  # imports, app and routes above
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, func
+from app.db.base import Base
+
+
+class Blob(Base):
+    """One stored file under storage/blobs, shared by every version with the same bytes."""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # set while stored as a delta (blobs/../<sha256>.bsdiff) against this blob; see app.core.deltas
+    base_sha256 = Column(String(64), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # when it last switched between whole and delta storage; collect_garbage deletes the objects
+    # no version points at any more once this is older than its grace period
+    superseded_at = Column(DateTime(timezone=True), nullable=True)
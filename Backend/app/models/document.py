@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.db.base import Base
 
 
@@ -13,22 +14,34 @@ class Document(Base):
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # weighted title/tags/description vector, maintained by app.services.search
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
 
     owner = relationship("User")
     versions = relationship("DocumentVersion", back_populates="document", cascade="all,delete")
     tags = relationship("Tag", secondary="document_tags", back_populates="documents")
     permissions = relationship("DocumentPermission", back_populates="document", cascade="all,delete")
 
+    __table_args__ = (
+        Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+        # listing/search keyset order (updated_at DESC, id DESC), and the same per owner for my_documents
+        Index("ix_documents_updated", updated_at.desc(), id.desc()),
+        Index("ix_documents_owner_updated", owner_id, updated_at.desc(), id.desc()),
+    )
+
 
 class DocumentVersion(Base):
     __tablename__ = "document_versions"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     version_number = Column(Integer, nullable=False)
     file_path = Column(Text, nullable=False)
+    filename = Column(String(255), nullable=True)  # original upload name; file_path may be a shared blob
     mime_type = Column(String(100), nullable=True)
-    file_size = Column(Integer, nullable=True)
+    file_size = Column(BigInteger, nullable=True)  # bytes; versions can exceed 2 GiB
+    content_hash = Column(String(64), nullable=True)  # hex SHA-256 of the original bytes
+    content_encoding = Column(String(20), nullable=True)  # how file_path is stored: None (as uploaded) | zstd
     uploaded_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     uploaded_by_name = Column(String(150), nullable=True)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -36,11 +49,47 @@ class DocumentVersion(Base):
     document = relationship("Document", back_populates="versions")
 
     __table_args__ = (
-        # Ensure uniqueness per document
+        # one row per version number; also serves resolve_version and the per-document version list
+        Index("uq_document_versions_document_version", "document_id", "version_number", unique=True),
+        Index("ix_document_versions_content_hash", "content_hash"),  # blob reference counts, delta encoding
         {"sqlite_autoincrement": True},
     )
 
 
+class DocumentContent(Base):
+    """Extracted text of one stored version, filled in by app.services.extraction."""
+    __tablename__ = "document_contents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    version_id = Column(Integer, ForeignKey("document_versions.id", ondelete="CASCADE"), nullable=False, unique=True)
+    version_number = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)  # done | unsupported | failed
+    content = deferred(Column(Text, nullable=True))
+    content_vector = deferred(Column(TSVECTOR, nullable=True))
+    error = Column(Text, nullable=True)
+    extracted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_document_contents_content_vector", "content_vector", postgresql_using="gin"),
+        Index("ix_document_contents_document_version", "document_id", "version_number"),
+    )
+
+
+class UploadSession(Base):
+    """Resumable upload of a new version; bytes accumulate in the staging dir until completed."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    total_size = Column(BigInteger, nullable=True)  # declared by the client, if known
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class Tag(Base):
     __tablename__ = "tags"
 
@@ -56,14 +105,29 @@ class DocumentTag(Base):
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
     tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
 
+    __table_args__ = (
+        Index("ix_document_tags_tag_document", "tag_id", "document_id"),  # tag filters: documents with a tag
+    )
+
 
 class DocumentPermission(Base):
     __tablename__ = "document_permissions"
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
-    department_id = Column(Integer, ForeignKey("departments.id", ondelete="CASCADE"), nullable=False, index=True)
+    department_id = Column(Integer, ForeignKey("departments.id", ondelete="CASCADE"), nullable=False)
     can_view = Column(Integer, nullable=False, default=1)      # booleans as ints portable
     can_download = Column(Integer, nullable=False, default=1)
 
-    document = relationship("Document", back_populates="permissions")
\ No newline at end of file
+    document = relationship("Document", back_populates="permissions")
+
+    __table_args__ = (
+        # viewable_documents_query's EXISTS, and (covering can_download) the per-department ACL cache load
+        Index(
+            "ix_document_permissions_department_view",
+            "department_id",
+            "can_view",
+            "document_id",
+            postgresql_include=["can_download"],
+        ),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -15,6 +15,27 @@ class DocumentSummary(BaseModel):
     current_version_number: int
     tags: List[str]
     updated_at: Optional[str]
+    rank: Optional[float] = None      # only set for full-text (?q=) searches
+    snippet: Optional[str] = None     # HTML: escaped ts_headline fragment, matches wrapped in <mark>
+
+
+class FacetCount(BaseModel):
+    value: str                    # tag or department name, version bucket ("3-5") or age range ("week")
+    count: int                    # matching documents
+    id: Optional[int] = None      # tag / department id
+
+
+class SearchFacets(BaseModel):
+    tags: List[FacetCount]
+    departments: List[FacetCount]  # by owner's department
+    versions: List[FacetCount]     # current_version_number buckets
+    updated: List[FacetCount]      # day, week, month, year, older (disjoint)
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentSummary]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to fetch the next page
+    facets: Optional[SearchFacets] = None  # search with ?facets=true only; counts over all matches
 
 
 class DocumentDetail(BaseModel):
@@ -48,4 +69,74 @@ class DocumentUpdateRequest(BaseModel):
     title: Optional[str] = Field(default=None, max_length=255)
     description: Optional[str] = None
     tags: Optional[List[str]] = None
-    permission_department_ids: Optional[List[int]] = None
\ No newline at end of file
+    permission_department_ids: Optional[List[int]] = None
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: Optional[str] = Field(default=None, max_length=100)
+    size: Optional[int] = Field(default=None, ge=0)  # total bytes, if known up front
+
+
+class UploadSessionInfo(BaseModel):
+    upload_id: str
+    offset: int                 # bytes received so far; send the next chunk from here
+    size: Optional[int]
+    expires_at: Optional[str]
+
+
+class DirectUploadRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: Optional[str] = Field(default=None, max_length=100)
+    size: int = Field(ge=0)
+    sha256: str = Field(min_length=64, max_length=64)  # hex digest; storage rejects bytes that don't match
+
+
+class DirectDocumentUploadRequest(DirectUploadRequest):
+    title: str = Field(min_length=1, max_length=255)
+    description: Optional[str] = None
+    tags: List[str] = []
+    permission_department_ids: List[int] = []
+
+
+class DirectUploadTicket(BaseModel):
+    upload_token: str             # send to /direct/complete once the PUT succeeded
+    url: str
+    method: str
+    headers: Dict[str, str]       # must be sent with the PUT
+    expires_at: str
+
+
+class DirectUploadComplete(BaseModel):
+    upload_token: str
+
+
+class DirectUploadResult(BaseModel):
+    document_id: int
+    version: DocumentVersionInfo
+
+
+class DirectDownload(BaseModel):
+    url: str
+    expires_at: str
+
+
+class BulkManifestItem(BaseModel):
+    file: str = Field(min_length=1, max_length=1024)  # ZIP member path, or the part's filename for multipart
+    title: str = Field(min_length=1, max_length=255)
+    description: Optional[str] = None
+    tags: List[str] = []
+    permission_department_ids: List[int] = []  # default: the uploader's department
+
+
+class BulkItemResult(BaseModel):
+    index: int                          # position in the manifest
+    file: str
+    document_id: Optional[int] = None   # set when the document was created
+    error: Optional[str] = None
+
+
+class BulkIngestResult(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkItemResult]
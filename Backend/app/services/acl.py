@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Select, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.settings import settings
+from app.db import notifications
+from app.models.document import DocumentPermission
+
+try:
+    from pyroaring import BitMap as IdSet  # compressed bitmap, optional
+except ImportError:
+    IdSet = frozenset
+
+CHANNEL = "acl_changed"
+
+
+@dataclass
+class _Entry:
+    view: IdSet
+    download: IdSet
+    loaded_at: float
+
+
+class AclCache:
+    """
+    Per-process map of department id -> ids of the documents it may view / download.
+    Entries are dropped when a writer reports a permission change (locally after commit,
+    in other processes via NOTIFY); the TTL bounds staleness if a notification is lost.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[int, _Entry] = {}
+        # bumped on every invalidation so a load that raced with one is not stored
+        self._generation = 0
+        self._loading: Dict[int, asyncio.Lock] = {}
+
+    def _current(self, department_id: int) -> Tuple[int, Optional[_Entry]]:
+        with self._lock:
+            entry = self._entries.get(department_id)
+            generation = self._generation
+        if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+            return generation, entry
+        return generation, None
+
+    async def get(self, db: AsyncSession, department_id: int) -> _Entry:
+        generation, entry = self._current(department_id)
+        if entry is not None:
+            metrics.inc("acl_cache.hits")
+            return entry
+
+        # one permissions query per department after a miss, however many requests are waiting for it
+        async with self._loading.setdefault(department_id, asyncio.Lock()):
+            generation, entry = self._current(department_id)
+            if entry is not None:  # loaded by the request that held the lock
+                metrics.inc("acl_cache.hits")
+                return entry
+            metrics.inc("acl_cache.misses")
+            if db.info.get("replica"):
+                # a lagging replica could repopulate an entry that was just invalidated
+                from app.db import routing
+
+                async with routing.AsyncSessionLocal() as primary:
+                    entry = await _load(primary, department_id)
+            else:
+                entry = await _load(db, department_id)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[department_id] = entry
+        return entry
+
+    def invalidate(self, department_ids: Optional[Iterable[int]] = None) -> None:
+        """None drops every department."""
+        with self._lock:
+            self._generation += 1
+            if department_ids is None:
+                self._entries.clear()
+            else:
+                for dep_id in department_ids:
+                    self._entries.pop(dep_id, None)
+        metrics.inc("acl_cache.invalidations")
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def permissions_query(department_id: int) -> Select:
+    return select(DocumentPermission.document_id, DocumentPermission.can_view, DocumentPermission.can_download).where(
+        DocumentPermission.department_id == department_id,
+        or_(DocumentPermission.can_view == 1, DocumentPermission.can_download == 1),
+    )
+
+
+async def _load(db: AsyncSession, department_id: int) -> _Entry:
+    rows = (await db.execute(permissions_query(department_id))).all()
+    return _Entry(
+        view=IdSet(doc_id for doc_id, view, _ in rows if view),
+        download=IdSet(doc_id for doc_id, _, download in rows if download),
+        loaded_at=time.monotonic(),
+    )
+
+
+cache = AclCache(settings.acl_cache_ttl_seconds)
+
+
+async def can_view(db: AsyncSession, document_id: int, department_id: Optional[int]) -> bool:
+    if not department_id:
+        return False
+    return document_id in (await cache.get(db, department_id)).view
+
+
+async def can_download(db: AsyncSession, document_id: int, department_id: Optional[int]) -> bool:
+    if not department_id:
+        return False
+    return document_id in (await cache.get(db, department_id)).download
+
+
+async def permissions_changed(db: AsyncSession, department_ids: Iterable[int]) -> None:
+    """
+    Call inside the transaction that changes document_permissions rows. Other processes are told
+    through pg_notify, which Postgres only delivers if and when the transaction commits.
+    """
+    ids = sorted(set(department_ids))
+    if not ids:
+        return
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(notifications.notify_clause(CHANNEL, ",".join(map(str, ids))))
+    notifications.on_commit(db, lambda: cache.invalidate(ids))
+
+
+def _parse_payload(payload: str) -> Optional[Tuple[int, ...]]:
+    try:
+        return tuple(int(x) for x in payload.split(",") if x)
+    except ValueError:
+        return None  # unknown payload: drop everything
+
+
+def _on_notify(payload: Optional[str]) -> None:
+    cache.invalidate(_parse_payload(payload) if payload is not None else None)
+
+
+notifications.subscribe(CHANNEL, _on_notify)
@@ -0,0 +1,312 @@
+import argparse
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import anyio
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+
+from app.core.compression import ZSTD_SUFFIX, encoding_of, measure_cpu
+from app.core.deltas import sha_of
+from app.core.files import (
+    BLOB_PREFIX,
+    DELTA_SUFFIX,
+    INCOMING_PREFIX,
+    STORAGE_ROOT,
+    StagedFile,
+    blob_key,
+    discard_staged,
+    place_blob,
+)
+from app.core.settings import settings
+from app.core.storage import get_storage
+from app.db.session import SessionLocal
+from app.models.blob import Blob
+from app.models.document import DocumentVersion
+from app.services.uploads import prune_expired_sessions
+
+
+def _take_reference(dialect_name: str, staged: StagedFile):
+    return _take_references(dialect_name, [staged])
+
+
+def _take_references(dialect_name: str, staged_files: List[StagedFile]):
+    refs: Dict[str, List[int]] = {}
+    for staged in staged_files:
+        refs.setdefault(staged.sha256, [staged.size, 0])[1] += 1
+    stmt = (sqlite if dialect_name == "sqlite" else postgresql).insert(Blob)
+    # sorted so concurrent batches lock blob rows in the same order
+    stmt = stmt.values([{"sha256": sha, "size": size, "ref_count": n} for sha, (size, n) in sorted(refs.items())])
+    return stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count}
+    )
+
+
+def acquire_blob(db: Session, staged: StagedFile) -> str:
+    """
+    Takes one reference on the blob for `staged` (creating it if new) and returns its file_path.
+    The row is upserted before the file is placed: the row lock held until commit keeps
+    collect_garbage from deleting the file underneath us.
+    """
+    db.execute(_take_reference(db.get_bind().dialect.name, staged))
+    return place_blob(staged)
+
+
+async def acquire_blob_async(db: AsyncSession, staged: StagedFile) -> str:
+    """acquire_blob for request handlers; the file move/upload runs in the threadpool."""
+    await db.execute(_take_reference(db.bind.dialect.name, staged))
+    return await run_in_threadpool(place_blob, staged)
+
+
+async def acquire_blobs_async(db: AsyncSession, staged_files: List[StagedFile]) -> List[str]:
+    """
+    acquire_blob for a batch: one upsert takes every reference, then each distinct file is placed
+    on its own worker thread (at most BULK_IO_WORKERS at a time).
+    Returns: file_path per staged file, in order
+    """
+    if not staged_files:
+        return []
+    await db.execute(_take_references(db.bind.dialect.name, staged_files))
+    first: Dict[str, StagedFile] = {}
+    for staged in staged_files:
+        first.setdefault(staged.sha256, staged)
+    keys: Dict[str, str] = {}
+    limiter = anyio.CapacityLimiter(settings.bulk_io_workers)
+
+    async def place(staged: StagedFile) -> None:
+        keys[staged.sha256] = await anyio.to_thread.run_sync(place_blob, staged, limiter=limiter)
+
+    async with anyio.create_task_group() as tg:
+        for staged in first.values():
+            tg.start_soon(place, staged)
+    for staged in staged_files:
+        if staged is not first[staged.sha256]:
+            discard_staged(staged)
+    return [keys[staged.sha256] for staged in staged_files]
+
+
+def release_blob(db: Session, sha256: str) -> None:
+    db.execute(update(Blob).where(Blob.sha256 == sha256, Blob.ref_count > 0).values(ref_count=Blob.ref_count - 1))
+
+
+def recount_references(db: Session) -> int:
+    """Recomputes ref_count from document_versions (e.g. after documents were deleted)."""
+    refs = (
+        select(func.count(DocumentVersion.id))
+        .where(DocumentVersion.content_hash == Blob.sha256)
+        .scalar_subquery()
+    )
+    changed = db.execute(update(Blob).where(Blob.ref_count != refs).values(ref_count=refs)).rowcount
+    db.commit()
+    return changed
+
+
+def collect_garbage(db: Session, grace_seconds: int = 3600, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Deletes unreferenced blobs (unless a delta still needs them as its base), the objects a blob was stored as
+    before it switched between whole and delta storage, blob files that have no row at all (left by failed uploads),
+    expired resumable upload sessions and direct uploads that were never completed.
+    Anything younger than `grace_seconds` is kept so in-flight uploads and downloads are never touched.
+    """
+    sessions_removed = 0 if dry_run else prune_expired_sessions(db)
+    recount_references(db)
+    cutoff = time.time() - grace_seconds
+    removed_rows = removed_files = retired_files = freed = 0
+
+    dependent = aliased(Blob)
+    dead = db.execute(
+        select(Blob)
+        .where(
+            Blob.ref_count == 0,
+            Blob.created_at < datetime.now(timezone.utc) - timedelta(seconds=grace_seconds),
+            ~select(dependent.sha256).where(dependent.base_sha256 == Blob.sha256).exists(),
+        )
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    storage = get_storage()
+    for blob in dead:
+        if not dry_run:
+            whole = blob_key(blob.sha256)
+            for key in (whole, whole + ZSTD_SUFFIX, whole + DELTA_SUFFIX):
+                storage.delete(key)
+            db.delete(blob)
+        removed_rows += 1
+        freed += blob.size or 0
+    if not dry_run:
+        db.commit()
+
+    superseded = db.execute(
+        select(Blob)
+        .where(Blob.superseded_at < datetime.now(timezone.utc) - timedelta(seconds=grace_seconds))
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    for blob in superseded:
+        live = set(
+            db.execute(select(DocumentVersion.file_path).where(DocumentVersion.content_hash == blob.sha256)).scalars()
+        )
+        whole = blob_key(blob.sha256)
+        if blob.base_sha256 is not None:
+            live.add(whole + DELTA_SUFFIX)
+        if not live:
+            continue  # no versions left: the dead-blob pass above takes it once nothing depends on it
+        for key in (whole, whole + ZSTD_SUFFIX, whole + DELTA_SUFFIX):
+            if key in live or not storage.exists(key):
+                continue
+            freed += storage.size(key)
+            retired_files += 1
+            if not dry_run:
+                storage.delete(key)
+        if not dry_run:
+            blob.superseded_at = None
+    if not dry_run:
+        db.commit()
+
+    known = set(db.execute(select(Blob.sha256)).scalars())
+    for key, size, mtime in storage.list_keys(BLOB_PREFIX):
+        if sha_of(key) in known or mtime > cutoff:
+            continue
+        freed += size
+        removed_files += 1
+        if not dry_run:
+            storage.delete(key)
+
+    # a direct upload can be completed for as long as its token lives
+    incoming_cutoff = time.time() - max(grace_seconds, settings.upload_session_ttl_hours * 3600)
+    abandoned = 0
+    for key, size, mtime in storage.list_keys(INCOMING_PREFIX):
+        if mtime > incoming_cutoff:
+            continue
+        freed += size
+        abandoned += 1
+        if not dry_run:
+            storage.delete(key)
+
+    return {
+        "blobs_removed": removed_rows,
+        "abandoned_direct_uploads_removed": abandoned,
+        "orphan_files_removed": removed_files,
+        "superseded_files_removed": retired_files,
+        "bytes_freed": freed,
+        "expired_upload_sessions_removed": sessions_removed,
+    }
+
+
+def dedup_report(db: Session) -> Dict[str, float]:
+    logical_bytes, versions = db.execute(
+        select(func.coalesce(func.sum(DocumentVersion.file_size), 0), func.count(DocumentVersion.id))
+    ).one()
+    physical_bytes, blobs = db.execute(
+        select(func.coalesce(func.sum(Blob.size), 0), func.count(Blob.sha256)).where(Blob.ref_count > 0)
+    ).one()
+    legacy = db.execute(
+        select(func.count(DocumentVersion.id)).where(DocumentVersion.content_hash.is_(None))
+    ).scalar_one()
+    return {
+        "versions": versions,
+        "blobs": blobs,
+        "legacy_versions": legacy,
+        "logical_bytes": int(logical_bytes),
+        "physical_bytes": int(physical_bytes),
+        "dedup_ratio": round(logical_bytes / physical_bytes, 3) if physical_bytes else 1.0,
+    }
+
+
+def compression_report(db: Session, sample: int = 20) -> Dict[str, float]:
+    """
+    Disk saved by zstd-compressed blobs, and CPU seconds per GB of original data to decompress
+    (downloads without passthrough) and compress (uploads), measured on up to `sample` of them.
+    """
+    sizes = dict(db.execute(select(Blob.sha256, Blob.size).where(Blob.ref_count > 0)).all())
+    storage = get_storage()
+    blobs = original = stored = 0
+    sampled = []
+    for key, size, _ in storage.list_keys(BLOB_PREFIX):
+        sha = sha_of(key)
+        if not encoding_of(key) or sha not in sizes:
+            continue
+        blobs += 1
+        original += sizes[sha]
+        stored += size
+        if len(sampled) < sample:
+            sampled.append(key)
+
+    sampled_bytes, decode_s, encode_s = 0, 0.0, 0.0
+    for key in sampled:
+        n, d, e = measure_cpu(storage.open_stream(key))
+        sampled_bytes += n
+        decode_s += d
+        encode_s += e
+    per_gb = (1024 ** 3) / sampled_bytes if sampled_bytes else 0.0
+    return {
+        "compressed_blobs": blobs,
+        "original_bytes": original,
+        "stored_bytes": stored,
+        "bytes_saved": original - stored,
+        "saving_ratio": round(1 - stored / original, 3) if original else 0.0,
+        "sampled_bytes": sampled_bytes,
+        "decompress_cpu_seconds_per_gb": round(decode_s * per_gb, 2),
+        "compress_cpu_seconds_per_gb": round(encode_s * per_gb, 2),
+    }
+
+
+def import_legacy_files(db: Session) -> Dict[str, int]:
+    """Moves pre-blob-store version files (absolute paths under storage/doc_<id>/) into the blob store."""
+    moved = missing = 0
+    versions = db.query(DocumentVersion).filter(DocumentVersion.content_hash.is_(None)).all()
+    for v in versions:
+        path = Path(v.file_path)
+        if not path.exists():
+            missing += 1
+            continue
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        staged = StagedFile(
+            path=path,
+            filename=v.filename or path.name.split("_", 2)[-1],
+            content_type=v.mime_type or "application/octet-stream",
+            size=path.stat().st_size,
+            sha256=h.hexdigest(),
+        )
+        v.filename = staged.filename
+        v.file_path = acquire_blob(db, staged)
+        v.content_encoding = encoding_of(v.file_path)
+        v.content_hash = staged.sha256
+        v.file_size = staged.size
+        db.commit()
+        moved += 1
+    for doc_dir in STORAGE_ROOT.glob("doc_*"):
+        if doc_dir.is_dir() and not any(doc_dir.iterdir()):
+            os.rmdir(doc_dir)
+    return {"moved": moved, "missing": missing}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance for the content-addressed blob store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gc = sub.add_parser("gc", help="delete unreferenced blobs")
+    gc.add_argument("--grace-seconds", type=int, default=3600)
+    gc.add_argument("--dry-run", action="store_true")
+    sub.add_parser("report", help="print logical vs physical bytes and the dedup ratio")
+    cr = sub.add_parser("compression-report", help="print disk saved by compression and its CPU cost per GB")
+    cr.add_argument("--sample", type=int, default=20, help="compressed blobs to time")
+    sub.add_parser("import-legacy", help="move per-document version files into the blob store")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "gc":
+            print(collect_garbage(db, grace_seconds=args.grace_seconds, dry_run=args.dry_run))
+        elif args.command == "report":
+            print(dedup_report(db))
+        elif args.command == "compression-report":
+            print(compression_report(db, sample=args.sample))
+        else:
+            print(import_legacy_files(db))
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import uuid
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import anyio
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.compression import encoding_of
+from app.core.files import STAGING_DIR, StagedFile, discard_staged, stage_stream
+from app.core.settings import settings
+from app.models.department import Department
+from app.models.document import Document, DocumentPermission, DocumentTag, DocumentVersion, Tag
+from app.models.user import User
+from app.schemas.documents import BulkManifestItem
+from app.services import acl, reference
+from app.services.blobs import acquire_blobs_async
+from app.services.search import refresh_search_vectors
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"  # at the root of a ZIP upload
+MANIFEST_MAX_BYTES = 32 * 1024 * 1024
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+_CHUNK = 1024 * 1024
+
+
+@dataclass
+class BulkItem:
+    index: int
+    file: str
+    meta: Optional[BulkManifestItem] = None
+    staged: Optional[StagedFile] = None
+    document_id: Optional[int] = None
+    version_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+async def _limited(chunks: AsyncIterator[bytes], limit: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > limit:
+            raise ValueError("too_large")
+        yield chunk
+
+
+def _zip_contents(zip_path: Path) -> Tuple[Optional[bytes], List[str]]:
+    """Returns: (raw manifest, member names holding documents)"""
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            infos = [i for i in zf.infolist() if not i.is_dir() and not i.filename.startswith("__MACOSX/")]
+            if sum(i.file_size for i in infos) > settings.bulk_max_mb * 1024 * 1024:
+                raise ValueError("too_large")
+            manifest = None
+            for info in infos:
+                if info.filename == MANIFEST_NAME:
+                    if info.file_size > MANIFEST_MAX_BYTES:
+                        raise ValueError("bad_manifest")
+                    manifest = zf.read(info)
+            names = [i.filename for i in infos if i.filename != MANIFEST_NAME]
+    except (zipfile.BadZipFile, zipfile.LargeZipFile):
+        raise ValueError("bad_zip")
+    if len(names) > settings.bulk_max_items:
+        raise ValueError("too_many_files")
+    return manifest, names
+
+
+def _extract_members(zip_path: Path, names: List[str]) -> Dict[str, Optional[StagedFile]]:
+    """One worker's share of the archive, with its own handle. None for members that cannot be read."""
+    out: Dict[str, Optional[StagedFile]] = {}
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in names:
+            path = STAGING_DIR / uuid.uuid4().hex
+            h = hashlib.sha256()
+            size = 0
+            try:
+                with zf.open(name) as src, path.open("wb") as dst:
+                    for chunk in iter(lambda: src.read(_CHUNK), b""):
+                        h.update(chunk)
+                        size += len(chunk)
+                        dst.write(chunk)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            except Exception:  # corrupt or encrypted member: reported per item
+                path.unlink(missing_ok=True)
+                out[name] = None
+                continue
+            filename = PurePosixPath(name).name
+            out[name] = StagedFile(
+                path=path,
+                filename=filename,
+                content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                size=size,
+                sha256=h.hexdigest(),
+            )
+    return out
+
+
+async def read_zip_upload(chunks: AsyncIterator[bytes]) -> Tuple[Optional[bytes], Dict[str, Optional[StagedFile]]]:
+    """
+    Stages a ZIP request body, then unpacks its members into storage/.staging on BULK_IO_WORKERS threads.
+    Returns: (raw manifest or None, member path -> staged file)
+    """
+    archive = await stage_stream(_limited(chunks, settings.bulk_max_mb * 1024 * 1024), "bulk.zip", "application/zip")
+    try:
+        manifest, names = await anyio.to_thread.run_sync(_zip_contents, archive.path)
+        workers = max(1, min(settings.bulk_io_workers, len(names)))
+        results: List[Dict[str, Optional[StagedFile]]] = []
+
+        async def extract(share: List[str]) -> None:
+            results.append(await anyio.to_thread.run_sync(_extract_members, archive.path, share))
+
+        async with anyio.create_task_group() as tg:
+            for i in range(workers):
+                tg.start_soon(extract, names[i::workers])
+    finally:
+        discard_staged(archive)
+    files: Dict[str, Optional[StagedFile]] = {}
+    for part in results:
+        files.update(part)
+    return manifest, files
+
+
+def index_by_name(staged_files: List[StagedFile]) -> Dict[str, Optional[StagedFile]]:
+    """Files of a multipart batch, keyed by filename (what the manifest refers to)."""
+    files: Dict[str, Optional[StagedFile]] = {}
+    for staged in staged_files:
+        if staged.filename in files:
+            for s in staged_files:
+                discard_staged(s)
+            raise ValueError("duplicate_file")
+        files[staged.filename] = staged
+    return files
+
+
+def match_manifest(manifest: Optional[bytes], files: Dict[str, Optional[StagedFile]]) -> List[BulkItem]:
+    """
+    Pairs manifest entries with uploaded files. Without a manifest every file becomes a document titled
+    after its name. Files the manifest does not mention are ignored.
+    """
+    if manifest is None:
+        entries = [{"file": name, "title": PurePosixPath(name).name[:255]} for name in sorted(files)]
+    else:
+        try:
+            entries = json.loads(manifest)
+        except ValueError:
+            raise ValueError("bad_manifest")
+        if not isinstance(entries, list):
+            raise ValueError("bad_manifest")
+        if len(entries) > settings.bulk_max_items:
+            raise ValueError("too_many_files")
+
+    items = []
+    for index, entry in enumerate(entries):
+        item = BulkItem(index=index, file=str(entry.get("file", "")) if isinstance(entry, dict) else "")
+        items.append(item)
+        try:
+            item.meta = BulkManifestItem.model_validate(entry)
+        except ValidationError:
+            item.error = "invalid_metadata"
+            continue
+        item.meta.title = item.meta.title.strip()
+        item.meta.tags = [t.strip() for t in item.meta.tags if t.strip()]
+        if not item.meta.title:
+            item.error = "invalid_metadata"
+        elif any(len(t) > 50 for t in item.meta.tags):
+            item.error = "tag_too_long"
+        elif item.file not in files:
+            item.error = "file_missing"
+        elif files[item.file] is None:
+            item.error = "unreadable_file"
+        else:
+            item.staged = files[item.file]
+    return items
+
+
+async def _tag_ids(db: AsyncSession, names: List[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    stmt = (sqlite if db.bind.dialect.name == "sqlite" else postgresql).insert(Tag)
+    stmt = stmt.values([{"name": n} for n in names]).on_conflict_do_nothing(index_elements=[Tag.name])
+    if (await db.execute(stmt.returning(Tag.id))).first() is not None:  # RETURNING skips the names that existed
+        await reference.reference_changed(db, reference.TAGS)
+    return dict((await db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names)))).all())
+
+
+async def _insert_batch(db: AsyncSession, user: User, items: List[BulkItem]) -> None:
+    file_paths = await acquire_blobs_async(db, [item.staged for item in items])
+    tag_ids = await _tag_ids(db, sorted({t for item in items for t in item.meta.tags}))
+
+    doc_ids = (
+        await db.execute(
+            insert(Document).returning(Document.id, sort_by_parameter_order=True),
+            [
+                {
+                    "title": item.meta.title,
+                    "description": item.meta.description or None,
+                    "current_version_number": 1,
+                    "owner_id": user.id,
+                }
+                for item in items
+            ],
+        )
+    ).scalars().all()
+    version_ids = (
+        await db.execute(
+            insert(DocumentVersion).returning(DocumentVersion.id, sort_by_parameter_order=True),
+            [
+                {
+                    "document_id": doc_id,
+                    "version_number": 1,
+                    "file_path": file_path,
+                    "filename": item.staged.filename,
+                    "mime_type": item.staged.content_type,
+                    "file_size": item.staged.size,
+                    "content_hash": item.staged.sha256,
+                    "content_encoding": encoding_of(file_path),
+                    "uploaded_by": user.id,
+                    "uploaded_by_name": user.name,
+                }
+                for item, doc_id, file_path in zip(items, doc_ids, file_paths)
+            ],
+        )
+    ).scalars().all()
+
+    tag_rows = [
+        {"document_id": doc_id, "tag_id": tag_ids[name]}
+        for item, doc_id in zip(items, doc_ids)
+        for name in dict.fromkeys(item.meta.tags)
+    ]
+    if tag_rows:
+        await db.execute(insert(DocumentTag), tag_rows)
+    permission_rows = [
+        {"document_id": doc_id, "department_id": dep_id, "can_view": 1, "can_download": 1}
+        for item, doc_id in zip(items, doc_ids)
+        for dep_id in dict.fromkeys(item.meta.permission_department_ids)
+    ]
+    if permission_rows:
+        await db.execute(insert(DocumentPermission), permission_rows)
+    await acl.permissions_changed(db, {row["department_id"] for row in permission_rows})
+    await refresh_search_vectors(db, list(doc_ids))
+
+    for item, doc_id, version_id in zip(items, doc_ids, version_ids):
+        item.document_id, item.version_id = doc_id, version_id
+
+
+async def ingest(db: AsyncSession, user: User, items: List[BulkItem]) -> List[int]:
+    """
+    Creates one document (with version 1) per valid item, BULK_BATCH_SIZE documents per transaction,
+    using multi-row INSERT ... RETURNING instead of per-document flushes. A failed batch is rolled back
+    and its items reported as "failed"; batches before and after it are kept.
+    Returns: ids of the created versions (for text extraction)
+    """
+    pending = [item for item in items if item.error is None]
+    requested = {dep_id for item in pending for dep_id in item.meta.permission_department_ids}
+    known = set((await db.execute(select(Department.id).where(Department.id.in_(requested)))).scalars())
+    for item in pending:
+        if not set(item.meta.permission_department_ids) <= known:
+            item.error = "unknown_department"
+        elif not item.meta.permission_department_ids and user.department_id:
+            item.meta.permission_department_ids = [user.department_id]
+    pending = [item for item in pending if item.error is None]
+
+    version_ids: List[int] = []
+    for i in range(0, len(pending), settings.bulk_batch_size):
+        batch = pending[i:i + settings.bulk_batch_size]
+        try:
+            await _insert_batch(db, user, batch)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            log.exception("Bulk ingestion batch of %d documents failed", len(batch))
+            for item in batch:
+                item.document_id = item.version_id = None
+                item.error = "failed"
+            continue
+        version_ids += [item.version_id for item in batch]
+    metrics.inc("bulk.documents_created", len(version_ids))
+    metrics.inc("bulk.items_failed", len(items) - len(version_ids))
+    return version_ids
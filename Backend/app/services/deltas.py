@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.compression import encoding_of
+from app.core.deltas import encode, original_bytes, sha_of, stored_key
+from app.core.files import BLOB_PREFIX, DELTA_SUFFIX, STAGING_DIR, StagedFile, blob_key, place_blob
+from app.core.settings import settings
+from app.core.storage import get_storage
+from app.db.session import SessionLocal
+from app.models.blob import Blob
+from app.models.document import Document, DocumentVersion
+
+log = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """
+    Diffing has its own pool, apart from text extraction: each worker needs ~17x DELTA_MAX_MB of memory
+    while bsdiff runs, so DELTA_WORKERS bounds the total.
+    """
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that already runs threads (uvicorn, DB pool) is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.delta_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _is_current(db: Session, sha256: str) -> bool:
+    """Whether some document's current version has these bytes (those stay whole for fast downloads)."""
+    current = and_(
+        Document.id == DocumentVersion.document_id, Document.current_version_number == DocumentVersion.version_number
+    )
+    stmt = select(DocumentVersion.id).join(Document, current).where(DocumentVersion.content_hash == sha256).limit(1)
+    return db.execute(stmt).first() is not None
+
+
+def _chain(db: Session, sha256: str) -> List[str]:
+    """`sha256` and the blobs it is encoded against, nearest first; the last one is stored whole."""
+    chain = [sha256]
+    while True:
+        base = db.execute(select(Blob.base_sha256).where(Blob.sha256 == chain[-1])).scalar_one_or_none()
+        if base is None or base in chain:
+            return chain
+        chain.append(base)
+
+
+def _eligible(db: Session, target: Optional[Blob], base: Optional[Blob]) -> bool:
+    limit = settings.delta_max_mb * 1024 * 1024
+    return (
+        target is not None
+        and base is not None
+        and target.base_sha256 is None
+        and target.ref_count > 0
+        and target.size <= limit
+        and base.size <= limit
+        and target.sha256 not in _chain(db, base.sha256)
+        and not _is_current(db, target.sha256)
+    )
+
+
+def _plan(db: Session, target_sha: Optional[str], successor_sha: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    (target, base) for storing superseded blob `target_sha` as a delta against its successor, or None.
+    Past DELTA_MAX_CHAIN the delta goes against the root of the successor's chain instead.
+    """
+    if not target_sha or not successor_sha or target_sha == successor_sha:
+        return None
+    chain = _chain(db, successor_sha)
+    base_sha = chain[-1] if len(chain) > settings.delta_max_chain else successor_sha
+    if not _eligible(db, db.get(Blob, target_sha), db.get(Blob, base_sha)):
+        return None
+    return target_sha, base_sha
+
+
+def write_delta(target_sha: str, base_sha: str, max_bytes: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """
+    Diffs blob `target_sha` against `base_sha` and stores the result as <target>.bsdiff, unless it comes out
+    larger than `max_bytes` (default: DELTA_MAX_RATIO of what the blob takes now).
+    Runs inside the delta process pool, so it must stay free of DB/session state.
+    Returns: (bytes stored before, delta bytes), or None when the delta was not kept
+    """
+    storage = get_storage()
+    stored = storage.size(stored_key(target_sha))
+    delta = encode(base_sha, original_bytes(base_sha), original_bytes(target_sha))
+    if len(delta) > (settings.delta_max_ratio * stored if max_bytes is None else max_bytes):
+        return None
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    path = STAGING_DIR / uuid.uuid4().hex
+    path.write_bytes(delta)
+    try:
+        storage.put_file(blob_key(target_sha) + DELTA_SUFFIX, path)
+    finally:
+        path.unlink(missing_ok=True)
+    return stored, len(delta)
+
+
+def _lock(db: Session, *shas: str) -> Dict[str, Blob]:
+    # sorted so concurrent jobs lock blob rows in the same order
+    rows = db.execute(select(Blob).where(Blob.sha256.in_(shas)).order_by(Blob.sha256).with_for_update()).scalars()
+    return {blob.sha256: blob for blob in rows}
+
+
+def _point_versions(db: Session, sha256: str, key: str) -> None:
+    db.execute(
+        update(DocumentVersion)
+        .where(DocumentVersion.content_hash == sha256)
+        .values(file_path=key, content_encoding=encoding_of(key))
+    )
+
+
+def materialize(db: Session, sha256: str) -> str:
+    """Stores blob `sha256` whole again (compressed if it qualifies) and points its versions back at it."""
+    blob = _lock(db, sha256)[sha256]
+    mime = db.execute(
+        select(DocumentVersion.mime_type).where(DocumentVersion.content_hash == sha256).limit(1)
+    ).scalar()
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    path = STAGING_DIR / uuid.uuid4().hex
+    path.write_bytes(original_bytes(sha256))
+    staged = StagedFile(
+        path=path, filename=sha256, content_type=mime or "application/octet-stream", size=blob.size, sha256=sha256
+    )
+    key = place_blob(staged, reuse_existing=False)
+    blob.base_sha256 = None
+    blob.superseded_at = func.now()  # the delta goes with collect_garbage, after downloads still reading it
+    _point_versions(db, sha256, key)
+    db.commit()
+    return key
+
+
+def apply_delta(db: Session, target_sha: str, base_sha: str, stored: int, delta_size: int) -> bool:
+    """Switches blob `target_sha` to its freshly written delta, or drops the delta if the blob no longer qualifies."""
+    storage = get_storage()
+    key = blob_key(target_sha)
+    blobs = _lock(db, target_sha, base_sha)
+    if not _eligible(db, blobs.get(target_sha), blobs.get(base_sha)):
+        db.rollback()
+        storage.delete(key + DELTA_SUFFIX)
+        return False
+    if not storage.exists(key + DELTA_SUFFIX):
+        # collect_garbage took it for a leftover of an earlier delta before we held the lock
+        db.rollback()
+        return False
+    blobs[target_sha].base_sha256 = base_sha
+    # the whole copy stays until collect_garbage: downloads that resolved it may still be streaming it
+    blobs[target_sha].superseded_at = func.now()
+    _point_versions(db, target_sha, key + DELTA_SUFFIX)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        storage.delete(key + DELTA_SUFFIX)
+        raise
+    metrics.inc("delta.blobs_encoded")
+    metrics.inc("delta.bytes_saved", stored - delta_size)
+    return True
+
+
+def _rebase(db: Session, target_sha: str, root_sha: str) -> None:
+    blobs = _lock(db, target_sha, root_sha)
+    if target_sha in blobs and root_sha in blobs:
+        blobs[target_sha].base_sha256 = root_sha  # the object names its base too, so readers never mix them up
+    db.commit()
+
+
+def _previous_and_current(db: Session, document_id: int) -> Optional[Tuple[str, str]]:
+    doc = db.get(Document, document_id)
+    if doc is None or doc.current_version_number < 2:
+        return None
+    n = doc.current_version_number
+    hashes = dict(
+        db.execute(
+            select(DocumentVersion.version_number, DocumentVersion.content_hash).where(
+                DocumentVersion.document_id == document_id, DocumentVersion.version_number.in_([n - 1, n])
+            )
+        ).all()
+    )
+    current = db.get(Blob, hashes[n]) if hashes.get(n) else None
+    if current is not None and current.base_sha256 is not None:
+        materialize(db, current.sha256)  # re-uploaded bytes of an older version: the current one stays whole
+    return _plan(db, hashes.get(n - 1), hashes.get(n))
+
+
+async def encode_superseded_in_background(document_id: int) -> None:
+    """
+    BackgroundTasks entry point after a new version: the previous version's blob becomes a delta against
+    the new one. DB work in the threadpool, diffing in the delta process pool.
+    """
+    loop = asyncio.get_running_loop()
+
+    def plan():
+        with SessionLocal() as db:
+            return _previous_and_current(db, document_id)
+
+    pair = await run_in_threadpool(plan)
+    if pair is None:
+        return
+    try:
+        result = await loop.run_in_executor(get_executor(), write_delta, *pair)
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            shutdown_executor()
+        log.exception("Delta encoding of blob %s failed", pair[0])
+        return
+    if result is None:
+        return
+
+    def apply():
+        with SessionLocal() as db:
+            apply_delta(db, *pair, *result)
+
+    await run_in_threadpool(apply)
+
+
+def encode_backlog(db: Session) -> Dict[str, int]:
+    """Stores every superseded version that still takes a whole blob as a delta against the version after it."""
+    rows = db.execute(
+        select(DocumentVersion.document_id, DocumentVersion.content_hash)
+        .where(DocumentVersion.content_hash.isnot(None))
+        .order_by(DocumentVersion.document_id, DocumentVersion.version_number)
+    ).all()
+    pairs = {}
+    for (doc_id, target), (next_doc_id, successor) in zip(rows, rows[1:]):
+        if doc_id == next_doc_id:
+            pair = _plan(db, target, successor)
+            if pair is not None:
+                pairs.setdefault(pair[0], pair)  # one delta per blob, whichever document it came from
+    db.rollback()
+
+    counts = {"encoded": 0, "not_worth_it": 0, "failed": 0}
+    executor = get_executor()
+    futures = {executor.submit(write_delta, *pair): pair for pair in pairs.values()}
+    for fut in as_completed(futures):
+        pair = futures[fut]
+        try:
+            result = fut.result()
+        except Exception:  # one unreadable blob must not stop the run
+            log.exception("Delta encoding of blob %s failed", pair[0])
+            counts["failed"] += 1
+            continue
+        if result is not None and apply_delta(db, *pair, *result):
+            counts["encoded"] += 1
+        else:
+            counts["not_worth_it"] += 1
+    return counts
+
+
+def rebase_chains(db: Session) -> Dict[str, int]:
+    """
+    Re-encodes deltas deeper than DELTA_MAX_CHAIN against the whole blob at the root of their chain,
+    and stores whole again any delta blob that became some document's current version.
+    """
+    bases = dict(db.execute(select(Blob.sha256, Blob.base_sha256).where(Blob.base_sha256.isnot(None))).all())
+    sizes = dict(db.execute(select(Blob.sha256, Blob.size).where(Blob.base_sha256.isnot(None))).all())
+    counts = {"rebased": 0, "materialized": 0}
+    for sha in sorted(bases):
+        if _is_current(db, sha):
+            db.rollback()
+            materialize(db, sha)
+            counts["materialized"] += 1
+    bases = dict(db.execute(select(Blob.sha256, Blob.base_sha256).where(Blob.base_sha256.isnot(None))).all())
+    db.rollback()
+
+    executor = get_executor()
+    futures = {}
+    for sha in bases:
+        chain = [sha]
+        while chain[-1] in bases and bases[chain[-1]] not in chain:
+            chain.append(bases[chain[-1]])
+        if len(chain) - 1 > settings.delta_max_chain:
+            futures[executor.submit(write_delta, sha, chain[-1], sizes[sha])] = (sha, chain[-1])
+    for fut in as_completed(futures):
+        sha, root = futures[fut]
+        result = fut.result()
+        if result is None:  # as big as the file itself against this root
+            materialize(db, sha)
+            counts["materialized"] += 1
+        else:
+            _rebase(db, sha, root)
+            counts["rebased"] += 1
+    return counts
+
+
+def delta_report(db: Session, sample: int = 20) -> Dict[str, float]:
+    """
+    Disk saved by delta-stored blobs, their chain depths, and how long rebuilding one takes
+    without the cache, measured on up to `sample` of them.
+    """
+    rows = db.execute(select(Blob.sha256, Blob.base_sha256, Blob.size).where(Blob.base_sha256.isnot(None))).all()
+    bases = {sha: base for sha, base, _ in rows}
+    sizes = {sha: size for sha, _, size in rows}
+    original = stored = 0
+    sampled = []
+    for key, size, _ in get_storage().list_keys(BLOB_PREFIX):
+        sha = sha_of(key)
+        if not key.endswith(DELTA_SUFFIX) or sha not in bases:
+            continue
+        original += sizes[sha]
+        stored += size
+        if len(sampled) < sample:
+            sampled.append(sha)
+
+    depths = []
+    for sha in bases:
+        depth, base = 1, bases[sha]
+        while base in bases and depth <= len(bases):
+            depth, base = depth + 1, bases[base]
+        depths.append(depth)
+
+    timings = []
+    for sha in sampled:
+        started = time.perf_counter()
+        original_bytes(sha, cache=False)
+        timings.append(time.perf_counter() - started)
+    return {
+        "delta_blobs": len(bases),
+        "original_bytes": original,
+        "stored_bytes": stored,
+        "bytes_saved": original - stored,
+        "saving_ratio": round(1 - stored / original, 3) if original else 0.0,
+        "max_chain": max(depths, default=0),
+        "avg_chain": round(sum(depths) / len(depths), 2) if depths else 0.0,
+        "sampled": len(timings),
+        "reconstruct_ms_avg": round(1000 * sum(timings) / len(timings), 1) if timings else 0.0,
+        "reconstruct_ms_max": round(1000 * max(timings), 1) if timings else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta storage for superseded document versions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("run", help="encode superseded versions as deltas, then shorten chains past DELTA_MAX_CHAIN")
+    rp = sub.add_parser("report", help="print disk saved by deltas, chain depths and reconstruction latency")
+    rp.add_argument("--sample", type=int, default=20, help="delta blobs to rebuild and time")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "run":
+            try:
+                print({**encode_backlog(db), **rebase_chains(db)})
+            finally:
+                shutdown_executor()
+        else:
+            print(delta_report(db, sample=args.sample))
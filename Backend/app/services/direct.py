@@ -0,0 +1,91 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.core.files import StagedFile, incoming_key
+from app.core.security import create_access_token, decode_token
+from app.core.settings import settings
+from app.core.storage import StorageError, get_storage
+from app.models.document import DocumentVersion
+from app.models.user import User
+
+TOKEN_TYPE = "direct_upload"
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def issue_upload(
+    user: User,
+    filename: str,
+    content_type: Optional[str],
+    size: int,
+    sha256: str,
+    document_id: Optional[int] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Signed PUT URL for a new object under incoming/, bound to the declared size and SHA-256,
+    plus a token carrying everything needed to finish the upload in complete_direct_upload.
+    document_id is set for a new version; metadata (title, tags, ...) for a new document.
+    """
+    sha256 = sha256.lower()
+    if not _SHA256_RE.match(sha256):
+        raise ValueError("bad_sha256")
+    key = incoming_key()
+    url, headers = get_storage().presign(key, "PUT", content_sha256=sha256, content_length=size)
+    # the token outlives the URL so a slow upload can still be completed
+    token = create_access_token(
+        {
+            "typ": TOKEN_TYPE,
+            "uid": user.id,
+            "key": key,
+            "doc": document_id,
+            "filename": filename,
+            "content_type": content_type or "application/octet-stream",
+            "size": size,
+            "sha256": sha256,
+            "meta": metadata,
+        },
+        expires_minutes=settings.upload_session_ttl_hours * 60,
+    )
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.storage_url_ttl_seconds)
+    return {"upload_token": token, "url": url, "method": "PUT", "headers": headers, "expires_at": expires_at.isoformat()}
+
+
+def read_upload_token(token: str, user: User) -> Dict[str, Any]:
+    try:
+        claims = decode_token(token)
+    except ValueError:
+        raise ValueError("invalid")
+    if claims.get("typ") != TOKEN_TYPE:
+        raise ValueError("invalid")
+    if claims.get("uid") != user.id:
+        raise ValueError("forbidden")
+    return claims
+
+
+def received_file(claims: Dict[str, Any]) -> StagedFile:
+    """
+    The uploaded object as a staged file. Content integrity was enforced by the storage side
+    (S3 checksum / signed local PUT); here we only confirm the object arrived whole.
+    """
+    try:
+        size = get_storage().size(claims["key"])
+    except StorageError:
+        raise ValueError("missing")
+    if size != claims["size"]:
+        raise ValueError("size_mismatch")
+    return StagedFile(
+        path=None,
+        filename=claims["filename"],
+        content_type=claims["content_type"],
+        size=size,
+        sha256=claims["sha256"],
+        storage_key=claims["key"],
+    )
+
+
+def download_url(v: DocumentVersion) -> Dict[str, Any]:
+    url, _ = get_storage().presign(v.file_path, "GET", filename=v.filename, content_type=v.mime_type)
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.storage_url_ttl_seconds)
+    return {"url": url, "expires_at": expires_at.isoformat()}
+
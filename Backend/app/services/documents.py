@@ -1,9 +1,15 @@
 from typing import List, Optional, Tuple
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
-from app.models.document import Document, DocumentVersion, Tag, DocumentPermission
+from sqlalchemy import Select, and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.document import Document, DocumentVersion, Tag, DocumentTag, DocumentPermission
 from app.models.user import User
-from app.core.files import save_upload_for_version
+from app.core.compression import encoding_of
+from app.core.files import StagedFile
+from app.services.search import refresh_search_vector
+from app.services.blobs import acquire_blob_async
+from app.services import acl, reference
 
 
 def parse_csv(csv: Optional[str]) -> List[str]:
@@ -12,39 +18,80 @@ def parse_csv(csv: Optional[str]) -> List[str]:
     return [s.strip() for s in csv.split(",") if s.strip()]
 
 
-def get_or_create_tags(db: Session, tag_names: List[str]) -> List[Tag]:
+def viewable_documents_query(department_id: int) -> Select:
+    # EXISTS instead of a join so a document is returned once even with several permission rows
+    return select(Document).where(
+        Document.permissions.any(
+            and_(
+                DocumentPermission.department_id == department_id,
+                DocumentPermission.can_view == 1,
+            )
+        )
+    )
+
+
+def downloadable_documents_query(user_id: int, department_id: Optional[int]) -> Select:
+    # the download_document rule (owner, or a can_download row for the department) for many documents at once
+    allowed = Document.owner_id == user_id
+    if department_id:
+        allowed = or_(
+            allowed,
+            Document.permissions.any(
+                and_(
+                    DocumentPermission.department_id == department_id,
+                    DocumentPermission.can_download == 1,
+                )
+            ),
+        )
+    return select(Document).where(allowed)
+
+
+async def get_or_create_tags(db: AsyncSession, tag_names: List[str]) -> List[Tag]:
     if not tag_names:
         return []
-    existing = db.query(Tag).filter(Tag.name.in_(tag_names)).all()
+    existing = list((await db.execute(select(Tag).where(Tag.name.in_(tag_names)))).scalars())
     existing_names = {t.name for t in existing}
-    to_create = [Tag(name=n) for n in tag_names if n not in existing_names]
+    to_create = [Tag(name=n) for n in dict.fromkeys(tag_names) if n not in existing_names]
     for t in to_create:
         db.add(t)
     if to_create:
-        db.flush()
+        await db.flush()
+        await reference.reference_changed(db, reference.TAGS)
     return existing + to_create
 
 
-def set_document_permissions(
-    db: Session, document: Document, department_ids: List[int]
+async def set_document_tags(db: AsyncSession, document: Document, tags: List[Tag]) -> None:
+    # rows instead of `document.tags = ...`: assigning a collection would lazy-load the old one
+    await db.execute(delete(DocumentTag).where(DocumentTag.document_id == document.id))
+    db.add_all([DocumentTag(document_id=document.id, tag_id=t.id) for t in tags])
+
+
+async def set_document_permissions(
+    db: AsyncSession, document: Document, department_ids: List[int]
 ) -> None:
     # If no departments provided, default to uploader's department (common UX)
-    existing = { (p.document_id, p.department_id) for p in document.permissions }
-    for dep_id in department_ids:
-        key = (document.id, dep_id)
-        if key in existing:
+    existing = set(
+        (
+            await db.execute(
+                select(DocumentPermission.department_id).where(DocumentPermission.document_id == document.id)
+            )
+        ).scalars()
+    )
+    for dep_id in dict.fromkeys(department_ids):
+        if dep_id in existing:
             continue
         db.add(DocumentPermission(document_id=document.id, department_id=dep_id, can_view=1, can_download=1))
+    await acl.permissions_changed(db, department_ids)
 
 
-def create_document_with_v1(
-    db: Session,
+async def create_document_with_v1(
+    db: AsyncSession,
     current_user: User,
     title: str,
     description: Optional[str],
     tag_names: List[str],
     permitted_department_ids: List[int],
-    upload_file,  # UploadFile
+    staged: StagedFile,
 ) -> Tuple[Document, DocumentVersion, List[Tag]]:
     # Create base document
     doc = Document(
@@ -54,84 +101,81 @@ def create_document_with_v1(
         owner_id=current_user.id,
     )
     db.add(doc)
-    db.flush()  # get doc.id
+    await db.flush()  # get doc.id
 
-    # Persist the file for version 1
-    file_path, file_size, mime = save_upload_for_version(doc.id, 1, upload_file)
+    # Store the staged upload (deduplicated by content) for version 1
+    file_path = await acquire_blob_async(db, staged)
     v1 = DocumentVersion(
         document_id=doc.id,
         version_number=1,
         file_path=file_path,
-        mime_type=mime,
-        file_size=file_size,
+        filename=staged.filename,
+        mime_type=staged.content_type,
+        file_size=staged.size,
+        content_hash=staged.sha256,
+        content_encoding=encoding_of(file_path),
         uploaded_by=current_user.id,
         uploaded_by_name=current_user.name,
     )
     db.add(v1)
 
     # Tags
-    tags = get_or_create_tags(db, tag_names)
+    tags = await get_or_create_tags(db, tag_names)
     if tags:
-        doc.tags = tags
+        await set_document_tags(db, doc, tags)
 
     # Permissions (default to user's department if none provided)
     if not permitted_department_ids and current_user.department_id:
         permitted_department_ids = [current_user.department_id]
-    set_document_permissions(db, doc, permitted_department_ids)
+    await set_document_permissions(db, doc, permitted_department_ids)
+
+    await db.flush()
+    await refresh_search_vector(db, doc.id)
 
-    db.commit()
-    db.refresh(doc)
-    db.refresh(v1)
+    await db.commit()
+    await db.refresh(doc, ["updated_at"])
+    await db.refresh(v1)
     return doc, v1, tags
 
 
 
-def user_can_view_document(db: Session, document_id: int, user_department_id: Optional[int]) -> bool:
-    if not user_department_id:
-        return False
-    exists = (
-        db.query(DocumentPermission)
-        .filter(
-            DocumentPermission.document_id == document_id,
-            DocumentPermission.department_id == user_department_id,
-            DocumentPermission.can_view == 1,
-        )
-        .first()
-        is not None
-    )
-    return exists
+async def user_can_view_document(db: AsyncSession, document_id: int, user_department_id: Optional[int]) -> bool:
+    # served from the per-department ACL cache; SQL only on a miss
+    return await acl.can_view(db, document_id, user_department_id)
 
-def user_can_download_document(db: Session, document_id: int, user_department_id: Optional[int]) -> bool:
-    if not user_department_id:
-        return False
-    return (
-        db.query(DocumentPermission)
-        .filter(
-            DocumentPermission.document_id == document_id,
-            DocumentPermission.department_id == user_department_id,
-            DocumentPermission.can_download == 1,
-        )
-        .first()
-        is not None
-    )
 
+async def user_can_download_document(db: AsyncSession, document_id: int, user_department_id: Optional[int]) -> bool:
+    return await acl.can_download(db, document_id, user_department_id)
 
-def get_document_or_404(db: Session, document_id: int) -> Document:
-    doc = db.query(Document).get(document_id)
+
+async def get_document_or_404(db: AsyncSession, document_id: int, *options) -> Document:
+    # owner is joined in: permission checks and detail responses read it
+    doc = await db.get(Document, document_id, options=[joinedload(Document.owner), *options])
     if not doc:
         raise ValueError("not_found")
     return doc
 
 
-def get_versions_for_document(db: Session, document_id: int) -> List[DocumentVersion]:
+def versions_query(document_id: int) -> Select:
     return (
-        db.query(DocumentVersion)
-        .filter(DocumentVersion.document_id == document_id)
+        select(DocumentVersion)
+        .where(DocumentVersion.document_id == document_id)
         .order_by(DocumentVersion.version_number.desc())
-        .all()
     )
 
-def resolve_version(db: Session, document: Document, which: Optional[str]) -> DocumentVersion:
+
+def version_query(document_id: int, version_number: int) -> Select:
+    return select(DocumentVersion).where(
+        DocumentVersion.document_id == document_id,
+        DocumentVersion.version_number == version_number,
+    )
+
+
+async def get_versions_for_document(db: AsyncSession, document_id: int) -> List[DocumentVersion]:
+    result = await db.execute(versions_query(document_id))
+    return list(result.scalars())
+
+async def resolve_version(db: AsyncSession, document: Document, which: Optional[str]) -> DocumentVersion:
     if which in (None, "", "latest"):
         vnum = document.current_version_number
     else:
@@ -139,14 +183,7 @@ def resolve_version(db: Session, document: Document, which: Optional[str]) -> Do
             vnum = int(which)
         except ValueError:
             raise ValueError("bad_version")
-    v = (
-        db.query(DocumentVersion)
-        .filter(
-            DocumentVersion.document_id == document.id,
-            DocumentVersion.version_number == vnum,
-        )
-        .first()
-    )
+    v = (await db.execute(version_query(document.id, vnum))).scalars().first()
     if not v:
         raise ValueError("not_found")
     return v
@@ -157,29 +194,48 @@ def can_upload_new_version(doc: Document, user: User) -> bool:
     return bool(user.department_id and doc.owner and doc.owner.department_id == user.department_id)
 
 
-def add_new_version(
-    db: Session, doc: Document, user: User, upload_file
+async def allocate_version_number(db: AsyncSession, document_id: int) -> int:
+    """
+    The document's next version number, incremented in the database (UPDATE ... RETURNING) so that
+    concurrent uploads get distinct, consecutive numbers. The document row stays locked until the
+    transaction ends: call it last, right before the commit.
+    """
+    return (
+        await db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(current_version_number=Document.current_version_number + 1)
+            .returning(Document.current_version_number)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one()
+
+
+async def add_new_version(
+    db: AsyncSession, doc: Document, user: User, staged: StagedFile
 ) -> DocumentVersion:
-    new_version = (doc.current_version_number or 0) + 1
-    file_path, file_size, mime = save_upload_for_version(doc.id, new_version, upload_file)
+    file_path = await acquire_blob_async(db, staged)  # bytes are durable before a number is taken
+    new_version = await allocate_version_number(db, doc.id)
     v = DocumentVersion(
         document_id=doc.id,
         version_number=new_version,
         file_path=file_path,
-        mime_type=mime,
-        file_size=file_size,
+        filename=staged.filename,
+        mime_type=staged.content_type,
+        file_size=staged.size,
+        content_hash=staged.sha256,
+        content_encoding=encoding_of(file_path),
         uploaded_by=user.id,
         uploaded_by_name=user.name,
     )
     db.add(v)
-    doc.current_version_number = new_version
-    db.commit()
-    db.refresh(v)
-    db.refresh(doc)
+    await db.commit()
+    set_committed_value(doc, "current_version_number", new_version)
+    await db.refresh(v)
     return v
 
-def replace_document_metadata(
-    db: Session,
+async def replace_document_metadata(
+    db: AsyncSession,
     doc: Document,
     title: Optional[str],
     description: Optional[str],
@@ -192,19 +248,29 @@ def replace_document_metadata(
         doc.description = description
 
     if tag_names is not None:
-        tags = get_or_create_tags(db, tag_names)
-        doc.tags = tags
+        tags = await get_or_create_tags(db, tag_names)
+        await set_document_tags(db, doc, tags)
 
     if permission_department_ids is not None:
-        db.query(DocumentPermission).filter(DocumentPermission.document_id == doc.id).delete(synchronize_session=False)
-        db.flush()
+        previous = (
+            await db.execute(
+                select(DocumentPermission.department_id).where(DocumentPermission.document_id == doc.id)
+            )
+        ).scalars().all()
+        await db.execute(delete(DocumentPermission).where(DocumentPermission.document_id == doc.id))
+        await db.flush()
+        await acl.permissions_changed(db, list(previous) + list(permission_department_ids))
         if permission_department_ids:
-            for dep_id in permission_department_ids:
+            for dep_id in dict.fromkeys(permission_department_ids):
                 db.add(
                     DocumentPermission(
                         document_id=doc.id, department_id=dep_id, can_view=1, can_download=1
                     )
                 )
 
-    db.commit()
-    db.refresh(doc)
\ No newline at end of file
+    if title is not None or description is not None or tag_names is not None:
+        await db.flush()
+        await refresh_search_vector(db, doc.id)
+
+    await db.commit()
+    await db.refresh(doc, ["tags"])
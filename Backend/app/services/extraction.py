@@ -0,0 +1,265 @@
+import argparse
+import asyncio
+import html
+import multiprocessing
+import re
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.settings import settings
+from app.core.files import local_blob_copy
+from app.db.session import SessionLocal
+from app.models.document import DocumentContent, DocumentVersion
+from app.services.search import _regconfig
+
+TEXT_MIME_TYPES = {"application/json", "application/xml", "application/csv", "application/x-yaml"}
+TEXT_SUFFIXES = {".txt", ".md", ".csv", ".tsv", ".json", ".xml", ".yaml", ".yml", ".log", ".html", ".htm", ".rtf"}
+
+# zip-based office formats: archive member pattern holding the text
+OFFICE_MEMBERS = {
+    ".docx": re.compile(r"word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$"),
+    ".pptx": re.compile(r"ppt/slides/slide\d+\.xml$"),
+    ".xlsx": re.compile(r"xl/sharedStrings\.xml$"),
+    ".odt": re.compile(r"content\.xml$"),
+    ".ods": re.compile(r"content\.xml$"),
+    ".odp": re.compile(r"content\.xml$"),
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+_CHUNK = 1024 * 1024
+
+_executor: Optional[Executor] = None
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def _original_name(file_path: str, filename: Optional[str]) -> str:
+    if filename:
+        return filename
+    # legacy layout: v{n}_{uuid8}_{original_name}
+    parts = Path(file_path).name.split("_", 2)
+    return parts[2] if len(parts) == 3 else Path(file_path).name
+
+
+def _xml_to_text(raw: str) -> str:
+    # paragraph/cell ends become spaces before tags are stripped so words don't run together
+    raw = re.sub(r"</(w:p|a:p|text:p|si|t)>", " ", raw)
+    return html.unescape(_TAG_RE.sub(" ", raw))
+
+
+def _read_text(path: str, limit: int) -> str:
+    out: List[str] = []
+    size = 0
+    with open(path, "rb") as f:
+        while size < limit:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            text = chunk.decode("utf-8", errors="ignore")
+            out.append(text)
+            size += len(text)
+    return "".join(out)
+
+
+def _read_pdf(path: str, limit: int) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedFormat("pypdf is not installed")
+    out: List[str] = []
+    size = 0
+    for page in PdfReader(path).pages:  # pages are parsed lazily, one at a time
+        text = page.extract_text() or ""
+        out.append(text)
+        size += len(text)
+        if size >= limit:
+            break
+    return "\n".join(out)
+
+
+def _read_office(path: str, member_re: "re.Pattern[str]", limit: int) -> str:
+    out: List[str] = []
+    size = 0
+    with zipfile.ZipFile(path) as zf:
+        for name in sorted(n for n in zf.namelist() if member_re.search(n)):
+            with zf.open(name) as member:
+                text = _xml_to_text(member.read().decode("utf-8", errors="ignore"))
+            out.append(text)
+            size += len(text)
+            if size >= limit:
+                break
+    return " ".join(out)
+
+
+def extract_text(file_key: str, mime_type: Optional[str], filename: Optional[str], limit: int) -> str:
+    """
+    Plain-text content of a stored file, at most `limit` characters.
+    Runs inside the extraction process pool, so it must stay free of DB/session state.
+    """
+    suffix = Path(_original_name(file_key, filename)).suffix.lower()
+    mime = (mime_type or "").split(";")[0].strip().lower()
+
+    if mime == "application/pdf" or suffix == ".pdf":
+        reader = _read_pdf
+    elif suffix in OFFICE_MEMBERS:
+        reader = lambda path, lim: _read_office(path, OFFICE_MEMBERS[suffix], lim)  # noqa: E731
+    elif mime.startswith("text/") or mime in TEXT_MIME_TYPES or suffix in TEXT_SUFFIXES:
+        reader = _read_text
+    else:
+        raise UnsupportedFormat(mime or suffix or "unknown")
+
+    with local_blob_copy(file_key) as path:
+        text = reader(str(path), limit)
+    if suffix in (".html", ".htm", ".xml") or mime in ("text/html", "application/xml", "text/xml"):
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    # Postgres text cannot hold NUL, which binary-ish "text" files and some PDFs contain; it separates words there
+    return _SPACE_RE.sub(" ", text.replace("\x00", " ")).strip()[:limit]
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that already runs threads (uvicorn, DB pool) is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.extraction_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _store_result(db: Session, version: DocumentVersion, status: str, text: Optional[str], error: Optional[str]) -> None:
+    row = db.query(DocumentContent).filter(DocumentContent.version_id == version.id).first()
+    if row is None:
+        row = DocumentContent(document_id=version.document_id, version_id=version.id, version_number=version.version_number)
+        db.add(row)
+    row.status = status
+    row.content = text
+    row.error = error
+    row.content_vector = func.to_tsvector(_regconfig(), text) if text else None
+    db.commit()
+
+
+def _store_or_fail(db: Session, version: DocumentVersion, status: str, text: Optional[str], error: Optional[str]) -> str:
+    """_store_result, recording the version as failed if its result cannot be written. Returns: the stored status"""
+    try:
+        _store_result(db, version, status, text, error)
+        return status
+    except Exception as e:
+        db.rollback()
+        status, text, error = _failure(e)
+        _store_result(db, version, status, text, error)
+        return status
+
+
+def _failure(e: Exception) -> Tuple[str, Optional[str], Optional[str]]:
+    """Returns: (status, text, error) for an extraction that raised"""
+    if isinstance(e, UnsupportedFormat):
+        return "unsupported", None, str(e)
+    if isinstance(e, BrokenProcessPool):
+        # a worker died (e.g. OOM on a hostile file); the pool is unusable, start a fresh one next time
+        shutdown_executor()
+    return "failed", None, repr(e)
+
+
+def _extract_batch(version_ids: List[int], executor: Executor) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    with SessionLocal() as db:
+        versions = db.query(DocumentVersion).filter(DocumentVersion.id.in_(version_ids)).all()
+        futures = {
+            executor.submit(extract_text, v.file_path, v.mime_type, v.filename, settings.extraction_max_chars): v
+            for v in versions
+        }
+        for fut in as_completed(futures):
+            try:
+                status, text, error = "done", fut.result(), None
+            except Exception as e:  # corrupt files must not stop a backfill
+                status, text, error = _failure(e)
+            status = _store_or_fail(db, futures[fut], status, text, error)
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+async def extract_version_in_background(version_id: int) -> None:
+    """
+    BackgroundTasks entry point: DB work in the threadpool, parsing in the process pool,
+    nothing on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+
+    def load():
+        with SessionLocal() as db:
+            v = db.get(DocumentVersion, version_id)
+            return (v.file_path, v.mime_type, v.filename) if v else None
+
+    info = await run_in_threadpool(load)
+    if info is None:
+        return
+    try:
+        text = await loop.run_in_executor(get_executor(), extract_text, *info, settings.extraction_max_chars)
+        status, error = "done", None
+    except Exception as e:
+        status, text, error = _failure(e)
+
+    def store():
+        with SessionLocal() as db:
+            v = db.get(DocumentVersion, version_id)
+            if v is not None:
+                _store_or_fail(db, v, status, text, error)
+
+    await run_in_threadpool(store)
+
+
+async def extract_versions_in_background(version_ids: List[int], batch_size: int = 200) -> None:
+    """BackgroundTasks entry point for many new versions at once (bulk ingestion)."""
+    for i in range(0, len(version_ids), batch_size):
+        await run_in_threadpool(_extract_batch, version_ids[i:i + batch_size], get_executor())
+
+
+def pending_version_ids(db: Session, include_existing: bool = False) -> List[int]:
+    stmt = select(DocumentVersion.id).order_by(DocumentVersion.id)
+    if not include_existing:
+        stmt = stmt.where(~select(DocumentContent.id).where(DocumentContent.version_id == DocumentVersion.id).exists())
+    return list(db.execute(stmt).scalars())
+
+
+def backfill(include_existing: bool = False, retry_failed: bool = False, batch_size: int = 200) -> Dict[str, int]:
+    """Extract every version that has no content row yet (or all of them); safe to re-run."""
+    with SessionLocal() as db:
+        ids = pending_version_ids(db, include_existing=include_existing)
+        if retry_failed and not include_existing:
+            ids += list(
+                db.execute(select(DocumentContent.version_id).where(DocumentContent.status == "failed")).scalars()
+            )
+    counts: Dict[str, int] = {}
+    executor = get_executor()
+    try:
+        for i in range(0, len(ids), batch_size):
+            for status, n in _extract_batch(ids[i:i + batch_size], executor).items():
+                counts[status] = counts.get(status, 0) + n
+    finally:
+        shutdown_executor()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract searchable text from stored document versions.")
+    parser.add_argument("--all", action="store_true", help="re-extract versions that already have content")
+    parser.add_argument("--retry-failed", action="store_true", help="also retry versions whose extraction failed")
+    args = parser.parse_args()
+    print(backfill(include_existing=args.all, retry_failed=args.retry_failed))
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional
+
+from sqlalchemy import Integer, Select, case, cast, func, literal, null, select, union_all
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.settings import settings
+from app.models.department import Department
+from app.models.document import Document, DocumentTag, Tag
+from app.models.user import User
+
+# (label, highest current_version_number in the bucket), ascending; None: no upper bound
+VERSION_BUCKETS = (("1", 1), ("2", 2), ("3-5", 5), ("6-10", 10), ("11+", None))
+# (label, age) for updated_at, newest first; anything older (or unknown) is "older"
+UPDATED_RANGES = (("day", timedelta(days=1)), ("week", timedelta(days=7)), ("month", timedelta(days=30)),
+                  ("year", timedelta(days=365)))
+
+_cache = TTLCache(settings.search_facets_cache_size, settings.search_facets_ttl_seconds)
+
+
+def _version_bucket():
+    return case(
+        *[
+            (Document.current_version_number <= high, label)
+            for label, high in VERSION_BUCKETS
+            if high is not None
+        ],
+        else_=VERSION_BUCKETS[-1][0],
+    )
+
+
+def _updated_range(now: datetime):
+    return case(
+        *[(Document.updated_at >= now - age, label) for label, age in UPDATED_RANGES],
+        else_="older",
+    )
+
+
+def facets_query(matched: Select, now: datetime, tags_max: int) -> Select:
+    """
+    All facet counts for the documents `matched` selects (already permission- and filter-restricted),
+    as one UNION ALL of grouped aggregates: rows of (facet, id, value, documents).
+    Only the `tags_max` most frequent tags are kept, ranked in SQL.
+    """
+    docs = matched.with_only_columns(
+        Document.id.label("id"),
+        Document.owner_id.label("owner_id"),
+        _version_bucket().label("version_bucket"),
+        _updated_range(now).label("updated_range"),
+    ).order_by(None).cte("matched")
+    no_id = cast(null(), Integer)
+
+    tag_counts = (
+        select(
+            Tag.id,
+            Tag.name,
+            func.count().label("n"),
+            func.row_number().over(order_by=(func.count().desc(), Tag.name)).label("position"),
+        )
+        .select_from(docs)
+        .join(DocumentTag, DocumentTag.document_id == docs.c.id)
+        .join(Tag, Tag.id == DocumentTag.tag_id)
+        .group_by(Tag.id, Tag.name)
+        .subquery("tag_counts")
+    )
+    by_tag = select(
+        literal("tags").label("facet"),
+        tag_counts.c.id.label("id"),
+        tag_counts.c.name.label("value"),
+        tag_counts.c.n.label("n"),
+    ).where(tag_counts.c.position <= tags_max)
+    by_department = (
+        select(literal("departments"), Department.id, Department.name, func.count())
+        .select_from(docs)
+        .join(User, User.id == docs.c.owner_id)
+        .join(Department, Department.id == User.department_id)
+        .group_by(Department.id, Department.name)
+    )
+    by_version = select(literal("versions"), no_id, docs.c.version_bucket, func.count()).group_by(
+        docs.c.version_bucket
+    )
+    by_updated = select(literal("updated"), no_id, docs.c.updated_range, func.count()).group_by(
+        docs.c.updated_range
+    )
+    return union_all(by_tag, by_department, by_version, by_updated)
+
+
+def facets_column(matched: Select, now: datetime):
+    """
+    facets_query() as a JSON array of [facet, id, value, documents] rows, for a column of the page query:
+    it is uncorrelated, so the database evaluates it once and the counts ride along with the page.
+    """
+    rows = facets_query(matched, now, settings.search_facets_tags_max).subquery("facet_rows")
+    return (
+        select(func.json_agg(func.json_build_array(rows.c.facet, rows.c.id, rows.c.value, rows.c.n)))
+        .scalar_subquery()
+        .label("facets")
+    )
+
+
+def _ordered(rows: List[tuple], facet: str, labels: Optional[List[str]] = None) -> List[Dict]:
+    counts = [(item_id, value, n) for f, item_id, value, n in rows if f == facet]
+    if labels is not None:
+        # fixed buckets in their natural order, empty ones included
+        found = {value: n for _, value, n in counts}
+        return [{"value": label, "count": found.get(label, 0)} for label in labels]
+    counts.sort(key=lambda c: (-c[2], c[1]))
+    return [{"id": item_id, "value": value, "count": n} for item_id, value, n in counts]
+
+
+def cached_facets(signature: Hashable) -> Optional[Dict[str, List[Dict]]]:
+    """
+    Facet counts cached for SEARCH_FACETS_TTL_SECONDS under `signature`, which must identify the
+    department and every filter that went into the matches; None on a miss.
+    """
+    cached = _cache.get(signature)
+    metrics.inc("search_facets.hits" if cached is not None else "search_facets.misses")
+    return cached
+
+
+def store_facets(signature: Hashable, rows: Optional[List]) -> Dict[str, List[Dict]]:
+    """Facet counts from the rows of a facets_column() value (None: no matches), cached under `signature`."""
+    rows = [tuple(r) for r in rows or []]
+    facets = {
+        "tags": _ordered(rows, "tags"),
+        "departments": _ordered(rows, "departments"),
+        "versions": _ordered(rows, "versions", [label for label, _ in VERSION_BUCKETS]),
+        "updated": _ordered(rows, "updated", [label for label, _ in UPDATED_RANGES] + ["older"]),
+    }
+    _cache.set(signature, facets)
+    return facets
@@ -0,0 +1,66 @@
+import importlib.util
+from typing import Any, Dict, List, Tuple
+
+import anyio
+from sqlalchemy import text
+
+from app.core.settings import settings
+from app.core.storage import get_storage
+from app.db.instrumentation import pool_status
+from app.db.routing import healthy_replicas
+from app.db.session import async_engine, replica_engines
+
+
+def check_dependencies() -> None:
+    """
+    Worker startup: the optional packages the configured features need are installed. Raises instead of
+    letting the first upload or download of such a blob fail.
+    """
+    from app.core import compression, deltas, profiling
+
+    missing: List[Tuple[str, str]] = []
+    if settings.storage_backend == "s3" and importlib.util.find_spec("boto3") is None:
+        missing.append(("STORAGE_BACKEND=s3", "boto3"))
+    if settings.storage_compression == compression.ZSTD and compression.zstandard is None:
+        missing.append(("STORAGE_COMPRESSION=zstd", "zstandard"))
+    if settings.storage_deltas and deltas.bsdiff4 is None:
+        missing.append(("STORAGE_DELTAS=true", "bsdiff4"))
+    if settings.profiling_enabled and settings.profiling_sampler and profiling.Profiler is None:
+        missing.append(("PROFILING_SAMPLER=true", "pyinstrument"))
+    if missing:
+        raise RuntimeError("; ".join(f"{feature} needs {package} (pip install {package})" for feature, package in missing))
+
+
+async def _check_database() -> str:
+    # a pool with no free connection fails here too, once HEALTH_TIMEOUT_SECONDS pass
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return "ok"
+
+
+async def _check_storage() -> str:
+    # abandoned on timeout: a hung S3 call must not hold the probe
+    healthy = await anyio.to_thread.run_sync(get_storage().health, abandon_on_cancel=True)
+    return "ok" if healthy else "unavailable"
+
+
+async def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """
+    Whether this worker can serve requests: the primary answers through the API pool and storage is reachable.
+    Replicas are reported but never fail the check; reads fall back to the primary without them.
+    Returns: (ready, details)
+    """
+    checks: Dict[str, Any] = {}
+    for name, check in (("database", _check_database), ("storage", _check_storage)):
+        try:
+            with anyio.fail_after(settings.health_timeout_seconds):
+                checks[name] = await check()
+        except TimeoutError:
+            checks[name] = "timeout"
+        except Exception as e:
+            checks[name] = f"error: {type(e).__name__}"
+    checks["database_pool"] = pool_status(async_engine.sync_engine)
+    if replica_engines:
+        checks["replicas_in_use"] = f"{len(healthy_replicas())}/{len(replica_engines)}"
+    ready = checks["database"] == "ok" and checks["storage"] == "ok"
+    return ready, checks
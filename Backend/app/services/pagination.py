@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import ColumnElement, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.document import Document
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ValueError("bad_cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("bad_cursor")
+    return values
+
+
+def keyset_page(stmt: Select, limit: int, after: Optional[Tuple[datetime, int]] = None) -> Select:
+    """`limit` rows of stmt in (updated_at DESC, id DESC) order, starting after the (updated_at, id) key."""
+    if after:
+        stmt = stmt.where(tuple_(Document.updated_at, Document.id) < tuple_(*after))
+    return stmt.order_by(Document.updated_at.desc(), Document.id.desc()).limit(limit)
+
+
+async def paginate_documents(
+    db: AsyncSession, stmt: Select, limit: int, cursor: Optional[str], extra: Optional[ColumnElement] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Keyset pagination over (updated_at DESC, id DESC); cost of a page does not depend on its depth.
+    With `extra`, the items are (document, extra) rows instead, the column fetched in the same statement.
+    Returns: (documents, next_cursor or None on the last page)
+    """
+    if cursor:
+        updated_at, doc_id = decode_cursor(cursor)
+        try:
+            updated_at, doc_id = datetime.fromisoformat(updated_at), int(doc_id)
+        except (ValueError, TypeError):
+            raise ValueError("bad_cursor")
+    if extra is not None:
+        stmt = stmt.add_columns(extra)
+    result = await db.execute(keyset_page(stmt, limit + 1, (updated_at, doc_id) if cursor else None))
+    docs = list(result.scalars()) if extra is None else [tuple(r) for r in result.all()]
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1] if extra is None else docs[-1][0]
+        return docs, encode_cursor(last.updated_at.isoformat() if last.updated_at else None, last.id)
+    return docs, None
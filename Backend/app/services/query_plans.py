@@ -0,0 +1,170 @@
+"""
+EXPLAIN check for the hot read queries: seeds a large synthetic dataset, plans the listing, search,
+version and ACL queries exactly as the app builds them, and fails if any of them reads a large table
+with a sequential scan. Everything happens in one transaction that is rolled back, so it can run
+against a migrated development or staging database:
+
+    python -m app.services.query_plans --documents 200000
+"""
+import argparse
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import Select, select, text
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models import department, user  # noqa: F401  (mappers the document models relate to)
+from app.models.document import Document, DocumentTag, Tag
+from app.services.acl import permissions_query
+from app.services.documents import version_query, versions_query, viewable_documents_query
+from app.services.pagination import keyset_page
+from app.services.search import content_matches, text_matches
+
+# tables that grow with the number of documents; small lookup tables (tags, departments) may be scanned
+LARGE_TABLES = {"documents", "document_versions", "document_permissions", "document_tags", "document_contents"}
+SEED_PREFIX = "plan-check"
+
+
+@dataclass
+class PlanResult:
+    name: str
+    cost: float
+    seq_scans: List[str]
+    indexes: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.seq_scans
+
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def explain(db: Session, name: str, stmt: Select) -> PlanResult:
+    compiled = stmt.compile(dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True})
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params).scalar()[0]["Plan"]
+    nodes = list(_nodes(plan))
+    return PlanResult(
+        name=name,
+        cost=plan["Total Cost"],
+        seq_scans=sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"} & LARGE_TABLES),
+        indexes=sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+    )
+
+
+def seed(db: Session, documents: int, departments: int, users: int, tags: int) -> Dict[str, int]:
+    """Synthetic rows shaped like production: 3 versions, 2 department grants and 3 tags per document."""
+    run = lambda sql, **params: db.execute(text(sql), params)  # noqa: E731
+    existing = run("SELECT coalesce(max(id), 0) FROM documents").scalar()
+    dept_ids = run(
+        "INSERT INTO departments (name) SELECT :p || '-' || g FROM generate_series(1, :n) g RETURNING id",
+        p=SEED_PREFIX, n=departments,
+    ).scalars().all()
+    user_ids = run(
+        "INSERT INTO users (name, email, password_hash, department_id, role)"
+        " SELECT :p || ' ' || g, :p || '-' || g || '@example.invalid', '!', (CAST(:depts AS int[]))[1 + g % :d], 'user'"
+        " FROM generate_series(1, :n) g RETURNING id",
+        p=SEED_PREFIX, n=users, depts=dept_ids, d=departments,
+    ).scalars().all()
+    tag_ids = run(
+        "INSERT INTO tags (name) SELECT :p || '-' || g FROM generate_series(1, :n) g RETURNING id",
+        p=SEED_PREFIX, n=tags,
+    ).scalars().all()
+    run(
+        "INSERT INTO documents (title, description, current_version_number, owner_id, created_at, updated_at)"
+        " SELECT :p || ' ' || md5(g::text), 'synthetic document ' || g, 3, (CAST(:users AS int[]))[1 + g % :u],"
+        " now() - g * interval '1 minute', now() - g * interval '1 minute'"
+        " FROM generate_series(1, :n) g",
+        p=SEED_PREFIX, n=documents, users=user_ids, u=users,
+    )
+    run(
+        "UPDATE documents d SET search_vector = to_tsvector(CAST(:cfg AS regconfig), d.title) WHERE d.id > :existing",
+        cfg=settings.search_config, existing=existing,
+    )
+    run(
+        "INSERT INTO document_versions (document_id, version_number, file_path, file_size, content_hash)"
+        " SELECT d.id, v, 'plan-check', 1024, md5(d.id || '-' || v) || md5(v || '-' || d.id)"
+        " FROM documents d CROSS JOIN generate_series(1, 3) v WHERE d.id > :existing",
+        existing=existing,
+    )
+    run(
+        "INSERT INTO document_permissions (document_id, department_id, can_view, can_download)"
+        " SELECT d.id, (CAST(:depts AS int[]))[1 + (d.id + k) % :d], 1, (d.id % 2)"
+        " FROM documents d CROSS JOIN generate_series(0, 1) k WHERE d.id > :existing",
+        depts=dept_ids, d=departments, existing=existing,
+    )
+    run(
+        "INSERT INTO document_tags (document_id, tag_id)"
+        " SELECT DISTINCT d.id, (CAST(:tags AS int[]))[1 + (d.id * k) % :t]"
+        " FROM documents d CROSS JOIN (VALUES (1), (7), (13)) m(k) WHERE d.id > :existing",
+        tags=tag_ids, t=tags, existing=existing,
+    )
+    run(
+        "INSERT INTO document_contents (document_id, version_id, version_number, status, content, content_vector)"
+        " SELECT v.document_id, v.id, v.version_number, 'done', d.description,"
+        " to_tsvector(CAST(:cfg AS regconfig), d.description)"
+        " FROM document_versions v JOIN documents d ON d.id = v.document_id"
+        " WHERE d.id > :existing AND v.version_number = d.current_version_number",
+        cfg=settings.search_config, existing=existing,
+    )
+    for table in ("departments", "users", "tags", *sorted(LARGE_TABLES)):
+        run(f"ANALYZE {table}")
+    first, last = run("SELECT min(id), max(id) FROM documents WHERE id > :existing", existing=existing).one()
+    return {
+        "department_id": dept_ids[0],
+        "user_id": user_ids[0],
+        "first_document": first,
+        "middle_document": (first + last) // 2,
+    }
+
+
+def hot_queries(db: Session, ids: Dict[str, int], page_size: int) -> List[Tuple[str, Select]]:
+    dept, doc = ids["department_id"], ids["middle_document"]
+    tag_name = f"{SEED_PREFIX}-1"
+    title_word = db.execute(select(Document.title).where(Document.id == doc)).scalar().split()[-1]
+    deep_key = tuple(db.execute(select(Document.updated_at, Document.id).where(Document.id == doc)).one())
+    viewable = viewable_documents_query(dept)
+    page_ids = list(range(ids["first_document"], ids["first_document"] + page_size))
+    return [
+        ("listing: first page", keyset_page(viewable, page_size + 1)),
+        ("listing: deep page", keyset_page(viewable, page_size + 1, deep_key)),
+        ("listing: page tags", select(DocumentTag.document_id, Tag).join(Tag).where(DocumentTag.document_id.in_(page_ids))),
+        ("my documents", keyset_page(select(Document).where(Document.owner_id == ids["user_id"]), page_size + 1)),
+        ("search: tag", keyset_page(viewable.where(Document.tags.any(Tag.name.in_([tag_name]))), page_size + 1)),
+        ("search: text", keyset_page(viewable.where(text_matches(title_word)), page_size + 1)),
+        ("search: content", keyset_page(viewable.where(content_matches("synthetic")), page_size + 1)),
+        ("resolve_version", version_query(doc, 2)),
+        ("version list", versions_query(doc)),
+        ("ACL cache load", permissions_query(dept)),
+    ]
+
+
+def check(db: Session, documents: int, departments: int, users: int, tags: int) -> List[PlanResult]:
+    """Seeds, plans every hot query and rolls back. Needs PostgreSQL."""
+    try:
+        ids = seed(db, documents, departments, users, tags)
+        return [explain(db, name, stmt) for name, stmt in hot_queries(db, ids, settings.page_size_default)]
+    finally:
+        db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if a hot query sequentially scans a large table.")
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tags", type=int, default=200)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        results = check(db, args.documents, args.departments, args.users, args.tags)
+    for r in results:
+        status = "ok" if r.ok else "SEQ SCAN " + ",".join(r.seq_scans)
+        print(f"{r.name:<22} cost={r.cost:>10.1f}  {status:<30} {' '.join(r.indexes)}")
+    sys.exit(0 if all(r.ok for r in results) else 1)
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import heapq
+import json
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.settings import settings
+from app.db import notifications
+from app.models.department import Department
+from app.models.document import DocumentTag, Tag
+
+CHANNEL = "reference_changed"
+DEPARTMENTS = "departments"
+TAGS = "tags"
+KINDS = (DEPARTMENTS, TAGS)
+
+
+@dataclass
+class Snapshot:
+    """One reference list as served: the JSON body, its ETag, and for tags a prefix index."""
+
+    body: bytes
+    etag: str
+    loaded_at: float
+    # tags only, sorted by keys: casefolded names, and (name, id) per key
+    keys: List[str] = field(default_factory=list)
+    entries: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def _snapshot(items: List[Dict[str, Any]], **index) -> Snapshot:
+    body = json.dumps(items, separators=(",", ":"), ensure_ascii=False).encode()
+    # derived from the content, so every worker hands out the same ETag for the same list
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return Snapshot(body=body, etag=etag, loaded_at=time.monotonic(), **index)
+
+
+async def _load_departments(db: AsyncSession) -> Snapshot:
+    rows = (await db.execute(select(Department.id, Department.name).order_by(Department.name.asc()))).all()
+    return _snapshot([{"id": dep_id, "name": name} for dep_id, name in rows])
+
+
+async def _load_tags(db: AsyncSession) -> Snapshot:
+    rows = (await db.execute(select(Tag.id, Tag.name).order_by(Tag.name.asc()))).all()
+    index = sorted((name.casefold(), (name, tag_id)) for tag_id, name in rows)
+    return _snapshot(
+        [{"id": tag_id, "name": name} for tag_id, name in rows],
+        keys=[key for key, _ in index],
+        entries=[entry for _, entry in index],
+    )
+
+
+_LOADERS = {DEPARTMENTS: _load_departments, TAGS: _load_tags}
+
+
+class ReferenceCache:
+    """
+    Per-process departments and tags lists. Each kind has a version counter, bumped when a writer
+    reports a change (locally after commit, in other processes via NOTIFY); a snapshot is only
+    served for the version it was loaded at. The TTL bounds staleness if a notification is lost.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = dict.fromkeys(KINDS, 0)
+        self._snapshots: Dict[str, Tuple[int, Snapshot]] = {}
+        self._loading: Dict[str, asyncio.Lock] = {}
+
+    def _current(self, kind: str) -> Tuple[int, Optional[Snapshot]]:
+        with self._lock:
+            version = self._versions[kind]
+            cached = self._snapshots.get(kind)
+        if cached is not None and cached[0] == version and time.monotonic() - cached[1].loaded_at < self.ttl:
+            return version, cached[1]
+        return version, None
+
+    async def get(self, db: AsyncSession, kind: str) -> Snapshot:
+        version, snapshot = self._current(kind)
+        if snapshot is not None:
+            metrics.inc("reference_cache.hits", labels={"kind": kind})
+            return snapshot
+
+        # one load per worker after a change, however many requests are waiting for it
+        async with self._loading.setdefault(kind, asyncio.Lock()):
+            version, snapshot = self._current(kind)
+            if snapshot is not None:
+                return snapshot
+            metrics.inc("reference_cache.misses", labels={"kind": kind})
+            if db.info.get("replica"):
+                # a lagging replica could store the list from before the change as the new version
+                from app.db import routing
+
+                async with routing.AsyncSessionLocal() as primary:
+                    snapshot = await _LOADERS[kind](primary)
+            else:
+                snapshot = await _LOADERS[kind](db)
+        with self._lock:
+            if self._versions[kind] == version:
+                self._snapshots[kind] = (version, snapshot)
+        return snapshot
+
+    def invalidate(self, kinds: Optional[Iterable[str]] = None) -> None:
+        """None bumps every kind."""
+        with self._lock:
+            for kind in KINDS if kinds is None else kinds:
+                if kind in self._versions:
+                    self._versions[kind] += 1
+        metrics.inc("reference_cache.invalidations")
+
+
+cache = ReferenceCache(settings.reference_cache_ttl_seconds)
+
+# documents per tag id change with every tagging write, so they are not part of the tags snapshot
+# (that would reload it, and change its ETag, on each upload): they are refreshed on their own TTL
+_tag_counts = TTLCache(1, settings.tag_counts_ttl_seconds)
+_tag_counts_loading = asyncio.Lock()
+
+
+async def departments(db: AsyncSession) -> Snapshot:
+    return await cache.get(db, DEPARTMENTS)
+
+
+async def tags(db: AsyncSession) -> Snapshot:
+    return await cache.get(db, TAGS)
+
+
+async def tag_document_counts(db: AsyncSession) -> Dict[int, int]:
+    """Documents per tag id, at most TAG_COUNTS_TTL_SECONDS old; tags without documents are missing."""
+    counts = _tag_counts.get(TAGS)
+    if counts is not None:
+        return counts
+    async with _tag_counts_loading:
+        counts = _tag_counts.get(TAGS)
+        if counts is None:
+            rows = await db.execute(select(DocumentTag.tag_id, func.count()).group_by(DocumentTag.tag_id))
+            counts = dict(rows.all())
+            _tag_counts.set(TAGS, counts)
+    return counts
+
+
+async def autocomplete_tags(db: AsyncSession, prefix: str, limit: int) -> List[Dict[str, Any]]:
+    """Tags whose name starts with `prefix` (case-insensitive), most used first, from the in-memory index."""
+    snapshot = await tags(db)
+    counts = await tag_document_counts(db)
+    key = prefix.casefold()
+    start = bisect_left(snapshot.keys, key)
+    end = bisect_left(snapshot.keys, key + "\U0010ffff", start)  # past every key with this prefix
+    best = heapq.nsmallest(
+        limit, snapshot.entries[start:end], key=lambda e: (-counts.get(e[1], 0), e[0].casefold())
+    )
+    return [{"id": tag_id, "name": name, "document_count": counts.get(tag_id, 0)} for name, tag_id in best]
+
+
+async def reference_changed(db: AsyncSession, *kinds: str) -> None:
+    """Call inside a transaction that creates, renames or deletes departments or tags."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(notifications.notify_clause(CHANNEL, ",".join(kinds)))
+    notifications.on_commit(db, lambda: cache.invalidate(kinds))
+
+
+def _on_notify(payload: Optional[str]) -> None:
+    cache.invalidate(payload.split(",") if payload is not None else None)
+
+
+notifications.subscribe(CHANNEL, _on_notify)
@@ -0,0 +1,134 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import ColumnElement, Float, Select, cast, func, literal, literal_column, select, tuple_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.settings import settings
+from app.models.document import Document, DocumentContent, Tag, DocumentTag
+from app.services.pagination import encode_cursor, decode_cursor
+
+_WEIGHT_A, _WEIGHT_B, _WEIGHT_C = (literal_column(f"'{w}'") for w in "ABC")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def html_escape(expr):
+    """SQL-side html.escape(): ts_headline copies its input verbatim around the <mark> tags it adds."""
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")):
+        expr = func.replace(expr, char, entity)
+    return expr
+
+
+def _regconfig():
+    return cast(literal(settings.search_config), REGCONFIG)
+
+
+def search_vector_expr():
+    """
+    Weighted tsvector for a documents row: title (A), tag names (B), description (C).
+    Correlated on documents.id so it can be used in a single UPDATE over any number of rows.
+    """
+    cfg = _regconfig()
+    tag_names = (
+        select(func.string_agg(Tag.name, " "))
+        .select_from(DocumentTag)
+        .join(Tag, Tag.id == DocumentTag.tag_id)
+        .where(DocumentTag.document_id == Document.id)
+        .scalar_subquery()
+    )
+    return (
+        func.setweight(func.to_tsvector(cfg, func.coalesce(Document.title, "")), _WEIGHT_A)
+        .op("||")(func.setweight(func.to_tsvector(cfg, func.coalesce(tag_names, "")), _WEIGHT_B))
+        .op("||")(func.setweight(func.to_tsvector(cfg, func.coalesce(Document.description, "")), _WEIGHT_C))
+    )
+
+
+async def refresh_search_vector(db: AsyncSession, document_id: int) -> None:
+    await refresh_search_vectors(db, [document_id])
+
+
+async def refresh_search_vectors(db: AsyncSession, document_ids: List[int]) -> None:
+    # call after tags are flushed so document_tags reflects the new state
+    await db.execute(
+        update(Document)
+        .where(Document.id.in_(document_ids))
+        .values(search_vector=search_vector_expr(), updated_at=Document.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_search_vectors(db: Session, only_missing: bool = True) -> int:
+    stmt = (
+        update(Document)
+        .values(search_vector=search_vector_expr(), updated_at=Document.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if only_missing:
+        stmt = stmt.where(Document.search_vector.is_(None))
+    count = db.execute(stmt).rowcount
+    db.commit()
+    return count
+
+
+def text_matches(text: str):
+    """Filter: title/tags/description match `text` (websearch syntax), unranked."""
+    return Document.search_vector.op("@@")(func.websearch_to_tsquery(_regconfig(), text))
+
+
+def content_matches(text: str):
+    """EXISTS filter: the extracted text of the document's current version matches `text`."""
+    return (
+        select(DocumentContent.id)
+        .where(
+            DocumentContent.document_id == Document.id,
+            DocumentContent.version_number == Document.current_version_number,
+            DocumentContent.content_vector.op("@@")(func.websearch_to_tsquery(_regconfig(), text)),
+        )
+        .exists()
+    )
+
+
+async def ranked_search(
+    db: AsyncSession,
+    stmt: Select,
+    text: str,
+    limit: int,
+    cursor: Optional[str],
+    extra: Optional[ColumnElement] = None,
+) -> Tuple[List[tuple], Optional[str]]:
+    """
+    Full-text match of `text` (websearch syntax) on top of an already permission-filtered query.
+    Ordered by ts_rank, keyset-paged on (rank, id).
+    With `extra`, each row carries that column last, fetched in the same statement.
+    Returns: ([(document, rank, snippet)], next_cursor)
+    """
+    cfg = _regconfig()
+    tsq = func.websearch_to_tsquery(cfg, text)
+    # ts_rank is a float4; as float8 it compares equal to the value the cursor carries back
+    rank = cast(func.ts_rank(Document.search_vector, tsq), Float(53))
+    snippet = func.ts_headline(
+        cfg,
+        html_escape(func.concat_ws(" - ", Document.title, Document.description)),
+        tsq,
+        HEADLINE_OPTIONS,
+    )
+
+    stmt = stmt.where(Document.search_vector.op("@@")(tsq))
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor)
+        try:
+            last_rank, last_id = float(last_rank), int(last_id)
+        except (ValueError, TypeError):
+            raise ValueError("bad_cursor")
+        stmt = stmt.where(tuple_(rank, Document.id) < tuple_(last_rank, last_id))
+
+    result = await db.execute(
+        stmt.add_columns(rank.label("rank"), snippet.label("snippet"), *([extra] if extra is not None else []))
+        .order_by(rank.desc(), Document.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_doc, last_rank = rows[-1][:2]
+        return [tuple(r) for r in rows], encode_cursor(last_rank, last_doc.id)
+    return [tuple(r) for r in rows], None
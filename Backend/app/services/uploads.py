@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.files import create_session_file, session_path
+from app.core.settings import settings
+from app.models.document import Document, UploadSession
+from app.models.user import User
+
+
+async def create_upload_session(
+    db: AsyncSession, doc: Document, user: User, filename: str, content_type: Optional[str], total_size: Optional[int]
+) -> UploadSession:
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        document_id=doc.id,
+        user_id=user.id,
+        filename=filename,
+        content_type=content_type,
+        total_size=total_size,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.upload_session_ttl_hours),
+    )
+    await run_in_threadpool(create_session_file, session.id)
+    db.add(session)
+    await db.commit()
+    return session
+
+
+async def get_upload_session(db: AsyncSession, document_id: int, upload_id: str, user: User) -> UploadSession:
+    session = await db.get(UploadSession, upload_id)
+    if not session or session.document_id != document_id or session.user_id != user.id:
+        raise ValueError("not_found")
+    expires_at = session.expires_at if session.expires_at.tzinfo else session.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        raise ValueError("expired")
+    return session
+
+
+async def delete_upload_session(db: AsyncSession, session: UploadSession) -> None:
+    session_path(session.id).unlink(missing_ok=True)
+    await db.delete(session)
+    await db.commit()
+
+
+# sync: runs from the blob GC command
+def prune_expired_sessions(db: Session) -> int:
+    expired = db.query(UploadSession).filter(UploadSession.expires_at < datetime.now(timezone.utc)).all()
+    for session in expired:
+        session_path(session.id).unlink(missing_ok=True)
+        db.delete(session)
+    db.commit()
+    return len(expired)
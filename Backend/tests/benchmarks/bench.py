@@ -0,0 +1,160 @@
+"""Measurement helpers shared by the benchmarks."""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parents[2]
+
+
+def env_int(name: str, default: int) -> int:
+    """Benchmark sizes can be scaled with environment variables, e.g. BENCH_DOCUMENTS=100000."""
+    return int(os.environ.get(name, default))
+
+
+def percentiles(samples: Iterable[float]) -> Dict[str, float]:
+    """p50/p99/max of latencies in seconds, as milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p99 = ordered[min(len(ordered) - 1, round(0.99 * (len(ordered) - 1)))]
+    return {
+        "p50_ms": round(1000 * statistics.median(ordered), 2),
+        "p99_ms": round(1000 * p99, 2),
+        "max_ms": round(1000 * ordered[-1], 2),
+    }
+
+
+def rss_mb(pid: int, field: str = "VmRSS") -> float:
+    """Resident memory of a process (VmHWM: its peak so far), from /proc; Linux only."""
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time a process has used so far (its child processes not included), from /proc; Linux only."""
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """
+    `uvicorn app.main:app` (or another `app`, importable from this directory) in a subprocess, against
+    the test database and storage root, so load is measured over real sockets and the client's CPU use
+    stays out of the server process.
+    """
+
+    def __init__(self, workers: int = 1, env: Optional[Dict[str, str]] = None, app: str = "app.main:app"):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.workers = workers
+        self.app = app
+        self.env = {**os.environ, **(env or {})}
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+
+    def start(self, timeout: float = 60) -> float:
+        """Returns: seconds until the first request was answered"""
+        self.started_at = time.perf_counter()
+        path = os.pathsep.join(filter(None, [str(Path(__file__).parent), self.env.get("PYTHONPATH")]))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--no-access-log", "--log-level", "warning"],
+            cwd=BACKEND,
+            env={**self.env, "PYTHONPATH": path},
+        )
+        deadline = self.started_at + timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with {self.process.returncode}")
+            try:
+                if httpx.get(self.url + "/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - self.started_at
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        self.stop()
+        raise RuntimeError(f"server not up after {timeout}s")
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def client(self, **kwargs) -> httpx.Client:
+        return httpx.Client(base_url=self.url, timeout=kwargs.pop("timeout", 60), **kwargs)
+
+    def __enter__(self) -> "Server":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+async def multipart_file(boundary: str, title: str, filename: str, head: bytes, block: bytes, blocks: int):
+    """Streams a /api/documents/upload form body: `head`, then `block` repeated `blocks` times as the file."""
+    yield (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\n{title}\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    yield head
+    for _ in range(blocks):
+        yield block
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+async def keepalive_client(
+    port: int, path: str, headers: Dict[str, str], requests: int, latencies: List[float]
+) -> Tuple[int, int]:
+    """
+    One HTTP/1.1 connection sending `requests` GETs back to back. Hand-rolled on asyncio streams:
+    thousands of these fit in one client process, where an HTTP library's per-request overhead would
+    make the client the bottleneck.
+    Returns: (responses with status 200, other responses)
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+    ok = failed = 0
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            writer.write(head.encode())
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if status_line.split(b" ", 2)[1] == b"200":
+                ok += 1
+            else:
+                failed += 1
+    finally:
+        writer.close()
+    return ok, failed
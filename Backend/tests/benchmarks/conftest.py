@@ -0,0 +1,47 @@
+"""
+Benchmarks: load and latency measurements on the test database, deselected from the normal run.
+
+    python -m pytest -m benchmark                  # all of them
+    python -m pytest -m benchmark -k search -s     # one, with the servers' output
+
+Every module here is marked `benchmark`. Sizes default to what the change was designed for and can be
+scaled down with BENCH_* variables (each benchmark names its own). Results are printed as a table; the
+assertions only catch regressions large enough not to depend on the machine.
+"""
+import json
+
+import pytest
+
+from bench import Server
+
+
+@pytest.fixture
+def report(capsys):
+    """report(title, {name: value}) prints one result block past pytest's output capture."""
+
+    def emit(title: str, results: dict) -> None:
+        with capsys.disabled():
+            print(f"\n== {title}")
+            for name, value in results.items():
+                print(f"   {name:<40} {json.dumps(value) if isinstance(value, (dict, list)) else value}")
+
+    return emit
+
+
+@pytest.fixture
+def server(database):
+    """
+    server(workers=1, app="app.main:app", **env) starts an app in a subprocess, with `env` as extra
+    environment variables; every one started is stopped afterwards.
+    """
+    started = []
+
+    def start(workers: int = 1, app: str = "app.main:app", **env: str) -> Server:
+        s = Server(workers, {k.upper(): str(v) for k, v in env.items()}, app)
+        started.append(s)
+        s.start()
+        return s
+
+    yield start
+    for s in started:
+        s.stop()
@@ -0,0 +1,66 @@
+"""
+GET /api/documents as it was served before the async database stack, kept as the keep-alive
+benchmark's baseline: a sync route on Starlette's threadpool with a blocking Session from a
+default-sized create_engine() pool (app.db.session and app.api.deps at the time).
+"""
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import joinedload, selectinload, sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.security import decode_token
+from app.core.settings import settings
+from app.models.document import Document
+from app.models.user import User
+from app.services.documents import viewable_documents_query
+from app.services.pagination import keyset_page
+
+engine = create_engine(settings.sqlalchemy_database_uri, pool_pre_ping=True)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+_users = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+
+app = FastAPI()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/api/documents")
+def list_accessible_documents(authorization: Optional[str] = Header(default=None), db=Depends(get_db)):
+    try:
+        payload = decode_token((authorization or "").removeprefix("Bearer "))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    key = (int(payload["sub"]), payload.get("iat"))
+    user = _users.get(key)
+    if user is None:
+        user = db.get(User, key[0], options=[joinedload(User.department)])
+        db.expunge(user)
+        _users.set(key, user)
+
+    q = viewable_documents_query(user.department_id).options(selectinload(Document.tags))
+    docs = db.execute(keyset_page(q, settings.page_size_default + 1)).scalars().all()
+    return {
+        "items": [
+            {
+                "id": d.id,
+                "title": d.title,
+                "current_version_number": d.current_version_number,
+                "tags": [t.name for t in d.tags],
+                "updated_at": d.updated_at.isoformat() if d.updated_at else None,
+            }
+            for d in docs[: settings.page_size_default]
+        ]
+    }
@@ -0,0 +1,21 @@
+"""
+The app with worker startup as it was before migration-free boots, kept as the startup benchmark's
+baseline: jose and passlib/bcrypt imported up front, and every worker running create_all and the
+department seeding before it serves (app.main's on_startup and app.db.init_db at the time).
+"""
+from jose import jwt  # noqa: F401
+from passlib.context import CryptContext  # noqa: F401
+
+from app.db.base import Base
+from app.db.init_db import seed_departments
+from app.db.session import SessionLocal, engine
+from app.main import app
+
+
+def init_db() -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        seed_departments(db)
+
+
+app.router.on_startup.insert(0, init_db)
@@ -0,0 +1,32 @@
+"""
+The upload path before streaming ingestion, kept as the upload benchmark's baseline: a sync route
+whose UploadFile Starlette has already spooled to a temporary file, copied to its target in blocking
+1 MiB reads and writes on a threadpool thread (app.core.files.save_upload_for_version at the time).
+"""
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+from fastapi import FastAPI, File, Form, UploadFile
+
+TARGET = Path(os.environ.get("LEGACY_UPLOAD_DIR") or tempfile.mkdtemp(prefix="legacy-upload-"))
+
+app = FastAPI()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/upload", status_code=201)
+def upload(title: str = Form(...), file: UploadFile = File(...)):
+    target = TARGET / f"v1_{uuid.uuid4().hex[:8]}_{file.filename or 'file'}"
+    with target.open("wb") as out:
+        while True:
+            chunk = file.file.read(1024 * 1024)
+            if not chunk:
+                break
+            out.write(chunk)
+    return {"title": title, "size": target.stat().st_size}
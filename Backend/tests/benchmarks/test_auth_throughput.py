@@ -0,0 +1,50 @@
+"""
+Authentication cost per request: GET /api/auth/me (nothing but get_current_reader) with the user
+snapshot looked up on every request (AUTH_CACHE_TTL_SECONDS=0, as before the cache), cached, and
+taken from the token claims (AUTH_TRUST_CLAIMS). Keep-alive connections, so connection setup stays out.
+
+    BENCH_AUTH_REQUESTS (default 5000)   BENCH_AUTH_CONNECTIONS (default 16)
+"""
+import asyncio
+import time
+
+import pytest
+
+from bench import env_int, keepalive_client, percentiles
+from helpers import login
+
+pytestmark = pytest.mark.benchmark
+
+REQUESTS = env_int("BENCH_AUTH_REQUESTS", 5000)
+CONNECTIONS = env_int("BENCH_AUTH_CONNECTIONS", 16)
+
+
+async def _load(port: int, headers: dict) -> dict:
+    latencies = []
+    per_connection = REQUESTS // CONNECTIONS
+    await keepalive_client(port, "/api/auth/me", headers, 50, [])  # warm-up: pool connections, first lookup
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(keepalive_client(port, "/api/auth/me", headers, per_connection, latencies) for _ in range(CONNECTIONS))
+    )
+    elapsed = time.perf_counter() - started
+    ok = sum(r[0] for r in results)
+    assert ok == per_connection * CONNECTIONS, results
+    return {"requests/s": round(ok / elapsed), **percentiles(latencies)}
+
+
+def test_auth_throughput(server, report):
+    results = {}
+    for name, env in (
+        ("lookup every request (cold)", {"auth_cache_ttl_seconds": 0}),
+        ("cached snapshot (warm)", {}),
+        ("token claims", {"auth_trust_claims": "true"}),
+    ):
+        s = server(**env)
+        with s.client() as client:
+            auth = login(client, "bench@example.com")
+        results[name] = asyncio.run(_load(s.port, auth))
+        s.stop()
+
+    report(f"GET /api/auth/me, {REQUESTS} requests over {CONNECTIONS} keep-alive connections", results)
+    assert results["cached snapshot (warm)"]["requests/s"] > results["lookup every request (cold)"]["requests/s"]
@@ -0,0 +1,94 @@
+"""
+Server memory during GET /api/documents/export: the archive is streamed from storage, so the worker's
+resident memory should not grow with the number or the size of the files. Two exports: many small
+files, and a few large ones (together past 4 GiB by default, so the archive needs zip64 records).
+
+    BENCH_EXPORT_FILES (default 2000)   BENCH_EXPORT_FILE_KB (default 256)
+    BENCH_EXPORT_LARGE_FILES (default 3)   BENCH_EXPORT_LARGE_MB (default 1536)
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+
+import httpx
+import pytest
+
+from app.core.files import STORAGE_ROOT
+from bench import env_int, multipart_file, rss_mb
+from helpers import login
+
+pytestmark = pytest.mark.benchmark
+
+FILES = env_int("BENCH_EXPORT_FILES", 2000)
+FILE_KB = env_int("BENCH_EXPORT_FILE_KB", 256)
+LARGE_FILES = env_int("BENCH_EXPORT_LARGE_FILES", 3)
+LARGE_MB = env_int("BENCH_EXPORT_LARGE_MB", 1536)
+
+
+def _upload_all(url: str, headers: dict, count: int, block: bytes, blocks: int) -> list:
+    """Returns: the new documents' ids"""
+
+    async def run():
+        ids, slots = [], asyncio.Semaphore(8)
+        async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+
+            async def one(n: int):
+                boundary = uuid.uuid4().hex
+                body = multipart_file(boundary, f"export {n}", f"export-{n}.bin", uuid.uuid4().bytes, block, blocks)
+                async with slots:
+                    res = await client.post(
+                        "/api/documents/upload",
+                        content=body,
+                        headers={**headers, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+                    )
+                assert res.status_code == 201, res.text
+                ids.append(res.json()["id"])
+
+            await asyncio.gather(*(one(n) for n in range(count)))
+        return ids
+
+    return asyncio.run(run())
+
+
+def _export(server, headers: dict, ids: list) -> dict:
+    pid = server.process.pid
+    before = peak = rss_mb(pid)
+    received, sampled = 0, 0.0
+    started = time.perf_counter()
+    with server.client(timeout=600) as client:
+        with client.stream("GET", "/api/documents/export", params={"ids": ",".join(map(str, ids))}, headers=headers) as res:
+            assert res.status_code == 200, res.read()
+            for chunk in res.iter_bytes(1024 * 1024):
+                received += len(chunk)
+                if time.perf_counter() - sampled > 0.05:
+                    sampled = time.perf_counter()
+                    peak = max(peak, rss_mb(pid))
+    elapsed = time.perf_counter() - started
+    return {
+        "archive MB": round(received / 2**20),
+        "MB/s": round(received / 2**20 / elapsed),
+        "server RSS before MB": round(before),
+        "server RSS peak during MB": round(peak),
+        "growth MB": round(peak - before, 1),
+    }
+
+
+def test_export_memory(server, report):
+    s = server()
+    with s.client() as client:
+        auth = login(client, "exporter@example.com")
+    try:
+        small = _upload_all(s.url, auth, FILES, os.urandom(1024), FILE_KB)
+        large = _upload_all(s.url, auth, LARGE_FILES, os.urandom(1024 * 1024), LARGE_MB)
+        results = {
+            f"{FILES} files of {FILE_KB} KB": _export(s, auth, small),
+            f"{LARGE_FILES} files of {LARGE_MB} MB": _export(s, auth, large),
+        }
+    finally:
+        shutil.rmtree(STORAGE_ROOT / "blobs", ignore_errors=True)
+
+    report("GET /api/documents/export, server memory", results)
+    for result in results.values():
+        assert result["growth MB"] < 64
@@ -0,0 +1,66 @@
+"""
+Many concurrent keep-alive clients on GET /api/documents: BENCH_CLIENTS connections opened at once,
+each sending BENCH_CLIENT_REQUESTS requests back to back, against the async stack and against the
+sync threadpool route it replaced (legacy_listing.py). One worker each, the same database. The
+baseline queues requests on its threadpool without a time limit; the async server queues them on its
+connection pool, so DB_POOL_TIMEOUT is raised to match (at the default 30 s, requests still waiting
+for a connection by then get a 500).
+
+    BENCH_CLIENTS (default 2000)   BENCH_CLIENT_REQUESTS (default 3)   BENCH_LISTED_DOCUMENTS (default 10,000)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.services.query_plans import seed
+from bench import env_int, keepalive_client, percentiles
+from helpers import login
+
+pytestmark = pytest.mark.benchmark
+
+CLIENTS = env_int("BENCH_CLIENTS", 2000)
+CLIENT_REQUESTS = env_int("BENCH_CLIENT_REQUESTS", 3)
+DOCUMENTS = env_int("BENCH_LISTED_DOCUMENTS", 10_000)
+
+
+async def _load(port: int, headers: dict) -> dict:
+    latencies = []
+    await keepalive_client(port, "/api/documents", headers, 20, [])  # warm-up
+
+    async def one():
+        try:
+            return await keepalive_client(port, "/api/documents", headers, CLIENT_REQUESTS, latencies)
+        except (OSError, asyncio.IncompleteReadError):
+            return 0, CLIENT_REQUESTS  # refused or dropped connection
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(CLIENTS)))
+    elapsed = time.perf_counter() - started
+    ok = sum(r[0] for r in results)
+    return {
+        "requests/s": round(ok / elapsed),
+        "failed": sum(r[1] for r in results),
+        **percentiles(latencies),
+    }
+
+
+def test_keepalive_concurrency(server, report):
+    with SessionLocal() as db:
+        ids = seed(db, DOCUMENTS, departments=5, users=100, tags=50)
+        db.commit()
+
+    current = server(db_pool_timeout=600)
+    with current.client() as client:
+        auth = login(client, "lister@example.com", department_id=ids["department_id"])
+    after = asyncio.run(_load(current.port, auth))
+    current.stop()
+
+    legacy = server(app="legacy_listing:app")
+    before = asyncio.run(_load(legacy.port, auth))
+    legacy.stop()
+
+    report(f"{CLIENTS} keep-alive clients x {CLIENT_REQUESTS} GET /api/documents, before (sync threadpool)", before)
+    report(f"{CLIENTS} keep-alive clients x {CLIENT_REQUESTS} GET /api/documents, after (async)", after)
+    assert after["failed"] == 0
@@ -0,0 +1,73 @@
+"""
+/search latency on a large corpus: the substring ILIKE match search used before full-text search
+against ranked_search, one department's permission filter applied to both, first page of each.
+
+    BENCH_DOCUMENTS (default 1,000,000)   BENCH_QUERIES per term kind (default 100)
+"""
+import asyncio
+import random
+import time
+
+import pytest
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.services.documents import viewable_documents_query
+from app.services.pagination import keyset_page
+from app.services.query_plans import seed
+from app.services.search import ranked_search
+from bench import env_int, percentiles
+
+pytestmark = pytest.mark.benchmark
+
+DOCUMENTS = env_int("BENCH_DOCUMENTS", 1_000_000)
+QUERIES = env_int("BENCH_QUERIES", 100)
+
+
+async def _ilike(db, department_id: int, term: str) -> None:
+    matches = or_(Document.title.ilike(f"%{term}%"), Document.description.ilike(f"%{term}%"))
+    stmt = keyset_page(viewable_documents_query(department_id).where(matches), settings.page_size_default + 1)
+    (await db.execute(stmt)).scalars().all()
+
+
+async def _ranked(db, department_id: int, term: str) -> None:
+    await ranked_search(db, viewable_documents_query(department_id), term, settings.page_size_default, None)
+
+
+def test_search_latency(database, report):
+    with SessionLocal() as db:
+        ids = seed(db, DOCUMENTS, departments=20, users=1000, tags=200)
+        db.commit()
+        # the word after "plan-check" is an md5: one document per term, as when looking for a specific one
+        titles = db.execute(
+            select(Document.title).where(Document.id >= ids["first_document"]).order_by(Document.id).limit(10_000)
+        ).scalars().all()
+    dept = ids["department_id"]
+    rare = [t.split()[-1] for t in random.Random(1).sample(titles, min(QUERIES, len(titles)))]
+    common = ["check"] * QUERIES  # in every title
+
+    async def measure(search, terms):
+        engine = create_async_engine(settings.sqlalchemy_database_uri)
+        latencies = []
+        try:
+            async with async_sessionmaker(engine)() as db:
+                await search(db, dept, terms[0])  # connection and plan cache warm-up
+                for term in terms:
+                    started = time.perf_counter()
+                    await search(db, dept, term)
+                    latencies.append(time.perf_counter() - started)
+        finally:
+            await engine.dispose()
+        return percentiles(latencies)
+
+    results = {
+        "ILIKE, rare term": asyncio.run(measure(_ilike, [t[4:12] for t in rare])),
+        "full-text ranked, rare term": asyncio.run(measure(_ranked, rare)),
+        "ILIKE, term in every title": asyncio.run(measure(_ilike, common)),
+        "full-text ranked, term in every title": asyncio.run(measure(_ranked, common)),
+    }
+    report(f"search latency, {DOCUMENTS:,} documents, {QUERIES} queries each", results)
+    assert results["full-text ranked, rare term"]["p50_ms"] < results["ILIKE, rare term"]["p50_ms"]
@@ -0,0 +1,63 @@
+"""
+Worker startup: import time of the app module, and time from process start to the first answered
+request for BENCH_STARTUP_WORKERS workers booting at once (as after a deploy or a scale-out), for
+the current app (schema revision check only) and for the startup it replaced (legacy_startup.py:
+create_all and seeding in every worker, jose and passlib imported up front).
+
+    BENCH_STARTUP_WORKERS (default 8)   BENCH_IMPORT_RUNS (default 5)
+"""
+import os
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from bench import BACKEND, Server, env_int
+
+pytestmark = pytest.mark.benchmark
+
+WORKERS = env_int("BENCH_STARTUP_WORKERS", 8)
+IMPORT_RUNS = env_int("BENCH_IMPORT_RUNS", 5)
+
+
+def _python(code: str) -> str:
+    """Runs `code` in a fresh interpreter, from where uvicorn would import the app; returns its output."""
+    path = os.pathsep.join(filter(None, [str(Path(__file__).parent), os.environ.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, env={**os.environ, "PYTHONPATH": path},
+        capture_output=True, text=True, check=True,
+    ).stdout
+
+
+def _import_seconds(module: str) -> float:
+    """Median over IMPORT_RUNS fresh interpreters."""
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    return round(statistics.median(float(_python(code)) for _ in range(IMPORT_RUNS)), 3)
+
+
+def _boot(app: str) -> dict:
+    """Starts WORKERS single-worker servers at once; each one's seconds to its first answered request."""
+    servers = [Server(app=app) for _ in range(WORKERS)]
+    try:
+        with ThreadPoolExecutor(WORKERS) as pool:
+            ready = sorted(pool.map(lambda s: s.start(timeout=300), servers))
+    finally:
+        for s in servers:
+            s.stop()
+    return {"first request p50 s": round(statistics.median(ready), 2), "last worker ready s": round(ready[-1], 2)}
+
+
+def test_startup_time(database, report):
+    results = {}
+    for name, module, app in (
+        ("before (create_all + seed per worker)", "legacy_startup", "legacy_startup:app"),
+        ("after (revision check only)", "app.main", "app.main:app"),
+    ):
+        results[name] = {"import s": _import_seconds(module), **_boot(app)}
+
+    report(f"worker startup, {WORKERS} workers booting at once", results)
+    # the timings are machine-bound; what must not regress is that the slow imports stay deferred
+    assert _python("import sys, app.main; print(sorted({'jose', 'passlib'} & set(sys.modules)))") == "[]\n"
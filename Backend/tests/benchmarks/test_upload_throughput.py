@@ -0,0 +1,111 @@
+"""
+Concurrent upload throughput: BENCH_UPLOADS simultaneous uploads of BENCH_UPLOAD_MB each, through
+/api/documents/upload (streamed to staging while hashing, in the event loop) and through the spooled
+sync route it replaced (legacy_upload.py). The current figure includes the DB work of creating each
+document and the SHA-256 of every byte, neither of which the baseline does. Health-check latency
+during the load shows whether the worker stays responsive.
+
+    BENCH_UPLOADS (default 32)   BENCH_UPLOAD_MB (default 64)
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.core.files import STORAGE_ROOT
+from app.db.session import SessionLocal
+from app.models.document import DocumentContent
+from bench import cpu_seconds, env_int, multipart_file, percentiles, rss_mb
+from helpers import login
+
+pytestmark = pytest.mark.benchmark
+
+UPLOADS = env_int("BENCH_UPLOADS", 32)
+UPLOAD_MB = env_int("BENCH_UPLOAD_MB", 64)
+BLOCK = os.urandom(1024 * 1024)
+
+
+async def _upload(client: httpx.AsyncClient, path: str, headers: dict, n: int) -> None:
+    boundary = uuid.uuid4().hex
+    headers = {**headers, "Content-Type": f"multipart/form-data; boundary={boundary}"}
+    # distinct leading bytes per upload, so none is deduplicated
+    body = multipart_file(boundary, f"upload {n}", f"upload-{n}.bin", f"{n:016d}".encode(), BLOCK, UPLOAD_MB)
+    res = await client.post(path, content=body, headers=headers)
+    assert res.status_code == 201, res.text
+
+
+def _extracted() -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count(DocumentContent.id))).scalar_one()
+
+
+def _warm_up(url: str, path: str, headers: dict) -> None:
+    """One upload first: the first one's text extraction starts the worker pool, a one-off cost per process."""
+
+    async def upload():
+        async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+            await _upload(client, path, headers, -1)
+
+    asyncio.run(upload())
+    if path.startswith("/api/"):
+        deadline = time.perf_counter() + 120
+        while _extracted() == 0 and time.perf_counter() < deadline:
+            time.sleep(0.1)
+
+
+async def _load(url: str, path: str, headers: dict, pid: int):
+    durations, health = [], []
+    done = asyncio.Event()
+
+    async def one(client: httpx.AsyncClient, n: int) -> None:
+        started = time.perf_counter()
+        await _upload(client, path, headers, n)
+        durations.append(time.perf_counter() - started)
+
+    async def probe() -> None:
+        async with httpx.AsyncClient(base_url=url) as client:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=UPLOADS)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=600) as client:
+        prober = asyncio.create_task(probe())
+        started, cpu = time.perf_counter(), cpu_seconds(pid)
+        await asyncio.gather(*(one(client, n) for n in range(UPLOADS)))
+        elapsed, cpu = time.perf_counter() - started, cpu_seconds(pid) - cpu
+        done.set()
+        await prober
+    return {
+        "MB/s": round(UPLOADS * UPLOAD_MB / elapsed, 1),
+        "uploads/s": round(UPLOADS / elapsed, 2),
+        "server CPU seconds per GB": round(cpu * 1024 / (UPLOADS * UPLOAD_MB), 2),
+        "per upload": percentiles(durations),
+        "/health during load": percentiles(health),
+        "server peak RSS MB": round(rss_mb(pid, "VmHWM")),
+    }
+
+
+def test_upload_throughput(server, report, tmp_path):
+    legacy = server(app="legacy_upload:app", legacy_upload_dir=tmp_path)
+    _warm_up(legacy.url, "/upload", {})
+    before = asyncio.run(_load(legacy.url, "/upload", {}, legacy.process.pid))
+    legacy.stop()
+
+    current = server()
+    with current.client() as client:
+        auth = login(client, "uploader@example.com")
+    _warm_up(current.url, "/api/documents/upload", auth)
+    after = asyncio.run(_load(current.url, "/api/documents/upload", auth, current.process.pid))
+    shutil.rmtree(STORAGE_ROOT / "blobs", ignore_errors=True)
+
+    report(f"{UPLOADS} concurrent uploads of {UPLOAD_MB} MB, before (spooled sync route)", before)
+    report(f"{UPLOADS} concurrent uploads of {UPLOAD_MB} MB, after (streaming)", after)
+    assert after["/health during load"]["p99_ms"] < 1000
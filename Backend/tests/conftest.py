@@ -0,0 +1,80 @@
+"""
+Tests run against a real Postgres (the app relies on tsvector, pg_notify and row locking). The
+database is the one configured by POSTGRES_* with a "_test" suffix (TEST_POSTGRES_DB overrides it);
+it is dropped and migrated at the start of the run. Without a reachable server every test is skipped.
+"""
+import os
+import tempfile
+
+os.environ["POSTGRES_DB"] = os.environ.get("TEST_POSTGRES_DB") or os.environ.get("POSTGRES_DB", "siemens_repo") + "_test"
+os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="docrepo-test-storage-"))
+
+import pytest  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.core.settings import settings  # noqa: E402
+
+KEEP_TABLES = {"alembic_version", "departments"}  # migrated/seeded once per run
+
+
+def _admin_conninfo() -> str:
+    url = make_url(settings.sqlalchemy_database_uri).set(drivername="postgresql", database="postgres")
+    return url.render_as_string(hide_password=False)
+
+
+def _recreate_database() -> None:
+    import psycopg
+
+    with psycopg.connect(_admin_conninfo(), autocommit=True, connect_timeout=3) as conn:
+        conn.execute(f'DROP DATABASE IF EXISTS "{settings.postgres_db}" WITH (FORCE)')
+        conn.execute(f'CREATE DATABASE "{settings.postgres_db}"')
+
+
+@pytest.fixture(scope="session")
+def database():
+    import psycopg
+
+    try:
+        _recreate_database()
+    except psycopg.OperationalError as exc:
+        pytest.skip(f"Postgres not available: {exc}")
+    from app.db.migrate import init_db
+
+    init_db()
+    yield
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # one client (and event loop) for the run: the async pool's connections belong to its loop
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def clean(request):
+    """Empties every table except the seeded ones, and the per-process caches, before each test."""
+    if "database" not in request.fixturenames:
+        yield
+        return
+    from app.api import deps
+    from app.db import routing
+    from app.db.base import Base
+    from app.db.session import engine
+    from app.services import acl, facets, reference
+
+    tables = ", ".join(t.name for t in Base.metadata.sorted_tables if t.name not in KEEP_TABLES)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    acl.cache.invalidate()
+    reference.cache.invalidate()
+    reference._tag_counts.clear()
+    deps._user_cache.clear()
+    routing._recent_writers.clear()
+    facets._cache.clear()
+    yield
+
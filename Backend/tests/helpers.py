@@ -0,0 +1,34 @@
+"""Request helpers shared by the tests."""
+def login(client, email: str, department_id: int = 1) -> dict:
+    """Registers a user and returns the Authorization header for them."""
+    client.post(
+        "/api/auth/register",
+        json={"name": email.split("@")[0], "email": email, "password": "secret123", "department_id": department_id},
+    )
+    res = client.post("/api/auth/login", json={"email": email, "password": "secret123"})
+    assert res.status_code == 200, res.text
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+def upload(client, headers: dict, title: str, tags: str = "", content: bytes = b"hello", **fields) -> dict:
+    res = client.post(
+        "/api/documents/upload",
+        data={"title": title, "tags": tags, **fields},
+        files={"file": (f"{title}.txt", content, "text/plain")},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+def walk(client, url: str, headers: dict, max_pages: int = 100, **params) -> list:
+    """Follows next_cursor from the first page to the last; returns the item lists of every page."""
+    pages, cursor = [], None
+    while len(pages) < max_pages:
+        res = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert res.status_code == 200, res.text
+        pages.append(res.json()["items"])
+        cursor = res.json()["next_cursor"]
+        if cursor is None:
+            return pages
+    raise AssertionError(f"still paging after {max_pages} pages")
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core import metrics
+from app.core.settings import settings
+from app.services import acl
+
+
+@pytest.fixture
+def session_factory(database):
+    # own engine: the app's async pool belongs to the TestClient's event loop
+    engine = create_async_engine(settings.sqlalchemy_database_uri, poolclass=NullPool)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_rolled_back_change_does_not_invalidate_a_later_commit(session_factory, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(acl.cache, "invalidate", lambda ids=None: invalidated.append(ids))
+
+    async def scenario():
+        async with session_factory() as db:
+            await acl.permissions_changed(db, [1, 2])
+            await db.rollback()
+            await db.commit()  # an unrelated, later transaction on the same session
+            assert invalidated == []
+
+            await acl.permissions_changed(db, [3])
+            await db.commit()
+            assert invalidated == [[3]]
+
+    asyncio.run(scenario())
+
+
+def _lookups():
+    return [metrics._counters[(f"acl_cache.{kind}", ())] for kind in ("hits", "misses")]
+
+
+def test_concurrent_misses_share_one_load(monkeypatch):
+    loads = []
+
+    async def slow_load(db, department_id):
+        loads.append(department_id)
+        await asyncio.sleep(0.05)
+        return acl._Entry(view=frozenset({10}), download=frozenset(), loaded_at=acl.time.monotonic())
+
+    monkeypatch.setattr(acl, "_load", slow_load)
+    cache = acl.AclCache(ttl_seconds=60)
+
+    class FakeSession:
+        info = {}
+
+    async def scenario():
+        entries = await asyncio.gather(*(cache.get(FakeSession(), 7) for _ in range(20)), cache.get(FakeSession(), 8))
+        return entries
+
+    hits, misses = _lookups()
+    entries = asyncio.run(scenario())
+    assert sorted(loads) == [7, 8]
+    assert all(10 in entry.view for entry in entries)
+    # every lookup counts once: the waiters that found the entry under the lock are hits
+    assert [n - before for n, before in zip(_lookups(), (hits, misses))] == [19, 2]
@@ -0,0 +1,57 @@
+from app.api import deps
+from app.core import cache, metrics
+from app.db import routing
+from app.db.routing import PRIMARY_COOKIE
+from app.db.session import SessionLocal
+from app.models.user import User
+from helpers import login, upload
+
+
+def _lookups() -> float:
+    return metrics._counters[("auth_cache.misses", ())]
+
+
+def test_user_lookup_is_cached_until_the_ttl(client, monkeypatch):
+    auth = login(client, "cached@example.com")
+    before = _lookups()
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=auth).status_code == 200
+    assert _lookups() == before + 1
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + deps._user_cache.ttl + 1)
+    assert client.get("/api/auth/me", headers=auth).status_code == 200
+    assert _lookups() == before + 2
+
+
+def test_user_change_invalidates_the_cached_snapshot(client):
+    auth = login(client, "mover@example.com", department_id=1)
+    assert client.get("/api/auth/me", headers=auth).json()["department_id"] == 1
+
+    with SessionLocal() as db:
+        user = db.query(User).filter_by(email="mover@example.com").one()
+        user_id, user.department_id = user.id, 2
+        db.commit()
+    assert client.get("/api/auth/me", headers=auth).json()["department_id"] == 2
+
+    with SessionLocal() as db:
+        db.delete(db.get(User, user_id))
+        db.commit()
+    assert client.get("/api/auth/me", headers=auth).status_code == 401
+
+
+def test_only_a_committed_write_pins_reads_to_the_primary(client):
+    owner = login(client, "owner@example.com")
+    other = login(client, "outsider@example.com", department_id=2)
+    doc = upload(client, owner, "plan")
+    client.cookies.clear()
+
+    refused = client.put(f"/api/documents/{doc['id']}", json={"title": "mine now"}, headers=other)
+    assert refused.status_code == 403
+    assert routing._recent_writers.get(client.get("/api/auth/me", headers=other).json()["id"]) is None
+
+    res = client.put(f"/api/documents/{doc['id']}", json={"title": "plan v2"}, headers=owner)
+    assert res.status_code == 200, res.text
+    assert PRIMARY_COOKIE in res.cookies
+    assert routing._recent_writers.get(client.get("/api/auth/me", headers=owner).json()["id"])
+    client.cookies.clear()
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import json
+import zipfile
+
+from sqlalchemy import select
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.blob import Blob
+from app.models.document import DocumentVersion
+from app.services import bulk
+from helpers import login
+
+FILES = {"a.txt": b"same bytes", "b.txt": b"same bytes", "c.txt": b"gamma", "d.txt": b"delta"}
+
+
+def _post(client, auth, manifest: list, files: dict = FILES):
+    res = client.post(
+        "/api/documents/bulk",
+        data={"manifest": json.dumps(manifest)},
+        files=[("files", (name, content, "text/plain")) for name, content in files.items()],
+        headers=auth,
+    )
+    assert res.status_code == 200, res.text
+    return res.json()
+
+
+def _download(client, auth, doc_id: int) -> bytes:
+    return client.get(f"/api/documents/{doc_id}/download", headers=auth).content
+
+
+def test_manifest_items_are_reported_one_by_one(client):
+    auth = login(client, "bulk@example.com")
+    manifest = [
+        {"file": "a.txt", "title": "Alpha", "tags": ["shared"]},
+        {"file": "missing.txt", "title": "Gone"},
+        {"file": "b.txt", "title": "Beta", "tags": ["shared"]},
+        {"file": "c.txt", "title": "   "},
+        {"file": "c.txt", "title": "Elsewhere", "permission_department_ids": [99999]},
+        {"file": "c.txt", "title": "Tagged", "tags": ["x" * 51]},
+        {"file": "d.txt", "title": "Delta"},
+    ]
+    result = _post(client, auth, manifest)
+
+    assert (result["created"], result["failed"]) == (3, 4)
+    errors = {item["index"]: item["error"] for item in result["items"]}
+    assert errors == {
+        0: None, 1: "file_missing", 2: None, 3: "invalid_metadata", 4: "unknown_department", 5: "tag_too_long", 6: None
+    }
+    # each RETURNING id went to its own manifest entry
+    for item in result["items"]:
+        if item["error"] is None:
+            entry = manifest[item["index"]]
+            detail = client.get(f"/api/documents/{item['document_id']}", headers=auth).json()
+            assert detail["title"] == entry["title"] and detail["tags"] == entry.get("tags", [])
+            assert _download(client, auth, item["document_id"]) == FILES[entry["file"]]
+
+
+def test_duplicate_files_in_a_batch_share_one_blob(client):
+    auth = login(client, "dupes@example.com")
+    result = _post(client, auth, [{"file": name, "title": name} for name in FILES])
+    assert result["created"] == 4
+
+    with SessionLocal() as db:
+        paths = dict(db.execute(select(DocumentVersion.filename, DocumentVersion.file_path)).all())
+        refs = dict(db.execute(select(Blob.sha256, Blob.ref_count)).all())
+    assert paths["a.txt"] == paths["b.txt"] and len(set(paths.values())) == 3
+    assert refs == {
+        hashlib.sha256(b"same bytes").hexdigest(): 2,
+        hashlib.sha256(b"gamma").hexdigest(): 1,
+        hashlib.sha256(b"delta").hexdigest(): 1,
+    }
+
+
+def test_failed_batch_keeps_the_others(client, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    calls = []
+    refresh = bulk.refresh_search_vectors
+
+    async def fail_second_batch(db, doc_ids):
+        calls.append(doc_ids)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        await refresh(db, doc_ids)
+
+    monkeypatch.setattr(bulk, "refresh_search_vectors", fail_second_batch)
+    auth = login(client, "batches@example.com")
+    names = ["a.txt", "c.txt", "d.txt", "b.txt"]
+    result = _post(client, auth, [{"file": name, "title": name} for name in names])
+
+    assert (result["created"], result["failed"]) == (2, 2)
+    assert [item["error"] for item in result["items"]] == [None, None, "failed", "failed"]
+    assert all(item["document_id"] is None for item in result["items"][2:])
+    for item in result["items"][:2]:
+        assert _download(client, auth, item["document_id"]) == FILES[item["file"]]
+    with SessionLocal() as db:  # the rolled back batch left no references behind
+        refs = dict(db.execute(select(Blob.sha256, Blob.ref_count)).all())
+    assert refs == {hashlib.sha256(b"same bytes").hexdigest(): 1, hashlib.sha256(b"gamma").hexdigest(): 1}
+
+
+def test_zip_without_manifest(client):
+    auth = login(client, "zipper@example.com")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("reports/q1.txt", b"first quarter")
+        zf.writestr("q2.txt", b"second quarter")
+    res = client.post(
+        "/api/documents/bulk", content=archive.getvalue(), headers={**auth, "Content-Type": "application/zip"}
+    )
+    assert res.status_code == 200, res.text
+    items = {item["file"]: item["document_id"] for item in res.json()["items"]}
+    assert client.get(f"/api/documents/{items['reports/q1.txt']}", headers=auth).json()["title"] == "q1.txt"
+    assert _download(client, auth, items["q2.txt"]) == b"second quarter"
+
+    res = client.post("/api/documents/bulk", content=b"not a zip", headers={**auth, "Content-Type": "application/zip"})
+    assert res.status_code == 400
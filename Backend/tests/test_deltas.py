@@ -0,0 +1,46 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.files import DELTA_SUFFIX, blob_key
+from app.core.storage import get_storage
+from app.db.session import SessionLocal
+from app.models.blob import Blob
+from app.models.document import DocumentVersion
+from app.services.blobs import collect_garbage
+from app.services.deltas import _previous_and_current, apply_delta, write_delta
+from helpers import login, upload
+
+
+def test_superseded_copy_outlives_in_flight_downloads(client):
+    auth = login(client, "deltas@example.com")
+    v1 = os.urandom(32 * 1024).hex().encode()
+    v2 = v1[:1000] + b"an edit" + v1[1000:]
+    doc = upload(client, auth, "draft", content=v1)
+    res = client.post(f"/api/documents/{doc['id']}/version", files={"file": ("draft.txt", v2, "text/plain")}, headers=auth)
+    assert res.status_code == 201, res.text
+
+    storage = get_storage()
+    with SessionLocal() as db:
+        target, base = _previous_and_current(db, doc["id"])
+        assert apply_delta(db, target, base, *write_delta(target, base))
+        version = db.execute(
+            select(DocumentVersion).where(DocumentVersion.document_id == doc["id"], DocumentVersion.version_number == 1)
+        ).scalar_one()
+        assert version.file_path == blob_key(target) + DELTA_SUFFIX
+        # a download that resolved the whole copy before the switch can still read it
+        assert storage.exists(blob_key(target))
+
+        assert collect_garbage(db)["superseded_files_removed"] == 0
+        assert storage.exists(blob_key(target))
+
+        db.get(Blob, target).superseded_at = datetime.now(timezone.utc) - timedelta(hours=2)
+        db.commit()
+        assert collect_garbage(db)["superseded_files_removed"] == 1
+        assert not storage.exists(blob_key(target))
+        assert storage.exists(blob_key(target) + DELTA_SUFFIX) and storage.exists(blob_key(base))
+        assert db.get(Blob, target).superseded_at is None
+
+    res = client.get(f"/api/documents/{doc['id']}/download", params={"version": 1}, headers=auth)
+    assert res.status_code == 200 and res.content == v1
@@ -0,0 +1,107 @@
+import hashlib
+from urllib.parse import urlsplit
+
+import pytest
+
+from app.core.files import INCOMING_PREFIX
+from app.core.settings import settings
+from app.core.storage import get_storage
+from helpers import login, upload
+
+BODY = b"signed and sealed"
+
+
+@pytest.fixture(autouse=True)
+def direct_transfers(monkeypatch):
+    monkeypatch.setattr(settings, "direct_transfers_enabled", True)
+
+
+def _local(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}"
+
+
+def _ticket(client, auth, body: bytes = BODY, **fields) -> dict:
+    payload = {
+        "title": "contract",
+        "filename": "contract.txt",
+        "content_type": "text/plain",
+        "size": len(body),
+        "sha256": hashlib.sha256(body).hexdigest(),
+        **fields,
+    }
+    res = client.post("/api/documents/upload/direct", json=payload, headers=auth)
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+def _complete(client, auth, ticket: dict):
+    return client.post("/api/documents/direct/complete", json={"upload_token": ticket["upload_token"]}, headers=auth)
+
+
+def test_direct_upload_and_download(client):
+    auth = login(client, "direct@example.com")
+    ticket = _ticket(client, auth)
+    assert client.put(_local(ticket["url"]), content=BODY, headers=ticket["headers"]).status_code == 200
+
+    res = _complete(client, auth, ticket)
+    assert res.status_code == 201, res.text
+    doc_id = res.json()["document_id"]
+    assert _complete(client, auth, ticket).status_code == 409  # the object was moved into place
+
+    link = client.get(f"/api/documents/{doc_id}/download", params={"direct": True}, headers=auth)
+    assert link.status_code == 200, link.text
+    res = client.get(_local(link.json()["url"]))
+    assert res.status_code == 200 and res.content == BODY
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'filename="contract.txt"' in res.headers["content-disposition"]
+
+
+def test_signed_get_covers_the_content_type(client):
+    auth = login(client, "typed@example.com")
+    doc = upload(client, auth, "page", content=b"<p>hi</p>")
+    url = _local(client.get(f"/api/documents/{doc['id']}/download", params={"direct": True}, headers=auth).json()["url"])
+
+    assert "content_type=text%2Fplain" in url
+    assert client.get(url.replace("content_type=text%2Fplain", "content_type=text%2Fhtml")).status_code == 403
+    assert client.get(url.replace("&content_type=text%2Fplain", "")).status_code == 403
+
+
+def test_signed_put_rejects_tampering(client):
+    auth = login(client, "tamper@example.com")
+    ticket = _ticket(client, auth)
+    url = _local(ticket["url"])
+
+    assert client.put(url.replace(f"length={len(BODY)}", "length=999"), content=BODY).status_code == 403
+    assert client.put(url.replace("sig=", "sig=x"), content=BODY).status_code == 403
+    assert client.put(url.replace(INCOMING_PREFIX, "blobs/", 1), content=BODY).status_code == 403
+    assert client.put(url, content=BODY.upper()).status_code == 400  # right length, wrong SHA-256
+    assert client.put(url, content=BODY + b"!").status_code == 413
+    assert _complete(client, auth, ticket).status_code == 409  # nothing was stored
+
+
+def test_complete_checks_owner_and_object(client, tmp_path):
+    auth = login(client, "uploader@example.com")
+    other = login(client, "intruder@example.com")
+    ticket = _ticket(client, auth)
+
+    assert _complete(client, other, ticket).status_code == 403
+    assert _complete(client, auth, ticket).status_code == 409  # missing: never PUT
+    assert client.post(
+        "/api/documents/direct/complete", json={"upload_token": ticket["upload_token"] + "x"}, headers=auth
+    ).status_code == 400
+
+    # an object of the wrong size under the ticket's key (e.g. a truncated multipart upload)
+    short = tmp_path / "short"
+    short.write_bytes(BODY[:5])
+    key = urlsplit(ticket["url"]).path.removeprefix("/api/files/")
+    get_storage().put_file(key, short)
+    res = _complete(client, auth, ticket)
+    assert res.status_code == 409 and "size" in res.json()["detail"]
+
+    res = client.post(
+        "/api/documents/upload/direct",
+        json={"title": "x", "filename": "x.txt", "size": 1, "sha256": "z" * 64},
+        headers=auth,
+    )
+    assert res.status_code == 422
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import zstandard
+from starlette.datastructures import Headers
+
+from app.core.http import MAX_RANGES, RangeNotSatisfiable, http_date, if_range_allows, is_not_modified, parse_range
+from app.core.settings import settings
+from helpers import login, upload
+
+MODIFIED = datetime(2024, 5, 1, 12, 30, 15, 250_000, tzinfo=timezone.utc)
+
+
+def test_if_none_match():
+    assert is_not_modified(Headers({"if-none-match": '"abc"'}), '"abc"', None)
+    assert is_not_modified(Headers({"if-none-match": 'W/"abc"'}), '"abc"', None)  # weak comparison
+    assert is_not_modified(Headers({"if-none-match": '"x", "abc"'}), '"abc"', None)
+    assert is_not_modified(Headers({"if-none-match": "*"}), '"abc"', None)
+    assert not is_not_modified(Headers({"if-none-match": '"abcd"'}), '"abc"', None)
+
+
+def _since(dt: datetime, **headers) -> Headers:
+    return Headers({"if-modified-since": http_date(dt), **headers})
+
+
+def test_if_modified_since():
+    assert is_not_modified(_since(MODIFIED), '"abc"', MODIFIED)  # HTTP dates have whole seconds
+    assert is_not_modified(_since(MODIFIED + timedelta(days=1)), '"abc"', MODIFIED)
+    assert not is_not_modified(_since(MODIFIED - timedelta(seconds=1)), '"abc"', MODIFIED)
+    assert not is_not_modified(Headers({"if-modified-since": "yesterday"}), '"abc"', MODIFIED)
+    assert not is_not_modified(_since(MODIFIED), '"abc"', None)
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    assert not is_not_modified(_since(MODIFIED, **{"if-none-match": '"old"'}), '"abc"', MODIFIED)
+    assert is_not_modified(_since(MODIFIED - timedelta(days=1), **{"if-none-match": '"abc"'}), '"abc"', MODIFIED)
+
+
+def test_download_validators_and_304(client):
+    auth = login(client, "cacher@example.com")
+    doc = upload(client, auth, "report", content=b"figures")
+    url = f"/api/documents/{doc['id']}/download"
+
+    res = client.get(url, headers=auth)
+    assert res.status_code == 200 and res.content == b"figures"
+    etag, last_modified = res.headers["etag"], res.headers["last-modified"]
+    assert res.headers["cache-control"] == f"{settings.download_cache_scope}, max-age={settings.download_latest_max_age}"
+    pinned = client.get(url, params={"version": 1}, headers=auth)
+    assert pinned.headers["cache-control"] == f"{settings.download_cache_scope}, max-age=31536000, immutable"
+    assert pinned.headers["etag"] == etag
+
+    for conditional in ({"If-None-Match": etag}, {"If-None-Match": f"W/{etag}"}, {"If-Modified-Since": last_modified}):
+        res = client.get(url, headers={**auth, **conditional})
+        assert res.status_code == 304, conditional
+        assert res.content == b"" and res.headers["etag"] == etag
+
+    stale = client.get(url, headers={**auth, "If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert stale.status_code == 200 and stale.content == b"figures"
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range("bytes=90-", 100) == [(90, 99)]
+    assert parse_range("bytes=-10", 100) == [(90, 99)]  # suffix
+    assert parse_range("bytes=-500", 100) == [(0, 99)]
+    assert parse_range("bytes=95-200", 100) == [(95, 99)]
+    assert parse_range("bytes=50-59, 0-9, 5-14", 100) == [(0, 14), (50, 59)]  # sorted, overlaps merged
+    assert parse_range("bytes=0-9,10-19", 100) == [(0, 19)]  # adjacent ones too
+    assert parse_range("bytes=0-9,200-", 100) == [(0, 9)]
+    for malformed in ("items=0-9", "bytes=9-0", "bytes=a-b", "bytes=5"):
+        assert parse_range(malformed, 100) is None
+    # more separate ranges than MAX_RANGES: the whole entity instead
+    assert parse_range("bytes=" + ",".join(f"{2 * i}-{2 * i}" for i in range(MAX_RANGES + 1)), 100) is None
+    for unsatisfiable in ("bytes=100-", "bytes=-0", "bytes=200-300"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(unsatisfiable, 100)
+
+
+def test_if_range_is_a_strong_comparison():
+    assert if_range_allows(Headers({}), '"abc"', MODIFIED)
+    assert if_range_allows(Headers({"if-range": '"abc"'}), '"abc"', MODIFIED)
+    assert not if_range_allows(Headers({"if-range": '"old"'}), '"abc"', MODIFIED)
+    assert not if_range_allows(Headers({"if-range": 'W/"abc"'}), '"abc"', MODIFIED)
+    assert if_range_allows(Headers({"if-range": http_date(MODIFIED)}), '"abc"', MODIFIED)
+    assert not if_range_allows(Headers({"if-range": http_date(MODIFIED + timedelta(days=1))}), '"abc"', MODIFIED)
+
+
+def test_ranged_downloads(client):
+    auth = login(client, "ranges@example.com")
+    body = bytes(range(256)) * 4
+    doc = upload(client, auth, "blob", content=body)
+    url = f"/api/documents/{doc['id']}/download"
+
+    res = client.get(url, headers={**auth, "Range": "bytes=10-19"})
+    assert res.status_code == 206 and res.content == body[10:20]
+    assert res.headers["content-range"] == f"bytes 10-19/{len(body)}"
+    assert res.headers["content-length"] == "10" and res.headers["accept-ranges"] == "bytes"
+
+    res = client.get(url, headers={**auth, "Range": "bytes=-4"})
+    assert res.status_code == 206 and res.content == body[-4:]
+
+    res = client.get(url, headers={**auth, "Range": "bytes=0-1,100-102"})
+    assert res.status_code == 206
+    boundary = res.headers["content-type"].split("boundary=")[1]
+    assert int(res.headers["content-length"]) == len(res.content)
+    parts = res.content.split(f"--{boundary}".encode())[1:-1]
+    assert [part.split(b"\r\n\r\n", 1)[1][:-2] for part in parts] == [body[0:2], body[100:103]]
+    assert f"Content-Range: bytes 100-102/{len(body)}".encode() in parts[1]
+
+    res = client.get(url, headers={**auth, "Range": f"bytes={len(body)}-"})
+    assert res.status_code == 416 and res.headers["content-range"] == f"bytes */{len(body)}"
+
+    etag = client.get(url, headers=auth).headers["etag"]
+    res = client.get(url, headers={**auth, "Range": "bytes=0-9", "If-Range": etag})
+    assert res.status_code == 206 and res.content == body[:10]
+    res = client.get(url, headers={**auth, "Range": "bytes=0-9", "If-Range": '"changed"'})
+    assert res.status_code == 200 and res.content == body  # validator mismatch: the whole entity
+
+
+@pytest.fixture
+def compressed(client, monkeypatch):
+    """A document stored zstd-compressed; returns (its download URL, the auth headers, the original bytes)."""
+    monkeypatch.setattr(settings, "storage_compression", "zstd")
+    auth = login(client, "zstd@example.com")
+    body = b"".join(f"line {i}: quarterly figures\n".encode() for i in range(2000))
+    doc = upload(client, auth, "ledger", content=body)
+    return f"/api/documents/{doc['id']}/download", auth, body
+
+
+def _raw(client, url: str, headers: dict):
+    """Response and its body as sent, without the client decoding Content-Encoding."""
+    with client.stream("GET", url, headers=headers) as res:
+        return res, b"".join(res.iter_raw())
+
+
+def test_zstd_passthrough_or_decoded(client, compressed):
+    url, auth, body = compressed
+    res, stored = _raw(client, url, {**auth, "Accept-Encoding": "zstd"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "zstd" and res.headers["vary"] == "Accept-Encoding"
+    assert len(stored) < len(body) and int(res.headers["content-length"]) == len(stored)
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(stored) == body
+    passthrough_etag = res.headers["etag"]
+
+    res, decoded = _raw(client, url, {**auth, "Accept-Encoding": "gzip, zstd;q=0"})
+    assert res.status_code == 200 and decoded == body
+    assert "content-encoding" not in res.headers and res.headers["vary"] == "Accept-Encoding"
+    # each representation has its own validator
+    assert res.headers["etag"] != passthrough_etag
+    conditional = {**auth, "If-None-Match": passthrough_etag}
+    assert client.get(url, headers={**conditional, "Accept-Encoding": "identity"}).status_code == 200
+    assert client.get(url, headers={**conditional, "Accept-Encoding": "zstd"}).status_code == 304
+
+
+def test_ranges_over_a_compressed_blob(client, compressed):
+    url, auth, body = compressed
+    # decoded: ranges address the original bytes
+    res, part = _raw(client, url, {**auth, "Accept-Encoding": "identity", "Range": "bytes=30000-30099"})
+    assert res.status_code == 206 and part == body[30000:30100]
+    assert res.headers["content-range"] == f"bytes 30000-30099/{len(body)}"
+    res, part = _raw(client, url, {**auth, "Accept-Encoding": "identity", "Range": "bytes=-7"})
+    assert res.status_code == 206 and part == body[-7:]
+
+    # passed through: ranges address the stored (compressed) bytes, as for any Content-Encoding
+    _, stored = _raw(client, url, {**auth, "Accept-Encoding": "zstd"})
+    res, part = _raw(client, url, {**auth, "Accept-Encoding": "zstd", "Range": "bytes=10-19"})
+    assert res.status_code == 206 and part == stored[10:20]
+    assert res.headers["content-range"] == f"bytes 10-19/{len(stored)}"
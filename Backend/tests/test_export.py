@@ -0,0 +1,62 @@
+import io
+import struct
+import zipfile
+
+from sqlalchemy import select
+
+from app.core.storage import get_storage
+from app.db.session import SessionLocal
+from app.models.document import DocumentVersion
+from app.services import export
+from helpers import login, upload
+
+
+def _archive(res) -> zipfile.ZipFile:
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/zip"
+    return zipfile.ZipFile(io.BytesIO(res.content))
+
+
+def test_export_archive_lists_what_it_left_out(client):
+    auth = login(client, "exporter@example.com")
+    outsider = login(client, "elsewhere@example.com", department_id=2)
+    memo = upload(client, auth, "memo", content=b"memo body")["id"]
+    plan = upload(client, auth, "plan", content=b"plan body")["id"]
+    hidden = upload(client, outsider, "hidden", content=b"not yours")["id"]
+
+    zf = _archive(client.get("/api/documents/export", params={"ids": f"{memo},{plan},{hidden},999"}, headers=auth))
+    assert zf.read(f"{memo}_memo.txt") == b"memo body"
+    assert zf.read(f"{plan}_plan.txt") == b"plan body"
+    assert zf.read("EXPORT-NOTES.txt").decode().splitlines() == [
+        f"document {hidden}: not found or not downloadable",
+        "document 999: not found or not downloadable",
+    ]
+
+    with SessionLocal() as db:
+        key = db.execute(select(DocumentVersion.file_path).where(DocumentVersion.document_id == plan)).scalar_one()
+    get_storage().delete(key)
+    zf = _archive(client.get("/api/documents/export", params={"ids": f"{memo},{plan}"}, headers=auth))
+    assert zf.namelist() == [f"{memo}_memo.txt", "EXPORT-NOTES.txt"]
+    assert zf.read("EXPORT-NOTES.txt") == f"{plan}_plan.txt: file missing from storage\n".encode()
+
+
+def test_nothing_exportable_is_404(client):
+    auth = login(client, "empty@example.com")
+    assert client.get("/api/documents/export", params={"ids": "5"}, headers=auth).status_code == 404
+    assert client.get("/api/documents/export", params={"ids": "x"}, headers=auth).status_code == 400
+
+
+def test_member_of_unknown_size_gets_zip64_fields(monkeypatch):
+    monkeypatch.setattr(export, "open_blob", lambda key: iter([b"data"]))
+    entries = [
+        export.ExportEntry(1, "unknown.bin", "k1", None, None),
+        export.ExportEntry(2, "known.bin", "k2", 4, None),
+    ]
+    data = b"".join(export.stream_zip(entries))
+
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    assert [zf.read(name) for name in ("unknown.bin", "known.bin")] == [b"data", b"data"]
+    # "version needed to extract" of each local header: 45 once zip64 fields are present
+    versions = {info.filename: struct.unpack_from("<H", data, info.header_offset + 4)[0] for info in zf.infolist()}
+    assert versions["unknown.bin"] == zipfile.ZIP64_VERSION
+    assert versions["known.bin"] < zipfile.ZIP64_VERSION
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, select
+
+from app.db.session import SessionLocal
+from app.models.document import DocumentContent, DocumentVersion
+from app.services import extraction
+from helpers import login, upload
+
+
+def _contents():
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(DocumentVersion.document_id, DocumentContent.status, DocumentContent.content, DocumentContent.error)
+            .join(DocumentContent, DocumentContent.version_id == DocumentVersion.id)
+        ).all()
+    return {doc_id: (status, content, error) for doc_id, status, content, error in rows}
+
+
+def test_text_with_nul_bytes_is_indexed(client):
+    auth = login(client, "nul@example.com")
+    doc = upload(client, auth, "export", content=b"quarterly\x00\x00figures \x00 attached")
+
+    assert _contents()[doc["id"]] == ("done", "quarterly figures attached", None)
+    res = client.get("/api/documents/search", params={"content": "figures"}, headers=auth)
+    assert [item["id"] for item in res.json()["items"]] == [doc["id"]]
+
+
+def test_unsupported_type_is_recorded(client):
+    auth = login(client, "images@example.com")
+    res = client.post(
+        "/api/documents/upload",
+        data={"title": "diagram"},
+        files={"file": ("diagram.png", b"\x89PNG\r\n\x1a\n", "image/png")},
+        headers=auth,
+    )
+    assert res.status_code == 201, res.text
+    status, content, error = _contents()[res.json()["id"]]
+    assert (status, content) == ("unsupported", None) and "image/png" in error
+
+
+def test_backfill_batch(client):
+    auth = login(client, "backfill@example.com")
+    docs = [upload(client, auth, f"memo {i}", content=f"minutes of meeting {i}".encode())["id"] for i in range(3)]
+    with SessionLocal() as db:
+        db.execute(delete(DocumentContent))
+        db.commit()
+
+    assert extraction.backfill() == {"done": 3}
+    assert {doc_id: status for doc_id, (status, _, _) in _contents().items()} == dict.fromkeys(docs, "done")
+    assert extraction.backfill() == {}  # nothing pending any more
+
+
+def test_batch_records_a_result_it_cannot_store_as_failed(client, monkeypatch):
+    auth = login(client, "batch@example.com")
+    good, bad = (upload(client, auth, title)["id"] for title in ("good", "bad"))
+    with SessionLocal() as db:
+        db.execute(delete(DocumentContent))
+        db.commit()
+        ids = db.execute(select(DocumentVersion.id).order_by(DocumentVersion.document_id)).scalars().all()
+
+    # bypasses the NUL stripping in extract_text, so the row write itself fails
+    monkeypatch.setattr(extraction, "extract_text", lambda key, mime, name, limit: "ok" if name == "good.txt" else "a\x00b")
+    with ThreadPoolExecutor(1) as executor:
+        assert extraction._extract_batch(ids, executor) == {"done": 1, "failed": 1}
+
+    contents = _contents()
+    assert contents[good] == ("done", "ok", None)
+    assert contents[bad][0] == "failed" and "NUL" in contents[bad][2]
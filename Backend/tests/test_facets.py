@@ -0,0 +1,64 @@
+from app.core.profiling import capture_queries
+from app.core.settings import settings
+from app.services import facets
+from app.services.pagination import encode_cursor
+from helpers import login, upload
+
+
+def _facets(client, auth, **params) -> dict:
+    res = client.get("/api/documents/search", params={"facets": True, **params}, headers=auth)
+    assert res.status_code == 200, res.text
+    return res.json()["facets"]
+
+
+def _counts(items: list) -> dict:
+    return {item["value"]: item["count"] for item in items}
+
+
+def _seed(client):
+    hr = login(client, "hr@example.com", department_id=1)
+    finance = login(client, "finance@example.com", department_id=2)
+    upload(client, hr, "handbook", tags="alpha,beta", permission_department_ids="1,2")
+    upload(client, hr, "salaries", tags="alpha,gamma")  # HR only
+    upload(client, finance, "ledger", tags="beta")  # Finance only
+    return hr, finance
+
+
+def test_counts_only_cover_viewable_documents(client):
+    hr, finance = _seed(client)
+
+    counts = _facets(client, finance)
+    assert [(t["value"], t["count"]) for t in counts["tags"]] == [("beta", 2), ("alpha", 1)]  # no gamma
+    assert _counts(counts["departments"]) == {"HR": 1, "Finance": 1}
+    assert _counts(counts["versions"])["1"] == 2 and _counts(counts["updated"])["day"] == 2
+
+    counts = _facets(client, hr)
+    assert [(t["value"], t["count"]) for t in counts["tags"]] == [("alpha", 2), ("beta", 1), ("gamma", 1)]
+    assert _counts(counts["departments"]) == {"HR": 2}
+
+    assert _counts(_facets(client, finance, q="ledger")["tags"]) == {"beta": 1}
+
+
+def test_tag_cap_keeps_the_most_frequent(client, monkeypatch):
+    hr, _ = _seed(client)
+    monkeypatch.setattr(settings, "search_facets_tags_max", 2)
+    assert [t["value"] for t in _facets(client, hr)["tags"]] == ["alpha", "beta"]  # ties by name
+
+
+def test_counts_ride_along_with_the_page(client):
+    hr, _ = _seed(client)
+    with capture_queries() as plain:
+        client.get("/api/documents/search", params={"limit": 1}, headers=hr)
+    with capture_queries() as faceted:
+        counts = _facets(client, hr, limit=1)
+    assert faceted.count == plain.count  # no extra round trip for the counts
+    assert _counts(counts["departments"]) == {"HR": 2}
+
+    # a page past the last match still gets the counts, and a repeat comes from the cache
+    facets._cache.clear()
+    past = {"cursor": encode_cursor("2000-01-01T00:00:00+00:00", 1)}
+    res = client.get("/api/documents/search", params={"facets": True, **past}, headers=hr).json()
+    assert res["items"] == [] and _counts(res["facets"]["departments"]) == {"HR": 2}
+    with capture_queries() as cached:
+        _facets(client, hr, limit=1)
+    assert cached.count == plain.count
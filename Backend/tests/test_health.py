@@ -0,0 +1,22 @@
+import pytest
+
+from app.core import compression, deltas
+from app.core.settings import settings
+from app.services.health import check_dependencies
+
+
+def test_enabled_feature_without_its_package_fails_startup(monkeypatch):
+    monkeypatch.setattr(settings, "storage_compression", "zstd")
+    monkeypatch.setattr(settings, "storage_deltas", True)
+    monkeypatch.setattr(compression, "zstandard", None)
+    monkeypatch.setattr(deltas, "bsdiff4", None)
+    with pytest.raises(RuntimeError, match="zstandard.*bsdiff4"):
+        check_dependencies()
+
+
+def test_disabled_features_need_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "storage_compression", "off")
+    monkeypatch.setattr(settings, "storage_deltas", False)
+    monkeypatch.setattr(compression, "zstandard", None)
+    monkeypatch.setattr(deltas, "bsdiff4", None)
+    check_dependencies()
@@ -0,0 +1,68 @@
+import re
+
+from app.core import metrics
+from helpers import login, upload
+
+# name{labels} value, as in the Prometheus text exposition format
+LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*"'
+SAMPLE = re.compile(rf"^[a-zA-Z_:][a-zA-Z0-9_:]*(\{{{LABEL}(,{LABEL})*\}})? \S+$")
+
+
+def _scrape(client) -> dict:
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == metrics.PROMETHEUS_CONTENT_TYPE
+    samples, typed = {}, set()
+    for line in res.text.splitlines():
+        if line.startswith("# TYPE "):
+            name = line.split()[2]
+            assert name not in typed, f"second TYPE line for {name}"
+            typed.add(name)
+            continue
+        assert SAMPLE.match(line), line
+        series, value = line.rsplit(" ", 1)
+        samples[series] = float(value)
+    return samples
+
+
+def test_render_prometheus():
+    metrics.inc("test.widgets", 2, {"kind": 'say "hi"\n'})
+    for seconds in (0.003, 0.02, 0.02, 99):
+        metrics.observe("test.render_seconds", seconds, {"route": "/x"})
+    text = metrics.render_prometheus()
+
+    assert "# TYPE docrepo_test_widgets_total counter" in text
+    assert 'docrepo_test_widgets_total{kind="say \\"hi\\"\\n"} 2' in text
+    assert "# TYPE docrepo_test_render_seconds histogram" in text
+    lines = [line for line in text.splitlines() if line.startswith("docrepo_test_render_seconds")]
+    assert 'docrepo_test_render_seconds_bucket{route="/x",le="0.005"} 1' in lines
+    assert 'docrepo_test_render_seconds_bucket{route="/x",le="0.025"} 3' in lines  # cumulative
+    assert 'docrepo_test_render_seconds_bucket{route="/x",le="60"} 3' in lines
+    assert 'docrepo_test_render_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'docrepo_test_render_seconds_count{route="/x"} 4' in lines
+    assert 'docrepo_test_render_seconds_sum{route="/x"} 99.043' in lines
+
+
+def test_scrape_counts_requests_and_queries(client):
+    auth = login(client, "scraped@example.com")
+    upload(client, auth, "measured")
+    route = 'method="GET",route="/api/documents"'
+    requests = f'docrepo_http_requests_total{{{route},status="200"}}'
+
+    before = _scrape(client)
+    for _ in range(3):
+        assert client.get("/api/documents", headers=auth).status_code == 200
+    after = _scrape(client)
+
+    def grew(series: str) -> float:
+        return after[series] - before.get(series, 0)
+
+    assert grew(requests) == 3
+    assert grew(f"docrepo_http_request_seconds_count{{{route}}}") == 3
+    assert grew(f'docrepo_http_request_seconds_bucket{{{route},le="+Inf"}}') == 3
+    assert grew(f"docrepo_http_request_seconds_sum{{{route}}}") > 0
+    assert grew(f"docrepo_http_request_sql_queries_count{{{route}}}") == 3
+    assert grew(f"docrepo_http_request_sql_queries_sum{{{route}}}") >= 3  # at least the page query each
+    assert grew(f'docrepo_http_bytes_total{{direction="out",{route}}}') > 0
+    assert sum(grew(s) for s in after if s.startswith("docrepo_db_queries_total{")) >= 3
+    assert after["docrepo_startup_import_seconds"] > 0
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.services.pagination import encode_cursor
+from helpers import login, upload, walk
+
+
+def test_pages_cover_every_document_once_with_tied_timestamps(client):
+    auth = login(client, "pager@example.com")
+    ids = [upload(client, auth, f"doc {i}", content=f"body {i}".encode())["id"] for i in range(7)]
+    with SessionLocal() as db:
+        # five share one updated_at, so page boundaries fall inside the tie; id breaks it
+        tied = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        db.execute(update(Document).where(Document.id.in_(ids[:5])).values(updated_at=tied))
+        db.commit()
+
+    pages = walk(client, "/api/documents", auth, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    order = [item["id"] for page in pages for item in page]
+    assert order == ids[5:][::-1] + ids[:5][::-1]  # (updated_at DESC, id DESC)
+
+
+def test_last_page_has_no_cursor(client):
+    auth = login(client, "short@example.com")
+    upload(client, auth, "only")
+    res = client.get("/api/documents", params={"limit": 1}, headers=auth).json()
+    assert len(res["items"]) == 1 and res["next_cursor"] is None
+
+    empty = login(client, "nobody@example.com")
+    assert client.get("/api/documents", headers=empty).json()["next_cursor"] is None
+
+
+def test_bad_cursor_is_400(client):
+    auth = login(client, "cursor@example.com")
+    for cursor in ("not-base64!", encode_cursor("2024-01-01"), encode_cursor("yesterday", 5), encode_cursor(None, "x")):
+        res = client.get("/api/documents", params={"cursor": cursor}, headers=auth)
+        assert res.status_code == 400, (cursor, res.text)
@@ -0,0 +1,31 @@
+"""Listing endpoints run a fixed number of statements per page, however many documents it holds (no N+1)."""
+import pytest
+
+from app.core.profiling import capture_queries
+from helpers import login, upload
+
+ENDPOINTS = ["/api/documents", "/api/documents/search?tags=alpha", "/api/users/me/documents"]
+BUDGET = 2  # page + tags (selectinload); the user comes from the auth cache after the first request
+
+
+def _count(client, url, headers):
+    client.get(url, headers=headers)  # warm the per-process caches
+    with capture_queries() as trace:
+        res = client.get(url, headers=headers)
+    assert res.status_code == 200, res.text
+    return len(res.json()["items"]), trace
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_listing_query_budget(client, url):
+    auth = login(client, "owner@example.com")
+    upload(client, auth, "first", tags="alpha,beta")
+    few, small = _count(client, url, auth)
+
+    for i in range(15):
+        upload(client, auth, f"doc {i}", tags="alpha,beta,gamma", content=f"body {i}".encode())
+    many, large = _count(client, url, auth)
+
+    assert (few, many) == (1, 16)
+    assert large.count <= BUDGET, large.repeated_shapes(2)
+    assert large.count == small.count, large.repeated_shapes(2)
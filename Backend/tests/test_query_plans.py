@@ -0,0 +1,13 @@
+
+from app.db.session import SessionLocal
+from app.services.query_plans import check
+
+# enough rows that the planner prefers an index wherever one applies; the seed is rolled back
+DOCUMENTS = 20_000
+
+
+def test_hot_queries_use_indexes(database):
+    with SessionLocal() as db:
+        results = check(db, DOCUMENTS, departments=20, users=200, tags=100)
+    assert results
+    assert {r.name: r.seq_scans for r in results if not r.ok} == {}
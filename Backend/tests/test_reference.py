@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from app.services import reference
+from helpers import login, upload
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+    invalidate = reference.cache.invalidate
+    monkeypatch.setattr(reference.cache, "invalidate", lambda kinds=None: (calls.append(kinds), invalidate(kinds)))
+    return calls
+
+
+def _bulk(client, auth, *entries):
+    res = client.post(
+        "/api/documents/bulk",
+        data={"manifest": json.dumps([{"file": f"{title}.txt", "title": title, "tags": tags} for title, tags in entries])},
+        files=[("files", (f"{title}.txt", title.encode(), "text/plain")) for title, _ in entries],
+        headers=auth,
+    )
+    assert res.status_code == 200, res.text
+
+
+def test_tagging_with_existing_tags_keeps_the_tags_list_cached(client, invalidations):
+    auth = login(client, "tagger@example.com")
+    upload(client, auth, "first", tags="alpha,beta")
+    _bulk(client, auth, ("second", ["gamma"]))
+    assert invalidations  # new tags
+
+    etag = client.get("/api/tags", headers=auth).headers["ETag"]
+    invalidations.clear()
+    doc = upload(client, auth, "third", tags="alpha")
+    _bulk(client, auth, ("fourth", ["beta", "gamma"]))
+    res = client.put(f"/api/documents/{doc['id']}", json={"tags": ["beta"]}, headers=auth)
+    assert res.status_code == 200, res.text
+    assert invalidations == []
+    assert client.get("/api/tags", headers={**auth, "If-None-Match": etag}).status_code == 304
+
+    _bulk(client, auth, ("fifth", ["alpha", "delta"]))
+    assert invalidations
+    assert [t["name"] for t in client.get("/api/tags", headers=auth).json()] == ["alpha", "beta", "delta", "gamma"]
+
+
+def test_autocomplete_ranks_by_document_counts(client):
+    auth = login(client, "ranker@example.com")
+    upload(client, auth, "one", tags="report")
+    upload(client, auth, "two", tags="reports,report")
+    assert client.get("/api/tags/autocomplete", params={"prefix": "REP"}, headers=auth).json() == [
+        {"id": 1, "name": "report", "document_count": 2},
+        {"id": 2, "name": "reports", "document_count": 1},
+    ]
+
+    # counts are refreshed on their own TTL, not on every tagging write
+    upload(client, auth, "three", tags="reports")
+    upload(client, auth, "four", tags="reports")
+    ranked = client.get("/api/tags/autocomplete", params={"prefix": "rep"}, headers=auth).json()
+    assert [(t["name"], t["document_count"]) for t in ranked] == [("report", 2), ("reports", 1)]
+    reference._tag_counts.clear()
+    ranked = client.get("/api/tags/autocomplete", params={"prefix": "rep"}, headers=auth).json()
+    assert [(t["name"], t["document_count"]) for t in ranked] == [("reports", 3), ("report", 2)]
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.settings import settings
+from app.db import routing
+from app.db.session import AsyncSessionLocal
+from helpers import login, upload
+
+
+@pytest.fixture
+def replica(database, monkeypatch):
+    """
+    A second engine, on its own URL, standing in for a replica (it is the test database under another
+    application_name). Returns the list its statements are recorded in.
+    """
+    url = make_url(settings.sqlalchemy_database_uri).update_query_dict({"application_name": "replica"})
+    engine = create_async_engine(url, poolclass=NullPool)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    monkeypatch.setattr(routing, "ReplicaSessionLocals", [async_sessionmaker(bind=engine, expire_on_commit=False)])
+    monkeypatch.setattr(routing, "_lag", {})
+    yield statements
+    engine.sync_engine.dispose()
+
+
+def test_primary_without_replicas():
+    assert routing.read_sessionmaker(1, None) is AsyncSessionLocal
+
+
+def test_reads_go_to_the_replica(client, replica):
+    auth = login(client, "reader@example.com")
+    client.cookies.clear()
+    replica.clear()
+    res = client.get("/api/documents", headers=auth)
+    assert res.status_code == 200, res.text
+    assert any("FROM documents" in sql for sql in replica)
+
+
+def test_own_write_routes_reads_to_the_primary(client, replica):
+    auth = login(client, "writer@example.com")
+    upload(client, auth, "fresh")
+    replica.clear()
+    # the in-process window and the cookie each pin the user; both are set by the upload
+    assert [d["title"] for d in client.get("/api/documents", headers=auth).json()["items"]] == ["fresh"]
+    assert replica == []
+
+    routing._recent_writers.clear()  # as on another worker: only the cookie is left
+    assert client.get("/api/documents", headers=auth).status_code == 200
+    assert replica == []
+
+    client.cookies.clear()
+    assert client.get("/api/documents", headers=auth).status_code == 200
+    assert replica != []
+
+
+def test_expired_cookie_or_lagging_replica(replica, monkeypatch):
+    replica_maker = routing.ReplicaSessionLocals[0]
+    assert routing.read_sessionmaker(None, str(int(time.time()) - 1)) is replica_maker
+    assert routing.read_sessionmaker(None, "garbage") is replica_maker
+    assert routing.read_sessionmaker(None, str(int(time.time()) + 5)) is AsyncSessionLocal
+
+    monkeypatch.setitem(routing._lag, 0, settings.replica_max_lag_seconds + 1)
+    assert routing.read_sessionmaker(None, None) is AsyncSessionLocal
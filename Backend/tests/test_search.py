@@ -0,0 +1,29 @@
+from helpers import login, upload, walk
+
+
+def test_snippet_escapes_document_text(client):
+    auth = login(client, "author@example.com")
+    upload(client, auth, "<script>alert(1)</script> quarterly report", description='Q3 "numbers" & <b>totals</b>')
+
+    res = client.get("/api/documents/search", params={"q": "quarterly"}, headers=auth)
+    assert res.status_code == 200, res.text
+    [item] = res.json()["items"]
+    snippet = item["snippet"]
+    assert "<script>" not in snippet and "<b>" not in snippet
+    assert "alert(1)&lt;/script&gt;" in snippet
+    assert "<mark>quarterly</mark>" in snippet
+    assert "&amp;" in snippet and "&quot;numbers&quot;" in snippet
+
+
+def test_ranked_pages_have_no_duplicates_or_gaps(client):
+    auth = login(client, "pager@example.com")
+    ids = [upload(client, auth, "budget " * (1 + i % 3) + f"memo {i}")["id"] for i in range(5)]
+    ids += [upload(client, auth, "budget")["id"] for _ in range(3)]  # equal ranks: ordered by id
+    upload(client, auth, "unrelated")
+
+    pages = walk(client, "/api/documents/search", auth, q="budget", limit=2)
+    seen = [item["id"] for page in pages for item in page]
+    assert sorted(seen) == sorted(ids)
+    assert [len(page) for page in pages] == [2, 2, 2, 2]
+    ranks = [(item["rank"], item["id"]) for page in pages for item in page]
+    assert ranks == sorted(ranks, reverse=True)
@@ -0,0 +1,38 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+from app.core.storage import get_storage
+
+
+@pytest.fixture
+def signed_get(tmp_path):
+    """A presigned local GET for a stored file, as a path + query the app serves."""
+    source = tmp_path / "report.txt"
+    source.write_bytes(b"quarterly numbers")
+    storage = get_storage()
+    storage.put_file("tests/report.txt", source)
+    url, _ = storage.presign("tests/report.txt", filename="report.txt")
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}"
+
+
+@pytest.fixture
+def files_client():
+    # the /api/files routes need no database, so no startup either
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+def test_signed_url_serves_the_file(files_client, signed_get):
+    res = files_client.get(signed_get)
+    assert res.status_code == 200
+    assert res.content == b"quarterly numbers"
+    assert 'filename="report.txt"' in res.headers["content-disposition"]
+
+
+def test_filename_is_covered_by_the_signature(files_client, signed_get):
+    assert files_client.get(signed_get.replace("filename=report.txt", "filename=invoice.exe")).status_code == 403
+    assert files_client.get(signed_get.replace("&filename=report.txt", "")).status_code == 403
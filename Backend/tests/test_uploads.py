@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.core.files import session_path
+from app.db.session import SessionLocal
+from app.models.document import UploadSession
+from app.services.uploads import prune_expired_sessions
+from helpers import login, upload
+
+
+def _start(client, auth, doc_id: int, size=None) -> str:
+    res = client.post(
+        f"/api/documents/{doc_id}/version/uploads",
+        json={"filename": "draft.txt", "content_type": "text/plain", "size": size},
+        headers=auth,
+    )
+    assert res.status_code == 201, res.text
+    assert res.json()["offset"] == 0
+    return res.json()["upload_id"]
+
+
+def _patch(client, auth, url: str, offset: int, chunk: bytes):
+    return client.patch(url, content=chunk, headers={**auth, "Upload-Offset": str(offset)})
+
+
+def test_upload_resumes_from_the_reported_offset(client):
+    auth = login(client, "resumer@example.com")
+    doc = upload(client, auth, "draft", content=b"v1")
+    upload_id = _start(client, auth, doc["id"], size=11)
+    url = f"/api/documents/{doc['id']}/version/uploads/{upload_id}"
+
+    assert _patch(client, auth, url, 0, b"hello").headers["upload-offset"] == "5"
+    # the connection dropped: ask where to continue instead of guessing
+    head = client.head(url, headers=auth)
+    assert (head.headers["upload-offset"], head.headers["upload-length"]) == ("5", "11")
+    conflict = _patch(client, auth, url, 0, b"hello")
+    assert conflict.status_code == 409 and conflict.headers["upload-offset"] == "5"
+    assert client.post(f"{url}/complete", headers=auth).status_code == 409  # incomplete
+
+    too_much = _patch(client, auth, url, 5, b" world and more")
+    assert too_much.status_code == 413
+    assert _patch(client, auth, url, 5, b" world").status_code == 204
+    res = client.post(f"{url}/complete", headers=auth)
+    assert res.status_code == 201, res.text
+    assert res.json()["version_number"] == 2
+
+    assert client.get(f"/api/documents/{doc['id']}/download", headers=auth).content == b"hello world"
+    assert client.head(url, headers=auth).status_code == 404  # the session is gone once completed
+    assert not session_path(upload_id).exists()
+
+
+def test_session_belongs_to_its_user(client):
+    owner = login(client, "starter@example.com")
+    colleague = login(client, "colleague@example.com")  # same department: may upload versions too
+    doc = upload(client, owner, "shared")
+    url = f"/api/documents/{doc['id']}/version/uploads/{_start(client, owner, doc['id'])}"
+
+    assert _patch(client, colleague, url, 0, b"mine").status_code == 404
+    assert client.post(f"{url}/complete", headers=colleague).status_code == 404
+    assert client.delete(url, headers=colleague).status_code == 404
+    assert client.delete(url, headers=owner).status_code == 204
+
+
+def test_expired_session_is_gone(client):
+    auth = login(client, "slow@example.com")
+    doc = upload(client, auth, "late")
+    upload_id = _start(client, auth, doc["id"])
+    url = f"/api/documents/{doc['id']}/version/uploads/{upload_id}"
+    with SessionLocal() as db:
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.execute(update(UploadSession).where(UploadSession.id == upload_id).values(expires_at=past))
+        db.commit()
+
+    assert _patch(client, auth, url, 0, b"too late").status_code == 410
+    assert client.post(f"{url}/complete", headers=auth).status_code == 410
+    with SessionLocal() as db:
+        assert prune_expired_sessions(db) == 1
+    assert not session_path(upload_id).exists()
+    assert client.head(url, headers=auth).status_code == 404
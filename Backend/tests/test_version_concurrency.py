@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.files import STAGING_DIR, StagedFile
+from app.core.settings import settings
+from app.models.document import Document, DocumentVersion
+from app.models.user import User
+from app.services.documents import add_new_version
+from helpers import login, upload
+
+UPLOADS = 300
+
+
+def _stage(i: int) -> StagedFile:
+    data = f"version payload {i % 50} ".encode() * 100  # some uploads share bytes, so blob rows contend too
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    path = STAGING_DIR / uuid.uuid4().hex
+    path.write_bytes(data)
+    return StagedFile(
+        path=path, filename=f"v{i}.txt", content_type="text/plain", size=len(data), sha256=hashlib.sha256(data).hexdigest()
+    )
+
+
+def test_concurrent_new_versions_get_gapless_numbers(client):
+    auth = login(client, "concurrent@example.com")
+    doc_id = upload(client, auth, "busy document")["id"]
+    staged = [_stage(i) for i in range(UPLOADS)]
+
+    async def scenario():
+        # own engine: the app's async pool belongs to the TestClient's event loop; a small pool makes uploads queue
+        engine = create_async_engine(settings.sqlalchemy_database_uri, pool_size=20, max_overflow=0, pool_timeout=120)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def one(s: StagedFile) -> int:
+            async with sessions() as db:
+                doc = await db.get(Document, doc_id)
+                user = await db.get(User, doc.owner_id)
+                return (await add_new_version(db, doc, user, s)).version_number
+
+        try:
+            numbers = await asyncio.gather(*(one(s) for s in staged))
+            async with sessions() as db:
+                stored = (
+                    await db.execute(select(DocumentVersion.version_number).where(DocumentVersion.document_id == doc_id))
+                ).scalars().all()
+                current = (await db.get(Document, doc_id)).current_version_number
+        finally:
+            await engine.dispose()
+        return numbers, stored, current
+
+    numbers, stored, current = asyncio.run(scenario())
+    assert sorted(numbers) == list(range(2, UPLOADS + 2))
+    assert sorted(stored) == list(range(1, UPLOADS + 2))
+    assert current == UPLOADS + 1
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.document import DocumentVersion
+from helpers import login, upload
+
+
+def test_file_size_holds_more_than_2_gib(client):
+    auth = login(client, "big@example.com")
+    doc = upload(client, auth, "big file")
+    with SessionLocal() as db:
+        version = db.execute(select(DocumentVersion).where(DocumentVersion.document_id == doc["id"])).scalar_one()
+        version.file_size = 5 * 1024**3
+        db.commit()
+        db.expire_all()
+        assert db.get(DocumentVersion, version.id).file_size == 5 * 1024**3
+
+
+def test_new_version_and_version_list(client):
+    auth = login(client, "editor@example.com")
+    doc = upload(client, auth, "notes", content=b"v1")
+
+    res = client.post(f"/api/documents/{doc['id']}/version", files={"file": ("notes.txt", b"v2 body", "text/plain")}, headers=auth)
+    assert res.status_code == 201, res.text
+    assert res.json()["version_number"] == 2 and res.json()["file_size"] == 7
+
+    versions = client.get(f"/api/documents/{doc['id']}/versions", headers=auth).json()
+    assert [(v["version_number"], v["file_size"], v["uploaded_by_name"]) for v in versions] == [
+        (2, 7, "editor"),
+        (1, 2, "editor"),
+    ]
@@ -4,15 +4,28 @@ import { useEffect, useState } from "react";
 import type { DocSummary } from "@/lib/api";
 import { listMyDocs } from "@/lib/api";
 import DocumentList from "@/components/documents/DocumentList";
+import LoadMore from "@/components/documents/LoadMore";
 
 export default function MyDocumentsPage() {
   const [docs, setDocs] = useState<DocSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    listMyDocs().then(setDocs).finally(() => setLoading(false));
+    listMyDocs()
+      .then((page) => {
+        setDocs(page.items);
+        setNextCursor(page.next_cursor ?? null);
+      })
+      .finally(() => setLoading(false));
   }, []);
 
+  async function onLoadMore() {
+    const page = await listMyDocs(nextCursor);
+    setDocs((prev) => [...prev, ...page.items]);
+    setNextCursor(page.next_cursor ?? null);
+  }
+
   return (
     <div className="space-y-5">
       <div>
@@ -26,8 +39,11 @@ export default function MyDocumentsPage() {
 			<p className="text-2xl font-semibold text-slate-400">No Documents Yet.</p>
 		</div>
 		) : (
-		<DocumentList docs={docs} />
+		<>
+			<DocumentList docs={docs} />
+			{nextCursor && <LoadMore onLoadMore={onLoadMore} />}
+		</>
 	)}
     </div>
   );
-}
\ No newline at end of file
+}
@@ -3,29 +3,49 @@
 import { useEffect, useState } from "react";
 import SearchBar from "@/components/documents/SearchBar";
 import DocumentList from "@/components/documents/DocumentList";
-import type { DocSummary } from "@/lib/api";
+import LoadMore from "@/components/documents/LoadMore";
+import type { DocPage, DocSummary } from "@/lib/api";
 import { listAccessibleDocs, searchDocuments } from "@/lib/api";
 
+type SearchQuery = { title?: string; description?: string; tagsCsv?: string; version?: number };
+
 export default function AllDocumentsPage() {
 	const [docs, setDocs] = useState<DocSummary[]>([]);
+	const [nextCursor, setNextCursor] = useState<string | null>(null);
+	const [query, setQuery] = useState<SearchQuery | null>(null); // null: plain listing
 	const [loading, setLoading] = useState(true);
 
+	function fetchPage(q: SearchQuery | null, cursor?: string | null): Promise<DocPage> {
+		return q ? searchDocuments(q, cursor) : listAccessibleDocs(cursor);
+	}
+
 	useEffect(() => {
-		listAccessibleDocs()
-			.then((res) => setDocs(res))
+		fetchPage(null)
+			.then((page) => {
+				setDocs(page.items);
+				setNextCursor(page.next_cursor ?? null);
+			})
 			.finally(() => setLoading(false));
 	}, []);
 
-	async function onSearch(q: { title?: string; description?: string; tagsCsv?: string; version?: number }) {
+	async function onSearch(q: SearchQuery) {
 		setLoading(true);
 		try {
-			const res = await searchDocuments(q);
-			setDocs(res);
+			const page = await fetchPage(q);
+			setQuery(q);
+			setDocs(page.items);
+			setNextCursor(page.next_cursor ?? null);
 		} finally {
 			setLoading(false);
 		}
 	}
 
+	async function onLoadMore() {
+		const page = await fetchPage(query, nextCursor);
+		setDocs((prev) => [...prev, ...page.items]);
+		setNextCursor(page.next_cursor ?? null);
+	}
+
 	return (
 		<div className="space-y-5">
 			<div>
@@ -33,7 +53,14 @@ export default function AllDocumentsPage() {
 				<p className="text-slate-600">Search and browse documents you can access.</p>
 			</div>
 			<SearchBar onSearch={onSearch} />
-			{loading ? <div className="text-slate-600">Loading...</div> : <DocumentList docs={docs} />}
+			{loading ? (
+				<div className="text-slate-600">Loading...</div>
+			) : (
+				<>
+					<DocumentList docs={docs} />
+					{nextCursor && <LoadMore onLoadMore={onLoadMore} />}
+				</>
+			)}
 		</div>
 	);
-}
\ No newline at end of file
+}
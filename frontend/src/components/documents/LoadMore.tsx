@@ -0,0 +1,26 @@
+"use client";
+
+import { useState } from "react";
+import Button from "@/components/ui/Button";
+
+// Shown under a paged list while the API returned a next_cursor; fetches and appends the next page.
+export default function LoadMore({ onLoadMore }: { onLoadMore: () => Promise<void> }) {
+	const [loading, setLoading] = useState(false);
+
+	async function onClick() {
+		setLoading(true);
+		try {
+			await onLoadMore();
+		} finally {
+			setLoading(false);
+		}
+	}
+
+	return (
+		<div className="flex justify-center">
+			<Button type="button" onClick={onClick} disabled={loading}>
+				{loading ? "Loading..." : "Load more"}
+			</Button>
+		</div>
+	);
+}
@@ -21,6 +21,13 @@ export type DocSummary = {
 	tags: string[];
 	updated_at?: string | null;
 	description?: string; // for convenience on FE (when available)
+	rank?: number | null; // full-text searches only
+	snippet?: string | null; // full-text searches only: HTML-escaped text, matches wrapped in <mark>
+};
+
+export type DocPage = {
+	items: DocSummary[];
+	next_cursor?: string | null;
 };
 
 export type VersionInfo = {
@@ -57,24 +64,27 @@ export async function getDepartments() {
 
 
 
-export async function listAccessibleDocs() {
-	const res = await api.get("/api/documents");
-	return res.data as DocSummary[];
+export async function listAccessibleDocs(cursor?: string | null) {
+	const res = await api.get("/api/documents", { params: cursor ? { cursor } : undefined });
+	return res.data as DocPage;
 }
 
 export async function searchDocuments(params: {
+	q?: string; // full-text, ranked
 	title?: string;
 	description?: string;
 	tagsCsv?: string; // "HR,Policy"
 	version?: number;
-}) {
+}, cursor?: string | null) {
 	const q = new URLSearchParams();
+	if (params.q) q.set("q", params.q);
 	if (params.title) q.set("title", params.title);
 	if (params.description) q.set("description", params.description);
 	if (params.tagsCsv) q.set("tags", params.tagsCsv);
 	if (params.version) q.set("version", String(params.version));
+	if (cursor) q.set("cursor", cursor);
 	const res = await api.get(`/api/documents/search?${q.toString()}`);
-	return res.data as DocSummary[];
+	return res.data as DocPage;
 }
 
 export async function getVersions(documentId: number) {
@@ -99,9 +109,9 @@ export async function getTags() {
     return res.data as Array<{ id: number; name: string }>;
   }
 
-export async function listMyDocs() {
-    const res = await api.get("/api/users/me/documents");
-    return res.data as DocSummary[];
+export async function listMyDocs(cursor?: string | null) {
+    const res = await api.get("/api/users/me/documents", { params: cursor ? { cursor } : undefined });
+    return res.data as DocPage;
 }
   
 export async function uploadDocument(form: FormData) {